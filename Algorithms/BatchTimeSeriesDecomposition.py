@@ -0,0 +1,220 @@
+"""
+Batched multi-series time-series decomposition
+----------------------------------------------
+TimeSeriesDecomposition.py decomposes a single citywide daily series. This
+module decomposes many daily crash-count series at once (citywide, per
+borough, per severity, per weather condition, per top contributing factor):
+
+- all daily counts are built with ONE group-by over the collision-level table
+  (only the needed columns are read from the parquet), and
+- the decompositions run in a process pool and come back as one tidy table
+  (one row per series x day, one column per component).
+
+Methods:
+- "classical": statsmodels seasonal_decompose (additive, single period)
+- "stl":       statsmodels STL (single period, robust)
+- "mstl":      statsmodels MSTL with several periods, e.g. weekly + yearly
+"""
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+# ------------------------------------------------
+# Configuration
+# ------------------------------------------------
+file_path = "schema_sentinel_last5yrs.parquet"
+output_path = "time_series_components.parquet"
+
+DIMENSIONS = [
+    "borough",
+    "collision_severity",
+    "weather_condition",
+    "contributing_factor_vehicle_1",
+]
+TOP_N_LEVELS = 10          # keep the most frequent levels per dimension
+MIN_TOTAL_CRASHES = 365    # skip series too sparse to decompose meaningfully
+
+DATE_CANDIDATES = ["crash_date_vehicle", "crash_date_x", "crash_date_person", "crash_date"]
+
+
+# ------------------------------------------------
+# 1. Collision-level table (projected read + dedupe)
+# ------------------------------------------------
+def load_collision_level(path, dimensions=DIMENSIONS):
+    """Read only collision_id, a crash date and the dimension columns; one row per collision."""
+    import pyarrow.parquet as pq
+
+    available = pq.read_schema(path).names
+    date_col = next((c for c in DATE_CANDIDATES if c in available), None)
+    if date_col is None:
+        raise KeyError(f"No crash date column found. Tried: {DATE_CANDIDATES}")
+    dims = [d for d in dimensions if d in available]
+
+    df = pd.read_parquet(path, columns=["collision_id", date_col] + dims)
+    df = df.drop_duplicates(subset="collision_id", keep="first")
+    df["crash_date"] = pd.to_datetime(df[date_col], errors="coerce").dt.normalize()
+    if date_col != "crash_date":
+        df = df.drop(columns=date_col)
+    return df.dropna(subset=["crash_date"])
+
+
+# ------------------------------------------------
+# 2. All daily series in one group-by
+# ------------------------------------------------
+def build_daily_series(df, dimensions=DIMENSIONS, top_n=TOP_N_LEVELS, include_citywide=True):
+    """
+    Return a wide frame: index = every calendar day in range, columns =
+    MultiIndex (dimension, level), values = daily collision counts.
+    """
+    dims = [d for d in dimensions if d in df.columns]
+    parts = []
+    if include_citywide:
+        parts.append(pd.DataFrame({"dimension": "all", "level": "All", "crash_date": df["crash_date"]}))
+    for dim in dims:
+        levels = df[dim].value_counts().head(top_n).index
+        keep = df[dim].isin(levels)
+        parts.append(pd.DataFrame({
+            "dimension": dim,
+            "level": df.loc[keep, dim].astype(str),
+            "crash_date": df.loc[keep, "crash_date"],
+        }))
+
+    long = pd.concat(parts, ignore_index=True)
+    counts = long.groupby(["dimension", "level", "crash_date"], sort=False).size()
+
+    wide = counts.unstack(["dimension", "level"], fill_value=0)
+    full_range = pd.date_range(df["crash_date"].min(), df["crash_date"].max(), freq="D")
+    return wide.reindex(full_range, fill_value=0).astype(np.float64)
+
+
+# ------------------------------------------------
+# 3. One decomposition (runs inside a worker process)
+# ------------------------------------------------
+def _decompose_one(task):
+    """Decompose one series; returns (key, dict of component arrays) or (key, error string)."""
+    key, values, method, periods = task
+    try:
+        series = pd.Series(values)
+        if method == "classical":
+            from statsmodels.tsa.seasonal import seasonal_decompose
+            res = seasonal_decompose(series, model="additive", period=periods[0])
+            seasonal = {f"seasonal_{periods[0]}": res.seasonal.to_numpy()}
+        elif method == "stl":
+            from statsmodels.tsa.seasonal import STL
+            res = STL(series, period=periods[0], robust=True).fit()
+            seasonal = {f"seasonal_{periods[0]}": res.seasonal.to_numpy()}
+        elif method == "mstl":
+            from statsmodels.tsa.seasonal import MSTL
+            res = MSTL(series, periods=list(periods)).fit()
+            seasonal_frame = pd.DataFrame(res.seasonal)
+            seasonal = {
+                f"seasonal_{p}": seasonal_frame.iloc[:, i].to_numpy() for i, p in enumerate(periods)
+            }
+        else:
+            raise ValueError(f"Unknown method: {method}")
+        components = {"trend": res.trend.to_numpy(), "resid": res.resid.to_numpy()}
+        components.update(seasonal)
+        return key, components
+    except Exception as exc:  # keep the batch going; report failures at the end
+        return key, f"{type(exc).__name__}: {exc}"
+
+
+# ------------------------------------------------
+# 4. Batch decomposition across a process pool
+# ------------------------------------------------
+def decompose_many(wide, method="classical", periods=(365,), max_workers=None,
+                   min_total=MIN_TOTAL_CRASHES):
+    """
+    Decompose every column of `wide` and return (components, failures).
+
+    components: tidy frame with columns
+        dimension, level, crash_date, observed, trend, seasonal_<p>..., resid
+    failures: dict {(dimension, level): reason}
+    """
+    periods = tuple(periods)
+    min_length = 2 * max(periods)
+    if len(wide) < min_length:
+        raise ValueError(f"Need at least {min_length} days for periods {periods}; got {len(wide)}.")
+
+    tasks, failures = [], {}
+    for key in wide.columns:
+        values = wide[key].to_numpy()
+        if values.sum() < min_total:
+            failures[key] = f"skipped: only {int(values.sum())} crashes"
+            continue
+        tasks.append((key, values, method, periods))
+
+    if max_workers == 1 or len(tasks) <= 1:
+        results = map(_decompose_one, tasks)
+    else:
+        pool = ProcessPoolExecutor(max_workers=max_workers)
+        chunksize = max(1, len(tasks) // ((max_workers or os.cpu_count() or 1) * 4))
+        results = pool.map(_decompose_one, tasks, chunksize=chunksize)
+
+    frames = []
+    try:
+        for key, out in results:
+            if isinstance(out, str):
+                failures[key] = out
+                continue
+            frame = pd.DataFrame({"crash_date": wide.index, "observed": wide[key].to_numpy()})
+            for name, arr in out.items():
+                frame[name] = arr
+            frame.insert(0, "level", key[1])
+            frame.insert(0, "dimension", key[0])
+            frames.append(frame)
+    finally:
+        if max_workers != 1 and len(tasks) > 1:
+            pool.shutdown()
+
+    components = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+    ordered = ["dimension", "level", "crash_date", "observed", "trend"]
+    ordered += [f"seasonal_{p}" for p in periods]
+    ordered += ["resid"]
+    return components.reindex(columns=ordered), failures
+
+
+if __name__ == "__main__":
+    import matplotlib.pyplot as plt
+
+    # ------------------------------------------------
+    # Load + build all series
+    # ------------------------------------------------
+    t0 = time.perf_counter()
+    df = load_collision_level(file_path)
+    print(f"Collision-level rows: {len(df):,} (loaded in {time.perf_counter() - t0:.1f}s)")
+
+    t0 = time.perf_counter()
+    wide = build_daily_series(df)
+    print(f"Daily series built: {wide.shape[1]} series x {wide.shape[0]} days "
+          f"({time.perf_counter() - t0:.2f}s)")
+
+    # ------------------------------------------------
+    # Decompose (weekly + yearly seasonality)
+    # ------------------------------------------------
+    t0 = time.perf_counter()
+    components, failures = decompose_many(wide, method="mstl", periods=(7, 365))
+    print(f"Decomposed {components[['dimension', 'level']].drop_duplicates().shape[0]} series "
+          f"in {time.perf_counter() - t0:.1f}s")
+    for key, reason in failures.items():
+        print(f"  not decomposed {key}: {reason}")
+
+    components.to_parquet(output_path, index=False)
+    print("Saved components:", output_path)
+
+    # ------------------------------------------------
+    # Citywide components, same view as TimeSeriesDecomposition.py
+    # ------------------------------------------------
+    city = components[components["dimension"] == "all"].set_index("crash_date")
+    parts = ["observed", "trend", "seasonal_7", "seasonal_365", "resid"]
+    fig, axes = plt.subplots(len(parts), 1, figsize=(12, 10), sharex=True)
+    for ax, name in zip(axes, parts):
+        ax.plot(city.index, city[name], linewidth=0.8)
+        ax.set_ylabel(name)
+    plt.suptitle("MSTL Decomposition of NYC Daily Crash Counts (weekly + yearly)", fontsize=14)
+    plt.tight_layout()
+    plt.show()
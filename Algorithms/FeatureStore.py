@@ -0,0 +1,299 @@
+# ===============================
+# FEATURE STORE (encoded design matrices on disk, memory-mapped)
+# ===============================
+# MultinomialLogisticRegression.py (pd.get_dummies), random forest.py
+# (OneHotEncoder) and the XGBoost / HistGradientBoosting models all re-derive
+# their features from raw parquet columns on every run. This module encodes a
+# feature set ONCE per dataset version and stores it as plain .npy arrays:
+#
+#   feature_store/<dataset>-<version>/<feature_set>/
+#       codes.npy          int32 (n_rows, n_categorical)   ordinal codes, -1 = missing
+#       numeric.npy        float32 (n_rows, n_numeric)
+#       target.npy         target values
+#       csr_data.npy       \
+#       csr_indices.npy     > one-hot CSR matrix (categoricals + numeric); indices and
+#       csr_indptr.npy     /  indptr share one dtype (int32 unless nnz needs int64)
+#       manifest.json      feature names, categories, shapes, source + version
+#
+# Loading memory-maps the arrays (np.load(mmap_mode="r")), so any model script
+# gets its X in seconds with zero parsing or encoding. The dataset version is a
+# fingerprint of the source files (path, size, mtime); re-running on an
+# unchanged dataset is a no-op.
+#
+# Usage:
+#   python FeatureStore.py --data person_vehicle_weather.parquet --feature-set severity_person
+#
+#   from FeatureStore import load_features
+#   X, y, names = load_features("person_vehicle_weather.parquet", "severity_person", encoding="onehot")
+#
+#   The feature sets read the unsuffixed person / vehicle columns of
+#   person_vehicle_weather.parquet (the input of random forest.py and
+#   HistGradientBoosting.py), not the suffixed builder outputs.
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+# -------------------------------
+# Configuration
+# -------------------------------
+STORE_DIR = "feature_store"
+
+TIME_BINS = [0, 4, 7, 10, 16, 19, 22, 24]
+TIME_LABELS = [
+    "Late Night (00:00–03:59)",
+    "Early Morning (04:00–06:59)",
+    "AM Peak (07:00–09:59)",
+    "Midday (10:00–15:59)",
+    "PM Peak (16:00–18:59)",
+    "Evening (19:00–21:59)",
+    "Late Evening (22:00–23:59)",
+]
+
+# level: "person" keeps every row, "collision" keeps the first row per collision_id
+FEATURE_SETS = {
+    # random forest.py / HistGradientBoosting.py / XGBoost
+    "severity_person": {
+        "level": "person",
+        "categorical": ["driver_license_status", "vehicle_type", "person_sex",
+                        "weather_condition", "borough", "contributing_factor_1"],
+        "numeric": ["person_age", "hour"],
+        "target": "severe",
+    },
+    # MultinomialLogisticRegression.py
+    "severity_collision": {
+        "level": "collision",
+        "categorical": ["driver_license_status", "time_range_7"],
+        "numeric": [],
+        "target": "collision_severity",
+        "target_values": ["No Injury Collision", "Injury Collision", "Fatal Collision"],
+    },
+}
+
+
+# -------------------------------
+# Dataset version
+# -------------------------------
+def _source_files(data_path):
+    if os.path.isdir(data_path):
+        return sorted(glob.glob(os.path.join(data_path, "**", "*.parquet"), recursive=True))
+    return [data_path]
+
+
+def dataset_version(data_path):
+    """Short fingerprint of the source parquet file(s): path, size and mtime."""
+    h = hashlib.sha1()
+    for f in _source_files(data_path):
+        st = os.stat(f)
+        h.update(f"{os.path.abspath(f)}|{st.st_size}|{st.st_mtime_ns}".encode())
+    return h.hexdigest()[:12]
+
+
+def store_path(data_path, feature_set, store_dir=STORE_DIR):
+    stem = os.path.splitext(os.path.basename(os.path.normpath(data_path)))[0]
+    return os.path.join(store_dir, f"{stem}-{dataset_version(data_path)}", feature_set)
+
+
+# -------------------------------
+# Raw columns -> model-ready frame
+# -------------------------------
+def _read_feature_frame(data_path, spec):
+    """Read only the needed columns and derive hour / time_range_7 / severe as the model scripts do."""
+    import pyarrow.dataset as ds
+
+    available = ds.dataset(data_path, format="parquet").schema.names
+    derived = {"hour", "time_range_7", "severe"}
+    wanted = {"collision_id", "crash_time", "person_injury"} if spec["level"] == "collision" else {
+        "crash_time", "person_injury"}
+    wanted |= {c for c in spec["categorical"] + spec["numeric"] + [spec["target"]] if c not in derived}
+    df = pd.read_parquet(data_path, columns=[c for c in available if c in wanted])
+
+    if spec["level"] == "collision":
+        df = df.dropna(subset=["collision_id"]).drop_duplicates(subset="collision_id", keep="first")
+
+    if "crash_time" in df.columns:
+        hour = pd.to_datetime(df["crash_time"].astype(str).str.strip(), format="%H:%M", errors="coerce").dt.hour
+        df["hour"] = hour
+        df["time_range_7"] = pd.cut(hour, bins=TIME_BINS, right=False, labels=TIME_LABELS)
+    if "person_injury" in df.columns:
+        df["severe"] = np.where(df["person_injury"].isin(["Injured", "Killed"]), 1, 0)
+
+    columns = spec["categorical"] + spec["numeric"] + [spec["target"]]
+    missing = [c for c in columns if c not in df.columns]
+    if missing:
+        raise KeyError(f"Columns not available for this feature set: {missing}. Build it from "
+                       f"person_vehicle_weather.parquet (the builder outputs use _person / _vehicle suffixes).")
+    df = df[columns].dropna()
+    if spec.get("target_values"):
+        df = df[df[spec["target"]].isin(spec["target_values"])]
+    return df.reset_index(drop=True)
+
+
+# -------------------------------
+# Materialize
+# -------------------------------
+def materialize(data_path, feature_set, store_dir=STORE_DIR, force=False):
+    """Encode `feature_set` for `data_path` once and write it to the store. Returns the store path."""
+    spec = FEATURE_SETS[feature_set]
+    out = store_path(data_path, feature_set, store_dir)
+    if not force and _is_current(out, spec):
+        return out
+
+    t0 = time.perf_counter()
+    df = _read_feature_frame(data_path, spec)
+    n = len(df)
+
+    cats = {}
+    codes = np.empty((n, len(spec["categorical"])), dtype=np.int32)
+    for j, c in enumerate(spec["categorical"]):
+        col = df[c]
+        if isinstance(col.dtype, pd.CategoricalDtype):
+            categorical = col.cat.remove_unused_categories().array   # keeps the label order (e.g. time of day)
+        else:
+            categorical = pd.Categorical(col.astype(str))       # sorted, like OrdinalEncoder
+        cats[c] = [str(v) for v in categorical.categories]
+        codes[:, j] = categorical.codes
+    numeric = df[spec["numeric"]].to_numpy(dtype=np.float32).reshape(n, len(spec["numeric"]))
+
+    # One-hot CSR straight from the codes: each row has one entry per
+    # categorical (column offset + code) followed by the numeric columns.
+    offsets = np.cumsum([0] + [len(cats[c]) for c in spec["categorical"]])
+    n_onehot = int(offsets[-1])
+    cols = np.hstack([codes + offsets[:-1], np.broadcast_to(n_onehot + np.arange(numeric.shape[1]), numeric.shape)])
+    vals = np.hstack([np.ones(codes.shape, dtype=np.float32), numeric])
+    present = np.hstack([codes >= 0, np.ones(numeric.shape, dtype=bool)])
+    # scipy needs indices and indptr in the same dtype (int32 when it fits) to use the mmaps without a copy
+    nnz = int(present.sum())
+    index_dtype = np.int32 if max(nnz, n_onehot + numeric.shape[1]) < np.iinfo(np.int32).max else np.int64
+    csr_indices = cols[present].astype(index_dtype)
+    csr_data = vals[present]
+    csr_indptr = np.concatenate([[0], np.cumsum(present.sum(axis=1))]).astype(index_dtype)
+
+    target = df[spec["target"]]
+    target = target.to_numpy() if pd.api.types.is_numeric_dtype(target) else target.astype(str).to_numpy().astype("U")
+
+    tmp = out + ".tmp"
+    os.makedirs(tmp, exist_ok=True)
+    for name, arr in [("codes", codes), ("numeric", numeric), ("target", target),
+                      ("csr_data", csr_data), ("csr_indices", csr_indices), ("csr_indptr", csr_indptr)]:
+        np.save(os.path.join(tmp, f"{name}.npy"), np.ascontiguousarray(arr))
+
+    onehot_names = [f"{c}_{v}" for c in spec["categorical"] for v in cats[c]] + spec["numeric"]
+    manifest = {
+        "feature_set": feature_set,
+        "source": os.path.abspath(data_path),
+        "version": dataset_version(data_path),
+        "created": pd.Timestamp.now().isoformat(timespec="seconds"),
+        "n_rows": n,
+        "level": spec["level"],
+        "categorical": spec["categorical"],
+        "numeric": spec["numeric"],
+        "target": spec["target"],
+        "target_values": spec.get("target_values"),
+        "categories": cats,
+        "onehot_feature_names": onehot_names,
+        "onehot_shape": [n, len(onehot_names)],
+        "encode_seconds": round(time.perf_counter() - t0, 2),
+    }
+    with open(os.path.join(tmp, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    # Publish atomically so readers never see a half-written feature set
+    if os.path.exists(out):
+        import shutil
+        shutil.rmtree(out)
+    os.replace(tmp, out)
+    return out
+
+
+# -------------------------------
+# Load
+# -------------------------------
+def load_manifest(path):
+    with open(os.path.join(path, "manifest.json")) as f:
+        return json.load(f)
+
+
+def _is_current(path, spec):
+    """True when `path` holds a materialized feature set built from this spec."""
+    if not os.path.exists(os.path.join(path, "manifest.json")):
+        return False
+    manifest = load_manifest(path)
+    return all(manifest.get(k) == spec.get(k) for k in ("categorical", "numeric", "target", "target_values"))
+
+
+def load_features(data_path, feature_set, encoding="onehot", store_dir=STORE_DIR,
+                  drop_first=False, mmap_mode="r", materialize_missing=True):
+    """
+    Return (X, y, feature_names) for a feature set, memory-mapped from the store.
+
+    encoding="onehot":  scipy.sparse CSR (categoricals one-hot + numeric);
+                        drop_first=True drops each categorical's first level
+                        (same baseline as pd.get_dummies(drop_first=True)).
+    encoding="ordinal": pandas DataFrame of category-coded columns + numeric,
+                        ready for native-categorical boosters.
+    """
+    path = store_path(data_path, feature_set, store_dir)
+    if not _is_current(path, FEATURE_SETS[feature_set]):
+        if not materialize_missing:
+            raise FileNotFoundError(f"Feature set not materialized: {path}")
+        materialize(data_path, feature_set, store_dir)
+    manifest = load_manifest(path)
+
+    def arr(name):
+        return np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode)
+
+    y = arr("target")
+
+    if encoding == "onehot":
+        import scipy.sparse as sp
+        X = sp.csr_matrix((arr("csr_data"), arr("csr_indices"), arr("csr_indptr")),
+                          shape=tuple(manifest["onehot_shape"]), copy=False)
+        names = manifest["onehot_feature_names"]
+        if drop_first:
+            firsts, start = set(), 0
+            for c in manifest["categorical"]:
+                firsts.add(start)
+                start += len(manifest["categories"][c])
+            keep = [i for i in range(len(names)) if i not in firsts]
+            X, names = X[:, keep], [names[i] for i in keep]
+        return X, y, names
+
+    if encoding == "ordinal":
+        codes, numeric = arr("codes"), arr("numeric")
+        X = pd.DataFrame({
+            c: pd.Categorical.from_codes(codes[:, j], categories=manifest["categories"][c])
+            for j, c in enumerate(manifest["categorical"])
+        })
+        for j, c in enumerate(manifest["numeric"]):
+            X[c] = numeric[:, j]
+        return X, y, list(X.columns)
+
+    raise ValueError(f"Unknown encoding: {encoding}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Materialize encoded feature matrices for a dataset version.")
+    parser.add_argument("--data", required=True, help="parquet file or directory")
+    parser.add_argument("--feature-set", choices=sorted(FEATURE_SETS), action="append",
+                        help="feature set(s) to build (default: all)")
+    parser.add_argument("--store", default=STORE_DIR)
+    parser.add_argument("--force", action="store_true", help="rebuild even if this version exists")
+    args = parser.parse_args()
+
+    for name in args.feature_set or sorted(FEATURE_SETS):
+        t0 = time.perf_counter()
+        path = materialize(args.data, name, args.store, force=args.force)
+        manifest = load_manifest(path)
+        print(f"{name}: {manifest['n_rows']:,} rows x {len(manifest['onehot_feature_names']):,} one-hot features "
+              f"-> {path} ({time.perf_counter() - t0:.1f}s)")
+
+        t0 = time.perf_counter()
+        X, y, names = load_features(args.data, name, store_dir=args.store)
+        print(f"  reload (mmap): {X.shape} in {(time.perf_counter() - t0) * 1000:.1f} ms")
@@ -0,0 +1,191 @@
+# ===============================
+# HISTOGRAM GRADIENT BOOSTING CLASSIFIER (Severity Prediction)
+# ===============================
+# Alternative to "random forest.py" for the same severity target and features.
+# Instead of one-hot encoding vehicle_type / contributing_factor_1 (hundreds
+# to thousands of levels) into a wide sparse matrix, categoricals are ordinal
+# encoded and passed natively to HistGradientBoostingClassifier, which bins
+# every feature to <= 255 values and splits categories directly. With early
+# stopping and class weighting this trains on all person rows in minutes.
+
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.compose import ColumnTransformer
+from sklearn.ensemble import HistGradientBoostingClassifier
+from sklearn.inspection import permutation_importance
+from sklearn.metrics import classification_report, confusion_matrix
+from sklearn.model_selection import train_test_split
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OrdinalEncoder
+
+# -------------------------------
+# Configuration
+# -------------------------------
+file_path = "person_vehicle_weather.parquet"
+
+categorical_features = [
+    "driver_license_status",
+    "vehicle_type",
+    "person_sex",
+    "weather_condition",
+    "borough",
+    "contributing_factor_1"
+]
+
+numeric_features = ["person_age", "hour"]
+
+feature_cols = categorical_features + numeric_features
+
+# HistGradientBoosting supports at most 255 categories per feature; rarer
+# levels are pooled into one "infrequent" category by the encoder.
+MAX_CATEGORIES = 254
+
+# Rows used for permutation importance (it re-scores the test set per feature)
+IMPORTANCE_SAMPLE = 200_000
+
+
+# -------------------------------
+# Load Integrated Dataset (only the columns the model needs)
+# -------------------------------
+def load_severity_data(path, columns=None):
+    """
+    Read the person-level integrated parquet and return (X, y) for the
+    severity model: severe = 1 if the person was injured or killed.
+    """
+    import pyarrow.parquet as pq
+
+    available = pq.read_schema(path).names
+    wanted = ["person_injury", "crash_time"] + [c for c in feature_cols if c != "hour"]
+    if columns:
+        wanted += [c for c in columns if c not in wanted]
+    df = pd.read_parquet(path, columns=[c for c in wanted if c in available])
+
+    df["severe"] = np.where(df["person_injury"].isin(["Injured", "Killed"]), 1, 0)
+    df = prepare_features(df)
+    df = df.dropna(subset=feature_cols + ["severe"])
+
+    extra = [c for c in (columns or []) if c in df.columns and c not in feature_cols]
+    return df[feature_cols + extra], df["severe"]
+
+
+def missing_feature_columns(columns):
+    """Feature columns that cannot be built from `columns` (hour may come from crash_time)."""
+    columns = set(columns)
+    return [c for c in feature_cols if c not in columns and not (c == "hour" and "crash_time" in columns)]
+
+
+def prepare_features(df):
+    """
+    Derive `hour` from crash_time and cast categoricals to category dtype
+    (keeps millions of repeated strings small). Missing values stay missing,
+    but a missing feature column raises KeyError instead of scoring as all-NaN.
+    Also used when scoring new data with a saved pipeline.
+    """
+    missing = missing_feature_columns(df.columns)
+    if missing:
+        raise KeyError(f"Feature columns not available: {missing}")
+    if "crash_time" in df.columns:
+        df["hour"] = pd.to_datetime(df["crash_time"].astype(str).str.strip(),
+                                    format="%H:%M", errors="coerce").dt.hour
+    for c in categorical_features:
+        df[c] = df[c].astype(str).where(df[c].notna()).astype("category")
+    return df
+
+
+# -------------------------------
+# Model: ordinal codes + native categorical splits
+# -------------------------------
+def build_hgb_pipeline(**params):
+    """Ordinal-encode categoricals and feed them natively to HistGradientBoostingClassifier."""
+    preprocessor = ColumnTransformer(
+        transformers=[
+            ("cat", OrdinalEncoder(
+                handle_unknown="use_encoded_value",
+                unknown_value=np.nan,
+                encoded_missing_value=np.nan,
+                max_categories=MAX_CATEGORIES,
+                dtype=np.float32,
+            ), categorical_features),
+            ("num", "passthrough", numeric_features)
+        ]
+    )
+
+    hgb_params = dict(
+        learning_rate=0.1,
+        max_iter=500,
+        max_leaf_nodes=63,
+        min_samples_leaf=100,
+        l2_regularization=1.0,
+        early_stopping=True,
+        validation_fraction=0.1,
+        n_iter_no_change=20,
+        scoring="loss",
+        class_weight="balanced",      # severe outcomes are rare
+        categorical_features=[True] * len(categorical_features) + [False] * len(numeric_features),
+        random_state=42,
+    )
+    hgb_params.update(params)
+
+    return Pipeline(steps=[
+        ("preprocessor", preprocessor),
+        ("classifier", HistGradientBoostingClassifier(**hgb_params))
+    ])
+
+
+def feature_importance(pipeline, X_test, y_test, n_rows=IMPORTANCE_SAMPLE, random_state=42):
+    """Permutation importance (drop in balanced accuracy) on a test subsample."""
+    if len(X_test) > n_rows:
+        X_test = X_test.sample(n=n_rows, random_state=random_state)
+        y_test = y_test.loc[X_test.index]
+    result = permutation_importance(
+        pipeline, X_test, y_test,
+        scoring="balanced_accuracy", n_repeats=3, random_state=random_state, n_jobs=-1
+    )
+    return pd.DataFrame({
+        "feature": X_test.columns,
+        "importance": result.importances_mean,
+        "importance_std": result.importances_std,
+    }).sort_values(by="importance", ascending=False)
+
+
+if __name__ == "__main__":
+    X, y = load_severity_data(file_path)
+    print(f"Rows: {len(X):,}  severe rate: {y.mean():.3%}")
+
+    # -------------------------------
+    # Train/Test Split (stratified due to imbalance)
+    # -------------------------------
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=0.20, random_state=42, stratify=y
+    )
+
+    # -------------------------------
+    # Train the Model
+    # -------------------------------
+    pipeline = build_hgb_pipeline()
+
+    t0 = time.perf_counter()
+    pipeline.fit(X_train, y_train)
+    hgb = pipeline.named_steps["classifier"]
+    print(f"Trained in {time.perf_counter() - t0:.1f}s "
+          f"({hgb.n_iter_} boosting iterations, early stopping={hgb.early_stopping})")
+
+    # -------------------------------
+    # Evaluation
+    # -------------------------------
+    y_pred = pipeline.predict(X_test)
+
+    print("=== Classification Report ===")
+    print(classification_report(y_test, y_pred))
+
+    print("=== Confusion Matrix ===")
+    print(confusion_matrix(y_test, y_pred))
+
+    # -------------------------------
+    # Feature Importance (Top 20)
+    # -------------------------------
+    # Importance is per original feature, since categoricals are not one-hot expanded
+    feature_imp = feature_importance(pipeline, X_test, y_test)
+    print(feature_imp.head(20))
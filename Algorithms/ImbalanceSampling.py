@@ -0,0 +1,256 @@
+# ===============================
+# IMBALANCE-AWARE STRATIFIED DOWNSAMPLING (with importance weights)
+# ===============================
+# Person conditioning reports a large no-injury : injury imbalance, and the
+# severity models train on every majority-class row. This module streams the
+# parquet and keeps:
+#
+#   - ALL minority-class rows (severe = 1), and
+#   - a reproducible fraction of majority-class rows PER STRATUM
+#     (year x borough by default), chosen so each stratum ends up with about
+#     MAJORITY_RATIO majority rows per minority row.
+#
+# Each kept majority row carries sample_weight = 1 / keep_rate, so weighted
+# counts, rates and metrics are unbiased estimates of the full-data values.
+# Selection is a hash of the row key (unique_id or global row number) and a
+# seed, so the same sample comes back on every run.
+#
+# evaluate_sampling_loss() trains the severity model on the full training
+# split and on its downsampled version and scores both on the same full test
+# split, so the accuracy cost of sampling is reported, not assumed.
+
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow.dataset as ds
+
+# -------------------------------
+# Configuration
+# -------------------------------
+file_path = "person_vehicle_weather.parquet"
+output_path = "person_vehicle_weather_sampled.parquet"
+
+STRATA = ["year", "borough"]
+MAJORITY_RATIO = 3.0        # majority rows kept per minority row, within each stratum
+SEED = 42
+BATCH_ROWS = 1_000_000
+
+DATE_CANDIDATES = ["crash_date_vehicle", "crash_date_x", "crash_date_person", "crash_date"]
+KEY_CANDIDATES = ["unique_id", "unique_id_person"]
+
+
+def _label(df):
+    return df["person_injury"].isin(["Injured", "Killed"]).to_numpy(dtype=np.int8)
+
+
+def _strata_frame(df, date_col, strata):
+    """Stratum columns for a batch (year derived from the crash date)."""
+    out = pd.DataFrame(index=df.index)
+    for s in strata:
+        if s == "year":
+            out["year"] = pd.to_datetime(df[date_col], errors="coerce").dt.year.fillna(-1).astype(int)
+        else:
+            out[s] = df[s].astype(str).where(df[s].notna(), "Unknown")
+    return out
+
+
+def _uniform_hash(keys, seed):
+    """Deterministic uniform [0, 1) value per key (splitmix64 on a 64-bit hash)."""
+    keys = np.asarray(keys)
+    if keys.dtype.kind not in "iuf":
+        keys = keys.astype(str).astype(object)
+    x = pd.util.hash_array(keys, categorize=False).astype(np.uint64)
+    with np.errstate(over="ignore"):
+        x = x + np.uint64(seed) * np.uint64(0x9E3779B97F4A7C15)
+        x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        x = x ^ (x >> np.uint64(31))
+    return (x >> np.uint64(11)).astype(np.float64) / float(1 << 53)
+
+
+def _columns(dataset, strata):
+    names = dataset.schema.names
+    date_col = next((c for c in DATE_CANDIDATES if c in names), None)
+    key_col = next((c for c in KEY_CANDIDATES if c in names), None)
+    if "year" in strata and date_col is None:
+        raise KeyError(f"No crash date column for the year stratum. Tried: {DATE_CANDIDATES}")
+    return date_col, key_col
+
+
+# -------------------------------
+# Pass 1: class counts per stratum -> keep rate per stratum
+# -------------------------------
+def stratum_rates(path, strata=STRATA, majority_ratio=MAJORITY_RATIO, batch_rows=BATCH_ROWS):
+    """Stream label + strata columns; return per-stratum counts and majority keep rates."""
+    dataset = ds.dataset(path, format="parquet")
+    date_col, _ = _columns(dataset, strata)
+    cols = ["person_injury"] + [c for c in strata if c != "year"] + ([date_col] if "year" in strata else [])
+
+    parts = []
+    for batch in dataset.to_batches(columns=cols, batch_size=batch_rows):
+        df = batch.to_pandas()
+        keys = _strata_frame(df, date_col, strata)
+        keys["severe"] = _label(df)
+        parts.append(keys.groupby(strata + ["severe"]).size())
+
+    counts = pd.concat(parts).groupby(level=list(range(len(strata) + 1))).sum().unstack("severe", fill_value=0)
+    counts = counts.reindex(columns=[0, 1], fill_value=0)
+    counts.columns = ["n_majority", "n_minority"]
+    counts["keep_rate"] = np.minimum(
+        1.0, majority_ratio * counts["n_minority"] / counts["n_majority"].clip(lower=1)
+    )
+    # Strata without any minority rows still contribute a few majority rows
+    counts.loc[counts["n_minority"] == 0, "keep_rate"] = np.minimum(1.0, 1.0 / majority_ratio)
+    return counts
+
+
+# -------------------------------
+# Pass 2: stream and sample
+# -------------------------------
+def load_sampled(path, columns=None, strata=STRATA, majority_ratio=MAJORITY_RATIO, seed=SEED,
+                 batch_rows=BATCH_ROWS, rates=None):
+    """
+    Return (sample, rates): the sampled rows (requested columns plus severe,
+    strata and sample_weight) and the per-stratum rate table.
+    """
+    dataset = ds.dataset(path, format="parquet")
+    date_col, key_col = _columns(dataset, strata)
+    if rates is None:
+        rates = stratum_rates(path, strata, majority_ratio, batch_rows)
+    rate_lookup = rates["keep_rate"]
+
+    needed = {"person_injury"} | {c for c in strata if c != "year"}
+    if "year" in strata:
+        needed.add(date_col)
+    if key_col:
+        needed.add(key_col)
+    wanted = list(dict.fromkeys((columns or dataset.schema.names)))
+    read_cols = [c for c in dataset.schema.names if c in needed or c in wanted]
+
+    kept, offset = [], 0
+    for batch in dataset.to_batches(columns=read_cols, batch_size=batch_rows):
+        df = batch.to_pandas()
+        y = _label(df)
+        keys = _strata_frame(df, date_col, strata)
+        rate = rate_lookup.reindex(pd.MultiIndex.from_frame(keys) if len(strata) > 1 else keys[strata[0]]) \
+                          .fillna(1.0).to_numpy()
+
+        row_key = df[key_col].to_numpy() if key_col else np.arange(offset, offset + len(df))
+        u = _uniform_hash(row_key, seed)
+        keep = (y == 1) | (u < rate)
+
+        out = df.loc[keep, [c for c in wanted if c in df.columns]].copy()
+        out["severe"] = y[keep]
+        for s in strata:
+            out[s] = keys.loc[keep, s].to_numpy()
+        out["sample_weight"] = np.where(y[keep] == 1, 1.0, 1.0 / rate[keep])
+        kept.append(out)
+        offset += len(df)
+
+    sample = pd.concat(kept, ignore_index=True) if kept else pd.DataFrame()
+    return sample, rates
+
+
+def weighted_rate_check(sample, rates, strata=STRATA):
+    """Compare the weighted severe rate from the sample with the true full-data rate per stratum."""
+    est = sample.groupby(strata).apply(
+        lambda g: np.average(g["severe"], weights=g["sample_weight"]), include_groups=False
+    ).rename("estimated_rate")
+    true = (rates["n_minority"] / (rates["n_minority"] + rates["n_majority"])).rename("true_rate")
+    table = pd.concat([true, est], axis=1)
+    table["abs_error"] = (table["estimated_rate"] - table["true_rate"]).abs()
+    return table
+
+
+# -------------------------------
+# Accuracy cost of sampling
+# -------------------------------
+def _balanced(y, w):
+    """Fold class_weight='balanced' (on weighted class totals) into sample weights."""
+    y = np.asarray(y)
+    total = w.sum()
+    out = w.copy()
+    for c in (0, 1):
+        mass = w[y == c].sum()
+        if mass > 0:
+            out[y == c] *= total / (2.0 * mass)
+    return out
+
+
+def evaluate_sampling_loss(path, majority_ratio=MAJORITY_RATIO, seed=SEED, test_size=0.2):
+    """
+    Train HistGradientBoosting on the full training split and on its weighted
+    downsample; score both on the same full test split. Returns a comparison table.
+    """
+    from sklearn.metrics import average_precision_score, balanced_accuracy_score, log_loss, roc_auc_score
+    from sklearn.model_selection import train_test_split
+
+    from HistGradientBoosting import build_hgb_pipeline, feature_cols, prepare_features
+
+    dataset = ds.dataset(path, format="parquet")
+    date_col, _ = _columns(dataset, STRATA)
+    wanted = {"person_injury", "crash_time", date_col} | set(STRATA) | set(feature_cols)
+    full = pd.read_parquet(path, columns=[c for c in dataset.schema.names if c in wanted])
+    full["severe"] = _label(full)
+    full["stratum"] = _strata_frame(full, date_col, STRATA).astype(str).agg(" | ".join, axis=1)
+    full = prepare_features(full).dropna(subset=feature_cols).reset_index(drop=True)
+    train, test = train_test_split(full, test_size=test_size, random_state=seed, stratify=full["severe"])
+
+    # Downsample the training split with the same per-stratum rule
+    train_rates = train.groupby(["stratum", "severe"]).size().unstack("severe", fill_value=0)
+    train_rates = train_rates.reindex(columns=[0, 1], fill_value=0)
+    rate = np.minimum(1.0, majority_ratio * train_rates[1] / train_rates[0].clip(lower=1))
+    rate[train_rates[1] == 0] = min(1.0, 1.0 / majority_ratio)
+    row_rate = train["stratum"].map(rate).fillna(1.0).to_numpy()
+    u = _uniform_hash(train.index.to_numpy(), seed)
+    keep = (train["severe"].to_numpy() == 1) | (u < row_rate)
+    sampled = train[keep]
+    sampled_w = np.where(sampled["severe"] == 1, 1.0, 1.0 / row_rate[keep])
+
+    results = []
+    for name, data, weights in [("full", train, np.ones(len(train))), ("sampled", sampled, sampled_w)]:
+        pipeline = build_hgb_pipeline(class_weight=None)
+        t0 = time.perf_counter()
+        pipeline.fit(data[feature_cols], data["severe"],
+                     classifier__sample_weight=_balanced(data["severe"], weights))
+        fit_s = time.perf_counter() - t0
+        proba = pipeline.predict_proba(test[feature_cols])[:, 1]
+        results.append({
+            "training_set": name,
+            "train_rows": len(data),
+            "fit_seconds": fit_s,
+            "roc_auc": roc_auc_score(test["severe"], proba),
+            "average_precision": average_precision_score(test["severe"], proba),
+            "balanced_accuracy": balanced_accuracy_score(test["severe"], proba >= 0.5),
+            "log_loss": log_loss(test["severe"], np.clip(proba, 1e-7, 1 - 1e-7)),
+        })
+
+    table = pd.DataFrame(results).set_index("training_set")
+    loss = table.loc["full"] - table.loc["sampled"]
+    loss["train_rows"] = table.loc["full", "train_rows"] / table.loc["sampled", "train_rows"]
+    loss["fit_seconds"] = table.loc["full", "fit_seconds"] / table.loc["sampled", "fit_seconds"]
+    table.loc["full - sampled (rows, fit time as ratio)"] = loss
+    return table
+
+
+if __name__ == "__main__":
+    t0 = time.perf_counter()
+    sample, rates = load_sampled(file_path)
+    total = int(rates[["n_majority", "n_minority"]].to_numpy().sum())
+    print(f"Streamed {total:,} rows -> kept {len(sample):,} "
+          f"({total / max(len(sample), 1):.1f}x smaller) in {time.perf_counter() - t0:.1f}s")
+    print(f"Weighted row total: {sample['sample_weight'].sum():,.0f} (true {total:,})")
+
+    print("\nPer-stratum keep rates:")
+    print(rates.round(4).to_string())
+
+    check = weighted_rate_check(sample, rates)
+    print(f"\nWeighted severe-rate check: max abs error {check['abs_error'].max():.5f} "
+          f"across {len(check)} strata")
+
+    sample.to_parquet(output_path, index=False)
+    print("Saved:", output_path)
+
+    print("\nAccuracy cost of sampling (same full test split):")
+    print(evaluate_sampling_loss(file_path).round(4).to_string())
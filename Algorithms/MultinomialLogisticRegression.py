@@ -17,6 +17,10 @@ pd.set_option("display.max_colwidth", None)
 # ------------------------------------------------
 file_path = r"C:\Users\SooLim\OneDrive\CS504 007\schema_sentinel_last5yrs.parquet"
 
+# Sufficient-statistics fitting: "auto" (use whenever all predictors are
+# categorical), True (always) or False (one row per collision)
+SUFFICIENT_STATS = "auto"
+
 cols_needed = [
     "collision_id",
     "driver_license_status",
@@ -89,15 +93,46 @@ print(df_model["collision_severity"].value_counts().to_string())
 # ------------------------------------------------
 # 7. Build X and y
 # ------------------------------------------------
-X = df_model[["driver_license_status", "time_range_7"]].copy()
+predictors = ["driver_license_status", "time_range_7"]
+
+# With only categorical predictors there are just a few distinct covariate
+# patterns (3 license x 7 time ranges), so the likelihood only depends on the
+# count of each (pattern, outcome). Fitting on those counts as sample_weight
+# gives the same coefficients as fitting every collision row.
+all_categorical = not any(
+    pd.api.types.is_numeric_dtype(df_model[c]) for c in predictors
+)
+use_sufficient_stats = (
+    all_categorical if SUFFICIENT_STATS == "auto" else bool(SUFFICIENT_STATS)
+)
+
+if use_sufficient_stats:
+    fit_df = (
+        df_model
+        .groupby(predictors + ["collision_severity"], observed=True)
+        .size()
+        .reset_index(name="n_collisions")
+    )
+    print(f"\nSufficient-statistics mode: {len(df_model):,} collisions -> "
+          f"{len(fit_df):,} weighted (pattern, outcome) rows")
+else:
+    fit_df = df_model[predictors + ["collision_severity"]].copy()
+    fit_df["n_collisions"] = 1
 
 X = pd.get_dummies(
-    X,
-    columns=["driver_license_status", "time_range_7"],
+    fit_df[predictors],
+    columns=predictors,
     drop_first=True      # baseline: Licensed + Late Night
 )
 
-y = df_model["collision_severity"]
+y = fit_df["collision_severity"]
+n_collisions = fit_df["n_collisions"]
+
+# class_weight="balanced" computed from collision counts (not collapsed rows)
+# and folded into sample_weight, so both modes optimize the same objective
+class_counts = n_collisions.groupby(y).sum()
+class_weights = class_counts.sum() / (len(class_counts) * class_counts)
+sample_weight = n_collisions * y.map(class_weights)
 
 print("\nPredictor columns used in the model:")
 print(X.columns.tolist())
@@ -110,11 +145,10 @@ print(y.unique())
 mlr = LogisticRegression(
     multi_class="multinomial",
     solver="lbfgs",
-    max_iter=1000,
-    class_weight="balanced"
+    max_iter=1000
 )
 
-mlr.fit(X, y)
+mlr.fit(X, y, sample_weight=sample_weight)
 
 print("\nModel fit complete.")
 print("Classes (row order of coef_):", mlr.classes_)
@@ -140,7 +174,7 @@ print(odds_ratio_df.round(3).to_string())
 # ------------------------------------------------
 y_pred = mlr.predict(X)
 print("\nClassification report (in-sample, just for reference):")
-print(classification_report(y, y_pred))
+print(classification_report(y, y_pred, sample_weight=n_collisions))
 
 # ------------------------------------------------
 # 11. Heatmap: Driver License Status (baseline = Licensed)
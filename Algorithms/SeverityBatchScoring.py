@@ -0,0 +1,198 @@
+# ===============================
+# SEVERITY BATCH SCORING (persisted pipeline, chunked parallel scoring)
+# ===============================
+# Saves a fitted severity pipeline (preprocessing + model) once, then scores
+# any person-level parquet in fixed-size record batches across a worker pool
+# and writes the input rows back out with two extra columns:
+#
+#   severe_pred   predicted class (0/1)
+#   severe_proba  predicted probability of an injury/fatality
+#
+# The pipeline is saved uncompressed with joblib so workers load it with
+# mmap_mode="r": the large tree arrays are memory-mapped and shared through
+# the OS page cache instead of copied into every process.
+#
+# Usage:
+#   python SeverityBatchScoring.py train --data person_vehicle_weather.parquet --model severity_model.joblib
+#   python SeverityBatchScoring.py score --data person_vehicle_weather.parquet \
+#       --model severity_model.joblib --out person_vehicle_weather_scored.parquet
+#
+# The input needs the training columns (INPUT_COLUMNS); score raises when any
+# is missing, e.g. on schema_sentinel_integrated.parquet, where the builder
+# suffixes contributing_factor_1 with _person / _vehicle.
+
+import argparse
+import json
+import os
+import resource
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import joblib
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from HistGradientBoosting import build_hgb_pipeline, feature_cols, load_severity_data, prepare_features
+
+# -------------------------------
+# Configuration
+# -------------------------------
+MODEL_PATH = "severity_model.joblib"
+BATCH_ROWS = 250_000
+MAX_WORKERS = None            # None = all cores
+INPUT_COLUMNS = ["crash_time"] + [c for c in feature_cols if c != "hour"]
+
+
+def _peak_rss_mb(who=resource.RUSAGE_SELF):
+    """Peak RSS in MB for this process (RUSAGE_SELF) or its finished children (RUSAGE_CHILDREN)."""
+    peak = resource.getrusage(who).ru_maxrss
+    return peak / 1e6 if os.uname().sysname == "Darwin" else peak / 1e3
+
+
+# -------------------------------
+# Persistence
+# -------------------------------
+def save_pipeline(pipeline, path=MODEL_PATH, **metadata):
+    """Save the fitted pipeline uncompressed (mmap-able) plus a small JSON manifest."""
+    joblib.dump(pipeline, path, compress=0)
+    manifest = {
+        "feature_cols": feature_cols,
+        "classes": [int(c) for c in pipeline.classes_],
+        "saved_at": pd.Timestamp.now().isoformat(timespec="seconds"),
+        **metadata,
+    }
+    with open(path + ".json", "w") as f:
+        json.dump(manifest, f, indent=2)
+    return path
+
+
+def load_pipeline(path=MODEL_PATH, mmap_mode="r"):
+    """Load a saved pipeline; numpy arrays inside are memory-mapped when mmap_mode is set."""
+    return joblib.load(path, mmap_mode=mmap_mode)
+
+
+def score_frame(pipeline, df):
+    """Return (pred, proba) for a raw person-level frame (crash_time + feature columns)."""
+    X = prepare_features(df)[feature_cols]
+    proba = pipeline.predict_proba(X)[:, 1]
+    return (proba >= 0.5).astype(np.int8), proba.astype(np.float32)
+
+
+# -------------------------------
+# Worker side
+# -------------------------------
+_WORKER = {}
+
+
+def _init_worker(model_path):
+    from threadpoolctl import threadpool_limits
+    threadpool_limits(1)      # one core per worker; parallelism is across batches
+    _WORKER["pipeline"] = load_pipeline(model_path)
+
+
+def _score_batch(batch):
+    """Score one feature-only record batch inside a worker."""
+    return score_frame(_WORKER["pipeline"], batch.to_pandas())
+
+
+# -------------------------------
+# Chunked parallel scoring
+# -------------------------------
+def score_parquet(data_path, out_path, model_path=MODEL_PATH, batch_rows=BATCH_ROWS,
+                  max_workers=MAX_WORKERS):
+    """
+    Stream `data_path` in fixed-size record batches, score them in a worker
+    pool and write every input column plus severe_pred / severe_proba to
+    `out_path`, batch by batch and in input order. Returns a stats dict.
+    """
+    dataset = ds.dataset(data_path, format="parquet")
+    missing = [c for c in INPUT_COLUMNS if c not in dataset.schema.names]
+    if missing:
+        raise KeyError(f"{data_path} lacks the model's input columns {missing}; "
+                       f"score a file with the training schema (e.g. person_vehicle_weather.parquet)")
+    out_schema = dataset.schema.append(pa.field("severe_pred", pa.int8())) \
+                               .append(pa.field("severe_proba", pa.float32()))
+
+    max_workers = max_workers or os.cpu_count()
+    in_flight = deque()
+    n_rows, n_batches = 0, 0
+    t0, c0 = time.perf_counter(), time.process_time()
+
+    def _write_oldest(writer):
+        batch, future = in_flight.popleft()
+        pred, proba = future.result()
+        writer.write_batch(pa.RecordBatch.from_arrays(
+            batch.columns + [pa.array(pred), pa.array(proba)], schema=out_schema
+        ))
+
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                             initargs=(model_path,)) as pool, \
+            pq.ParquetWriter(out_path, out_schema, compression="zstd") as writer:
+        for batch in dataset.to_batches(batch_size=batch_rows):
+            if batch.num_rows == 0:
+                continue
+            # Only the feature columns travel to the worker; full rows stay here
+            future = pool.submit(_score_batch, batch.select(INPUT_COLUMNS))
+            in_flight.append((batch, future))
+            n_rows += batch.num_rows
+            n_batches += 1
+            # Bound memory: at most two batches per worker waiting
+            while len(in_flight) >= 2 * max_workers:
+                _write_oldest(writer)
+        while in_flight:
+            _write_oldest(writer)
+
+    seconds = time.perf_counter() - t0
+    return {
+        "rows": n_rows,
+        "batches": n_batches,
+        "workers": max_workers,
+        "seconds": seconds,
+        "rows_per_s": n_rows / seconds if seconds > 0 else float("nan"),
+        "parent_cpu_s": time.process_time() - c0,
+        "peak_rss_parent_mb": _peak_rss_mb(resource.RUSAGE_SELF),
+        "peak_rss_worker_mb": _peak_rss_mb(resource.RUSAGE_CHILDREN),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train/save or batch-score the severity model.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    train = sub.add_parser("train", help="fit the HistGradientBoosting pipeline on all rows and save it")
+    train.add_argument("--data", default="person_vehicle_weather.parquet")
+    train.add_argument("--model", default=MODEL_PATH)
+
+    score = sub.add_parser("score", help="score a parquet file/directory in record batches")
+    score.add_argument("--data", required=True)
+    score.add_argument("--out", required=True)
+    score.add_argument("--model", default=MODEL_PATH)
+    score.add_argument("--batch-rows", type=int, default=BATCH_ROWS)
+    score.add_argument("--workers", type=int, default=MAX_WORKERS)
+
+    args = parser.parse_args()
+
+    if args.command == "train":
+        X, y = load_severity_data(args.data)
+        t0 = time.perf_counter()
+        pipeline = build_hgb_pipeline().fit(X, y)
+        print(f"Trained on {len(X):,} rows in {time.perf_counter() - t0:.1f}s")
+        save_pipeline(pipeline, args.model, trained_on=os.path.abspath(args.data), n_rows=len(X))
+        print(f"Saved pipeline: {args.model} ({os.path.getsize(args.model) / 1e6:.1f} MB)")
+    else:
+        stats = score_parquet(args.data, args.out, model_path=args.model,
+                              batch_rows=args.batch_rows, max_workers=args.workers)
+        print(f"Scored {stats['rows']:,} rows in {stats['batches']} batches with "
+              f"{stats['workers']} workers: {stats['seconds']:.1f}s "
+              f"({stats['rows_per_s']:,.0f} rows/s)")
+        print(f"Peak RSS: parent {stats['peak_rss_parent_mb']:.0f} MB, "
+              f"largest worker {stats['peak_rss_worker_mb']:.0f} MB")
+        print("Saved:", args.out)
+
+
+if __name__ == "__main__":
+    main()
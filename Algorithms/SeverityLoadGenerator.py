@@ -0,0 +1,125 @@
+# ===============================
+# LOAD GENERATOR for SeverityScoringService.py
+# ===============================
+# Closed-loop benchmark: N client threads each keep one keep-alive connection
+# and send single-collision /predict requests back to back for a fixed time.
+# Reports client-side p50/p90/p99 latency and throughput, then prints the
+# server's own /metrics for comparison. Standard library only (payload rows
+# are read from a parquet with pandas when --data is given).
+#
+# Usage:
+#   python SeverityLoadGenerator.py --url http://127.0.0.1:8765 --clients 32 --seconds 30
+
+import argparse
+import http.client
+import json
+import random
+import statistics
+import threading
+import time
+from urllib.parse import urlparse
+
+# -------------------------------
+# Configuration
+# -------------------------------
+URL = "http://127.0.0.1:8765"
+CLIENTS = 16
+SECONDS = 20.0
+ROWS_PER_REQUEST = 1
+
+# Same row the service warms up with (kept here so the generator needs no pandas)
+BASE_ROW = {
+    "crash_time": "8:30",
+    "driver_license_status": "Licensed",
+    "vehicle_type": "Sedan",
+    "person_age": 35,
+    "person_sex": "M",
+    "weather_condition": "Clear",
+    "borough": "BROOKLYN",
+    "contributing_factor_1": "Unspecified",
+}
+
+
+def sample_payloads(data_path=None, n=5_000, seed=42):
+    """Rows to send: real rows from a parquet if given, else jittered copies of BASE_ROW."""
+    rng = random.Random(seed)
+    if data_path:
+        import pandas as pd
+        from SeverityBatchScoring import INPUT_COLUMNS
+        df = pd.read_parquet(data_path, columns=INPUT_COLUMNS).sample(frac=1.0, random_state=seed).head(n)
+        return json.loads(df.to_json(orient="records"))
+    rows = []
+    for _ in range(n):
+        row = dict(BASE_ROW)
+        row["person_age"] = rng.randint(16, 90)
+        row["crash_time"] = f"{rng.randint(0, 23)}:{rng.randint(0, 59):02d}"
+        row["borough"] = rng.choice(["BROOKLYN", "QUEENS", "MANHATTAN", "BRONX", "STATEN ISLAND"])
+        rows.append(row)
+    return rows
+
+
+def _client(host, port, payloads, rows_per_request, stop_at, latencies, errors, seed):
+    rng = random.Random(seed)
+    conn = http.client.HTTPConnection(host, port, timeout=30)
+    headers = {"Content-Type": "application/json"}
+    while time.perf_counter() < stop_at:
+        body = json.dumps([rng.choice(payloads) for _ in range(rows_per_request)])
+        t0 = time.perf_counter()
+        try:
+            conn.request("POST", "/predict", body=body, headers=headers)
+            response = conn.getresponse()
+            response.read()
+            if response.status != 200:
+                errors.append(response.status)
+                continue
+        except (OSError, http.client.HTTPException) as exc:
+            errors.append(type(exc).__name__)
+            conn.close()
+            conn = http.client.HTTPConnection(host, port, timeout=30)
+            continue
+        latencies.append(time.perf_counter() - t0)
+    conn.close()
+
+
+def run(url=URL, clients=CLIENTS, seconds=SECONDS, rows_per_request=ROWS_PER_REQUEST, data_path=None):
+    target = urlparse(url)
+    payloads = sample_payloads(data_path)
+    latencies, errors = [], []   # list.append is atomic under the GIL
+
+    stop_at = time.perf_counter() + seconds
+    threads = [
+        threading.Thread(target=_client, args=(target.hostname, target.port, payloads, rows_per_request,
+                                               stop_at, latencies, errors, i))
+        for i in range(clients)
+    ]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t0
+
+    print(f"=== Client side: {clients} clients x {seconds:.0f}s, {rows_per_request} row(s)/request ===")
+    print(f"Requests: {len(latencies):,}  errors: {len(errors):,}")
+    if latencies:
+        ms = sorted(x * 1000 for x in latencies)
+        q = statistics.quantiles(ms, n=100)
+        print(f"Throughput: {len(ms) / elapsed:,.0f} req/s  ({len(ms) * rows_per_request / elapsed:,.0f} rows/s)")
+        print(f"Latency ms: p50 {q[49]:.2f}  p90 {q[89]:.2f}  p99 {q[98]:.2f}  max {ms[-1]:.2f}")
+
+    conn = http.client.HTTPConnection(target.hostname, target.port, timeout=10)
+    conn.request("GET", "/metrics")
+    print("\n=== Server /metrics ===")
+    print(json.dumps(json.loads(conn.getresponse().read()), indent=2))
+    conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the local severity scoring service.")
+    parser.add_argument("--url", default=URL)
+    parser.add_argument("--clients", type=int, default=CLIENTS)
+    parser.add_argument("--seconds", type=float, default=SECONDS)
+    parser.add_argument("--rows-per-request", type=int, default=ROWS_PER_REQUEST)
+    parser.add_argument("--data", default=None, help="parquet to sample request rows from")
+    args = parser.parse_args()
+    run(args.url, args.clients, args.seconds, args.rows_per_request, args.data)
@@ -0,0 +1,250 @@
+# ===============================
+# SEVERITY SCORING SERVICE (local HTTP, micro-batched)
+# ===============================
+# Serves per-collision severity predictions for the triage dashboard using
+# only the standard library HTTP server. The pipeline saved by
+# SeverityBatchScoring.py is loaded once and kept warm; concurrent requests
+# are queued and coalesced into micro-batches (up to MAX_BATCH rows or
+# MAX_WAIT_MS of waiting) so the model predicts vectorized instead of row by row.
+#
+# Endpoints:
+#   POST /predict   body: one JSON object or a list of objects with the raw
+#                   feature columns (crash_time, driver_license_status, ...);
+#                   every column must be present (null = unknown), else 400
+#                   -> {"predictions": [{"severe_pred": 0, "severe_proba": 0.12}, ...]}
+#   GET  /metrics   p50/p90/p99 latency, throughput, batch sizes
+#   GET  /health
+#
+# Usage:
+#   python SeverityScoringService.py --model severity_model.joblib --port 8765
+#   python SeverityLoadGenerator.py --url http://127.0.0.1:8765 --clients 32 --seconds 30
+
+import argparse
+import json
+import queue
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+
+from SeverityBatchScoring import INPUT_COLUMNS, MODEL_PATH, load_pipeline, score_frame
+
+# -------------------------------
+# Configuration
+# -------------------------------
+HOST = "127.0.0.1"
+PORT = 8765
+MAX_BATCH = 512            # rows per model call
+MAX_WAIT_MS = 2.0          # how long the first request in a batch may wait for company
+LATENCY_WINDOW = 20_000    # recent requests kept for percentile metrics
+
+WARMUP_ROW = {
+    "crash_time": "8:30",
+    "driver_license_status": "Licensed",
+    "vehicle_type": "Sedan",
+    "person_age": 35,
+    "person_sex": "M",
+    "weather_condition": "Clear",
+    "borough": "BROOKLYN",
+    "contributing_factor_1": "Unspecified",
+}
+
+
+class _Pending:
+    """One queued request: its rows and a slot for the result."""
+    __slots__ = ("rows", "enqueued", "done", "result", "error")
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.enqueued = time.perf_counter()
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class MicroBatcher:
+    """Background thread that coalesces queued requests into one predict call."""
+
+    def __init__(self, pipeline, max_batch=MAX_BATCH, max_wait_ms=MAX_WAIT_MS):
+        self.pipeline = pipeline
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=LATENCY_WINDOW)   # (finished_at, seconds)
+        self._batch_sizes = deque(maxlen=LATENCY_WINDOW)
+        self.requests = 0
+        self.rows = 0
+        self.started = time.perf_counter()
+        threading.Thread(target=self._run, name="micro-batcher", daemon=True).start()
+
+    def predict(self, rows, timeout=30.0):
+        """Called from request threads; blocks until this request's batch is scored."""
+        pending = _Pending(rows)
+        self._queue.put(pending)
+        if not pending.done.wait(timeout):
+            raise TimeoutError("prediction timed out")
+        if pending.error is not None:
+            raise pending.error
+        return pending.result
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            n_rows = len(batch[0].rows)
+            deadline = time.perf_counter() + self.max_wait
+            while n_rows < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                batch.append(item)
+                n_rows += len(item.rows)
+            self._score(batch, n_rows)
+
+    def _predict(self, rows):
+        pred, proba = score_frame(self.pipeline, pd.DataFrame(rows))
+        return [{"severe_pred": int(p), "severe_proba": round(float(q), 6)} for p, q in zip(pred, proba)]
+
+    def _score(self, batch, n_rows):
+        try:
+            results = self._predict([row for item in batch for row in item.rows])
+            start = 0
+            for item in batch:
+                item.result = results[start:start + len(item.rows)]
+                start += len(item.rows)
+        except Exception:
+            # One bad request must not fail the rest of the batch: rescore each on its own
+            for item in batch:
+                try:
+                    item.result = self._predict(item.rows)
+                except Exception as exc:
+                    item.error = exc
+
+        now = time.perf_counter()
+        for item in batch:
+            item.done.set()
+        scored = [item for item in batch if item.error is None]
+
+        with self._lock:
+            self._latencies.extend((now, now - item.enqueued) for item in scored)
+            self._batch_sizes.append(n_rows)
+            self.requests += len(scored)
+            self.rows += sum(len(item.rows) for item in scored)
+
+    def metrics(self):
+        """Latency percentiles (ms) and throughput over the recent window."""
+        with self._lock:
+            lat = np.array([s for _, s in self._latencies]) * 1000.0
+            times = [t for t, _ in self._latencies]
+            sizes = np.array(self._batch_sizes)
+            requests, rows = self.requests, self.rows
+
+        out = {
+            "requests_total": requests,
+            "rows_total": rows,
+            "uptime_s": round(time.perf_counter() - self.started, 1),
+            "queue_depth": self._queue.qsize(),
+        }
+        if len(lat):
+            window = max(times[-1] - times[0], 1e-9)
+            out.update({
+                "latency_ms_p50": round(float(np.percentile(lat, 50)), 3),
+                "latency_ms_p90": round(float(np.percentile(lat, 90)), 3),
+                "latency_ms_p99": round(float(np.percentile(lat, 99)), 3),
+                "latency_ms_max": round(float(lat.max()), 3),
+                "throughput_req_per_s": round(len(lat) / window, 1) if len(lat) > 1 else None,
+                "batch_size_mean": round(float(sizes.mean()), 2),
+                "batch_size_max": int(sizes.max()),
+                "window_requests": len(lat),
+            })
+        return out
+
+
+def make_handler(batcher):
+    """Request handler class bound to one MicroBatcher."""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"      # keep-alive for the load generator
+
+        def _send(self, status, payload):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == "/metrics":
+                self._send(200, batcher.metrics())
+            elif self.path == "/health":
+                self._send(200, {"status": "ok"})
+            else:
+                self._send(404, {"error": "not found"})
+
+        def do_POST(self):
+            if self.path != "/predict":
+                self._send(404, {"error": "not found"})
+                return
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                payload = json.loads(self.rfile.read(length) or b"null")
+                rows = payload if isinstance(payload, list) else [payload]
+                if not rows or not all(isinstance(r, dict) for r in rows):
+                    raise ValueError("body must be a JSON object or a non-empty list of objects")
+                # null values are fine (scored as missing); an absent key would silently score as missing
+                missing = sorted({c for r in rows for c in INPUT_COLUMNS if c not in r})
+                if missing:
+                    raise ValueError(f"rows lack feature columns {missing} (send null for unknown values)")
+            except (ValueError, json.JSONDecodeError) as exc:
+                self._send(400, {"error": str(exc)})
+                return
+            try:
+                self._send(200, {"predictions": batcher.predict(rows)})
+            except Exception as exc:
+                self._send(500, {"error": f"{type(exc).__name__}: {exc}"})
+
+        def log_message(self, format, *args):
+            pass   # per-request logging would dominate latency
+
+    return Handler
+
+
+def serve(model_path=MODEL_PATH, host=HOST, port=PORT, max_batch=MAX_BATCH, max_wait_ms=MAX_WAIT_MS):
+    pipeline = load_pipeline(model_path)
+    batcher = MicroBatcher(pipeline, max_batch=max_batch, max_wait_ms=max_wait_ms)
+
+    # Warm up: first predict call pays for lazy initialization
+    t0 = time.perf_counter()
+    batcher.predict([WARMUP_ROW] * 8)
+    print(f"Model loaded and warm ({(time.perf_counter() - t0) * 1000:.1f} ms warm-up call)")
+
+    server = ThreadingHTTPServer((host, port), make_handler(batcher))
+    server.daemon_threads = True
+    print(f"Serving severity predictions on http://{host}:{port}  "
+          f"(max_batch={max_batch}, max_wait_ms={max_wait_ms})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(json.dumps(batcher.metrics(), indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local micro-batched severity scoring service.")
+    parser.add_argument("--model", default=MODEL_PATH)
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--max-batch", type=int, default=MAX_BATCH)
+    parser.add_argument("--max-wait-ms", type=float, default=MAX_WAIT_MS)
+    args = parser.parse_args()
+    serve(args.model, args.host, args.port, args.max_batch, args.max_wait_ms)
@@ -0,0 +1,268 @@
+# ===============================
+# SEVERITY MODEL TUNING (successive halving, parallel trials)
+# ===============================
+# "random forest.py" trains one hard-coded configuration. This harness runs a
+# randomized successive-halving search over the random forest and the
+# histogram gradient boosting pipelines:
+#
+#   rung 0: many sampled configurations on a small stratified subsample
+#   rung k: the best 1/FACTOR of them on FACTOR x more rows
+#
+# Every (configuration, CV fold) is one trial executed in a process pool, with
+# stratified K-fold CV (severe outcomes are rare). Each trial records fit time,
+# score time and metrics, so the final table can be read as an accuracy /
+# latency frontier. Timings are taken with tracemalloc off (tracing slows
+# allocation-heavy fits); peak memory comes from a separate traced refit on the
+# first fold of each candidate.
+
+import os
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from sklearn.compose import ColumnTransformer
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import average_precision_score, balanced_accuracy_score, f1_score, roc_auc_score
+from sklearn.model_selection import StratifiedKFold, train_test_split
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder
+
+from HistGradientBoosting import (
+    build_hgb_pipeline,
+    categorical_features,
+    load_severity_data,
+    numeric_features,
+)
+
+# -------------------------------
+# Configuration
+# -------------------------------
+file_path = "person_vehicle_weather.parquet"
+output_path = "severity_tuning_trials.csv"
+
+N_CANDIDATES = 24          # configurations sampled per model family
+MIN_RESOURCES = 20_000     # rows in the first rung
+FACTOR = 3                 # keep top 1/FACTOR, grow rows by FACTOR
+CV_FOLDS = 3
+PRIMARY_METRIC = "average_precision"
+MAX_WORKERS = None         # None = all cores
+RANDOM_STATE = 42
+TRACE_MEMORY = True        # extra traced fit on fold 0 per candidate for peak_mem_mb
+
+SEARCH_SPACES = {
+    "random_forest": {
+        "n_estimators": [50, 100, 200, 400],
+        "max_depth": [8, 12, 16, 20, None],
+        "min_samples_leaf": [1, 5, 20, 50],
+        "max_features": ["sqrt", 0.1, 0.3],
+    },
+    "hist_gradient_boosting": {
+        "learning_rate": [0.03, 0.05, 0.1, 0.2],
+        "max_leaf_nodes": [15, 31, 63, 127, 255],
+        "min_samples_leaf": [20, 100, 500],
+        "l2_regularization": [0.0, 0.1, 1.0, 10.0],
+        "max_features": [0.5, 0.8, 1.0],
+    },
+}
+
+
+def build_rf_pipeline(**params):
+    """Same preprocessing and class weighting as random forest.py, with tunable forest params."""
+    preprocessor = ColumnTransformer(
+        transformers=[
+            ("cat", OneHotEncoder(handle_unknown="ignore"), categorical_features),
+            ("num", "passthrough", numeric_features)
+        ]
+    )
+    rf_params = dict(n_estimators=200, max_depth=20, class_weight="balanced", random_state=42, n_jobs=1)
+    rf_params.update(params)
+    return Pipeline(steps=[
+        ("preprocessor", preprocessor),
+        ("classifier", RandomForestClassifier(**rf_params))
+    ])
+
+
+BUILDERS = {
+    "random_forest": build_rf_pipeline,
+    "hist_gradient_boosting": build_hgb_pipeline,
+}
+
+
+def sample_candidates(model, n, rng):
+    """Draw n distinct random configurations from the model's search space."""
+    space = SEARCH_SPACES[model]
+    seen, candidates = set(), []
+    for _ in range(n * 20):
+        params = {k: v[rng.integers(len(v))] for k, v in space.items()}
+        key = tuple(sorted((k, str(v)) for k, v in params.items()))
+        if key not in seen:
+            seen.add(key)
+            candidates.append(params)
+        if len(candidates) == n:
+            break
+    return candidates
+
+
+# -------------------------------
+# Worker side: data is shipped once per process, tasks carry row positions
+# -------------------------------
+_WORKER_DATA = {}
+
+
+def _init_worker(X, y):
+    _WORKER_DATA["X"] = X
+    _WORKER_DATA["y"] = y
+    # Parallelism is across trials; keep each model single-threaded
+    from threadpoolctl import threadpool_limits
+    threadpool_limits(1)
+
+
+def _peak_traced_mb(model, params, X_train, y_train, X_test):
+    """Peak Python-allocated memory (MB) of a fit + predict, measured in its own traced pass."""
+    tracemalloc.start()
+    try:
+        pipeline = BUILDERS[model](**params)
+        pipeline.fit(X_train, y_train)
+        pipeline.predict_proba(X_test)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak / 1e6
+
+
+def _run_trial(task):
+    """Fit one configuration on one fold; returns a dict of timings and metrics."""
+    model, params, train_idx, test_idx, trace_memory = task
+    X, y = _WORKER_DATA["X"], _WORKER_DATA["y"]
+    X_train, y_train = X.iloc[train_idx], y.iloc[train_idx]
+    X_test, y_test = X.iloc[test_idx], y.iloc[test_idx]
+
+    t0, c0 = time.perf_counter(), time.process_time()
+    pipeline = BUILDERS[model](**params)
+    pipeline.fit(X_train, y_train)
+    fit_time, fit_cpu = time.perf_counter() - t0, time.process_time() - c0
+
+    t0 = time.perf_counter()
+    proba = pipeline.predict_proba(X_test)[:, 1]
+    score_time = time.perf_counter() - t0
+
+    peak_mb = _peak_traced_mb(model, params, X_train, y_train, X_test) if trace_memory else np.nan
+    pred = (proba >= 0.5).astype(int)
+    return {
+        "fit_time_s": fit_time,
+        "fit_cpu_s": fit_cpu,
+        "score_time_s": score_time,
+        "predict_rows_per_s": len(test_idx) / score_time if score_time > 0 else np.nan,
+        "peak_mem_mb": peak_mb,
+        "balanced_accuracy": balanced_accuracy_score(y_test, pred),
+        "f1_severe": f1_score(y_test, pred, zero_division=0),
+        "roc_auc": roc_auc_score(y_test, proba),
+        "average_precision": average_precision_score(y_test, proba),
+    }
+
+
+# -------------------------------
+# Successive halving driver
+# -------------------------------
+def successive_halving(X, y, models=tuple(SEARCH_SPACES), n_candidates=N_CANDIDATES,
+                       min_resources=MIN_RESOURCES, factor=FACTOR, cv_folds=CV_FOLDS,
+                       metric=PRIMARY_METRIC, max_workers=MAX_WORKERS, random_state=RANDOM_STATE,
+                       trace_memory=TRACE_MEMORY):
+    """
+    Run randomized successive halving for every model family and return the
+    per-trial table (one row per configuration x rung x fold).
+    """
+    rng = np.random.default_rng(random_state)
+    X = X.reset_index(drop=True)
+    y = y.reset_index(drop=True)
+
+    candidates = []
+    for model in models:
+        for params in sample_candidates(model, n_candidates, rng):
+            candidates.append({"candidate": len(candidates), "model": model, "params": params})
+
+    trials = []
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker, initargs=(X, y)) as pool:
+        n_rows, rung = min_resources, 0
+        while candidates:
+            n_rows = min(n_rows, len(X))
+            if n_rows < len(X):
+                rows, _ = train_test_split(np.arange(len(X)), train_size=n_rows,
+                                           stratify=y, random_state=random_state + rung)
+            else:
+                rows = np.arange(len(X))
+            folds = list(StratifiedKFold(cv_folds, shuffle=True, random_state=random_state)
+                         .split(rows, y.iloc[rows]))
+
+            tasks, meta = [], []
+            for cand in candidates:
+                for f, (tr, te) in enumerate(folds):
+                    tasks.append((cand["model"], cand["params"], rows[tr], rows[te], trace_memory and f == 0))
+                    meta.append({"rung": rung, "n_samples": n_rows, "fold": f,
+                                 "candidate": cand["candidate"], "model": cand["model"],
+                                 "params": str(cand["params"])})
+
+            t0 = time.perf_counter()
+            for m, result in zip(meta, pool.map(_run_trial, tasks)):
+                trials.append({**m, **result})
+            rung_table = pd.DataFrame(trials)
+            rung_table = rung_table[rung_table["rung"] == rung]
+            print(f"Rung {rung}: {len(candidates):>3} candidates x {cv_folds} folds on "
+                  f"{n_rows:,} rows in {time.perf_counter() - t0:.1f}s")
+
+            if n_rows >= len(X) or len(candidates) <= 1:
+                break
+            scores = rung_table.groupby("candidate")[metric].mean()
+            keep = set(scores.sort_values(ascending=False).index[:max(1, len(candidates) // factor)])
+            candidates = [c for c in candidates if c["candidate"] in keep]
+            n_rows *= factor
+            rung += 1
+
+    return pd.DataFrame(trials)
+
+
+def summarize(trials, metric=PRIMARY_METRIC):
+    """Mean over folds per (candidate, rung) plus a Pareto flag on (metric, fit time) within each rung."""
+    summary = (
+        trials.groupby(["rung", "n_samples", "candidate", "model", "params"])
+        .agg(**{
+            metric: (metric, "mean"),
+            "roc_auc": ("roc_auc", "mean"),
+            "balanced_accuracy": ("balanced_accuracy", "mean"),
+            "fit_time_s": ("fit_time_s", "mean"),
+            "predict_rows_per_s": ("predict_rows_per_s", "mean"),
+            "peak_mem_mb": ("peak_mem_mb", "max"),
+        })
+        .reset_index()
+    )
+
+    summary["pareto"] = False
+    for _, grp in summary.groupby("rung"):
+        grp = grp.sort_values(["fit_time_s", metric], ascending=[True, False])
+        best = -np.inf
+        for i, row in grp.iterrows():
+            if row[metric] > best:
+                summary.loc[i, "pareto"] = True
+                best = row[metric]
+    return summary.sort_values(["rung", metric], ascending=[False, False])
+
+
+if __name__ == "__main__":
+    X, y = load_severity_data(file_path)
+    print(f"Rows: {len(X):,}  severe rate: {y.mean():.3%}  cores: {os.cpu_count()}")
+
+    trials = successive_halving(X, y)
+    trials.to_csv(output_path, index=False)
+    print("Saved per-trial results:", output_path)
+
+    summary = summarize(trials)
+    top_rung = summary["rung"].max()
+    print(f"\n=== Final rung ({summary.loc[summary['rung'] == top_rung, 'n_samples'].iloc[0]:,} rows) ===")
+    print(summary[summary["rung"] == top_rung].drop(columns=["rung"]).to_string(index=False))
+
+    print("\n=== Accuracy / latency frontier (all rungs) ===")
+    print(summary[summary["pareto"]][
+        ["rung", "n_samples", "model", PRIMARY_METRIC, "fit_time_s", "predict_rows_per_s", "peak_mem_mb", "params"]
+    ].to_string(index=False))
@@ -0,0 +1,371 @@
+"""
+Stratified Poisson / negative-binomial batch fitting
+----------------------------------------------------
+PoissonRegression.py fits one GLM (crash_count ~ PRCP) on citywide daily
+totals, and its dispersion check points to overdispersion. This module fits
+Poisson AND negative-binomial (NB2) count models for many strata at once
+(borough x weather_condition x time range) and several feature sets.
+
+- Daily counts for every stratum come from one group-by over the
+  collision-level table.
+- Every stratum's daily design matrix is padded into one (S, N, p) array and
+  fitted together with vectorized IRLS (batched X'WX solves), so 100+ strata
+  cost about as much as a handful of statsmodels fits.
+- Strata that do not converge fall back to statsmodels GLM in a process pool.
+
+Output: one table with coefficients, standard errors, alpha, dispersion
+(deviance / df_resid, as in PoissonRegression.py), Pearson chi2, log-likelihood
+and AIC for every (feature_set, family, stratum).
+"""
+
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy.special import gammaln
+
+# ---------------------------------
+# Configuration
+# ---------------------------------
+file_path = "schema_sentinel_last5yrs.parquet"
+output_path = "stratified_count_models.parquet"
+
+STRATA = ["borough", "weather_condition", "time_range_7"]
+
+FEATURE_SETS = {
+    "prcp": ["PRCP"],
+    "prcp_snow_tmax": ["PRCP", "SNOW", "TMAX"],
+    "prcp_weekend": ["PRCP", "weekend"],
+}
+
+FAMILIES = ["poisson", "negbin"]
+
+MIN_DAYS = 30              # strata with fewer usable days are not fitted
+MAX_ITER = 50
+TOL = 1e-8
+
+DATE_CANDIDATES = ["crash_date_vehicle", "crash_date_x", "crash_date_person", "crash_date"]
+WEATHER_COLS = ["PRCP", "SNOW", "TMAX", "TMIN"]
+
+# 7 time-of-day ranges used across the project
+TIME_BINS = [0, 4, 7, 10, 16, 19, 22, 24]
+TIME_LABELS = [
+    "Late Night (00:00–03:59)",
+    "Early Morning (04:00–06:59)",
+    "AM Peak (07:00–09:59)",
+    "Midday (10:00–15:59)",
+    "PM Peak (16:00–18:59)",
+    "Evening (19:00–21:59)",
+    "Late Evening (22:00–23:59)",
+]
+
+
+# ---------------------------------
+# 1. Collision-level table
+# ---------------------------------
+def load_collision_level(path):
+    """One row per collision with date, strata columns and daily weather."""
+    import pyarrow.parquet as pq
+
+    available = pq.read_schema(path).names
+    date_col = next((c for c in DATE_CANDIDATES if c in available), None)
+    if date_col is None:
+        raise KeyError(f"No crash date column found. Tried: {DATE_CANDIDATES}")
+    wanted = ["collision_id", date_col, "crash_time", "borough", "weather_condition"] + WEATHER_COLS
+    df = pd.read_parquet(path, columns=[c for c in wanted if c in available])
+    df = df.drop_duplicates(subset="collision_id", keep="first")
+
+    df["crash_date"] = pd.to_datetime(df[date_col], errors="coerce").dt.normalize()
+    if "crash_time" in df.columns:
+        hour = pd.to_datetime(df["crash_time"].astype(str).str.strip(), format="%H:%M", errors="coerce").dt.hour
+        df["time_range_7"] = pd.cut(hour, bins=TIME_BINS, right=False, labels=TIME_LABELS)
+    return df.dropna(subset=["crash_date"])
+
+
+# ---------------------------------
+# 2. Daily counts per stratum + daily covariates
+# ---------------------------------
+def build_daily_designs(df, strata=STRATA):
+    """
+    Return (counts, days):
+    - counts: long frame (strata..., crash_date, crash_count) including
+      zero-count days of each stratum
+    - days: one row per calendar day with weather covariates and `weekend`
+    """
+    strata = [s for s in strata if s in df.columns]
+
+    day_cols = [c for c in WEATHER_COLS + ["weather_condition"] if c in df.columns]
+    days = df.groupby("crash_date")[day_cols].first()
+    days["weekend"] = (days.index.dayofweek >= 5).astype(float)
+
+    keyed = df.dropna(subset=strata)
+    counts = (
+        keyed.groupby(strata + ["crash_date"], observed=True)
+        .size()
+        .rename("crash_count")
+        .reset_index()
+    )
+
+    # Zero-fill: every stratum gets every day on which it could occur. Weather
+    # is a day-level attribute, so a weather stratum only spans its own days.
+    day_level = [s for s in strata if s == "weather_condition"]
+    within_day = [s for s in strata if s not in day_level]
+    combos = counts[strata].drop_duplicates()
+    day_frame = days.reset_index()[["crash_date"] + day_level]
+    if day_level:
+        grid = combos.merge(day_frame, on=day_level, how="inner")
+    else:
+        grid = combos.merge(day_frame, how="cross")
+    counts = grid.merge(counts, on=strata + ["crash_date"], how="left")
+    counts["crash_count"] = counts["crash_count"].fillna(0.0)
+    return counts, days.drop(columns=[c for c in ["weather_condition"] if c in days.columns])
+
+
+def _pad_designs(counts, days, strata, features):
+    """Stack every stratum into padded arrays: X (S, N, p), y (S, N), mask (S, N)."""
+    data = counts.merge(days[features], left_on="crash_date", right_index=True, how="left")
+    data = data.dropna(subset=features)
+    groups = data.groupby(strata, observed=True, sort=True)
+
+    sizes = groups.size()
+    sizes = sizes[sizes >= MIN_DAYS]
+    keys = list(sizes.index)
+    S, N, p = len(keys), int(sizes.max()) if len(sizes) else 0, len(features) + 1
+
+    X = np.zeros((S, N, p))
+    y = np.zeros((S, N))
+    mask = np.zeros((S, N))
+    for s, key in enumerate(keys):
+        g = groups.get_group(key if isinstance(key, tuple) else (key,))
+        n = len(g)
+        X[s, :n, 0] = 1.0
+        X[s, :n, 1:] = g[features].to_numpy(dtype=float)
+        y[s, :n] = g["crash_count"].to_numpy(dtype=float)
+        mask[s, :n] = 1.0
+    return keys, X, y, mask
+
+
+# ---------------------------------
+# 3. Vectorized IRLS
+# ---------------------------------
+def _irls(X, y, mask, alpha=None, beta=None, max_iter=MAX_ITER, tol=TOL):
+    """
+    Batched IRLS for log-link Poisson (alpha None) or NB2 with fixed per-stratum alpha.
+    Returns beta (S, p), mu (S, N), XtWX (S, p, p), iterations (S,), converged (S,).
+    """
+    S, N, p = X.shape
+    n_obs = mask.sum(axis=1)
+
+    # Columns with no variation in a stratum (e.g. PRCP on Clear days) are not identifiable
+    mean = (X * mask[..., None]).sum(axis=1) / np.maximum(n_obs, 1)[:, None]
+    var = (((X - mean[:, None, :]) ** 2) * mask[..., None]).sum(axis=1)
+    dropped = var < 1e-12
+    dropped[:, 0] = False
+    Xf = np.where(dropped[:, None, :], 0.0, X)
+
+    if beta is None:
+        beta = np.zeros((S, p))
+        beta[:, 0] = np.log(np.maximum((y * mask).sum(axis=1) / np.maximum(n_obs, 1), 1e-8))
+    iterations = np.zeros(S, dtype=int)
+    converged = np.zeros(S, dtype=bool)
+    a = np.zeros(S) if alpha is None else np.asarray(alpha, dtype=float)
+
+    for it in range(1, max_iter + 1):
+        active = ~converged
+        eta = np.einsum("snp,sp->sn", Xf, beta)
+        mu = np.exp(np.clip(eta, -30, 30))
+        w = mask * mu / (1.0 + a[:, None] * mu)
+        z = eta + (y - mu) / mu
+        XtW = Xf.transpose(0, 2, 1) * w[:, None, :]
+        XtWX = XtW @ Xf + np.eye(p)[None] * dropped[:, None, :]
+        XtWz = np.einsum("spn,sn->sp", XtW, z)
+        try:
+            new_beta = np.linalg.solve(XtWX, XtWz[..., None])[..., 0]
+        except np.linalg.LinAlgError:
+            new_beta = np.einsum("spq,sq->sp", np.linalg.pinv(XtWX), XtWz)
+
+        step = np.abs(new_beta - beta).max(axis=1)
+        beta = np.where(active[:, None], new_beta, beta)
+        iterations[active] = it
+        converged |= step < tol * (1.0 + np.abs(beta).max(axis=1))
+        if converged.all():
+            break
+
+    eta = np.einsum("snp,sp->sn", Xf, beta)
+    mu = np.exp(np.clip(eta, -30, 30))
+    w = mask * mu / (1.0 + a[:, None] * mu)
+    XtWX = (Xf.transpose(0, 2, 1) * w[:, None, :]) @ Xf + np.eye(p)[None] * dropped[:, None, :]
+    converged &= np.isfinite(beta).all(axis=1)
+    beta = np.where(dropped, np.nan, beta)
+    return beta, mu, XtWX, iterations, converged, dropped
+
+
+def _nb_alpha(y, mu, mask):
+    """Cameron-Trivedi auxiliary regression estimate of the NB2 alpha per stratum."""
+    num = (((y - mu) ** 2 - y) * mask).sum(axis=1)
+    den = ((mu ** 2) * mask).sum(axis=1)
+    return np.clip(num / np.maximum(den, 1e-12), 1e-8, None)
+
+
+def _fit_stats(y, mu, mask, alpha, n_params):
+    """Deviance, Pearson chi2, log-likelihood per stratum (Poisson when alpha is None)."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ylogy = np.where(y > 0, y * np.log(y / mu), 0.0)
+        if alpha is None:
+            dev = 2 * ((ylogy - (y - mu)) * mask).sum(axis=1)
+            pearson = (((y - mu) ** 2 / mu) * mask).sum(axis=1)
+            llf = ((y * np.log(mu) - mu - gammaln(y + 1)) * mask).sum(axis=1)
+        else:
+            a = alpha[:, None]
+            dev = 2 * ((ylogy - (y + 1 / a) * np.log((1 + a * y) / (1 + a * mu))) * mask).sum(axis=1)
+            pearson = (((y - mu) ** 2 / (mu + a * mu ** 2)) * mask).sum(axis=1)
+            llf = ((gammaln(y + 1 / a) - gammaln(1 / a) - gammaln(y + 1)
+                    + y * np.log(a * mu / (1 + a * mu)) - (1 / a) * np.log(1 + a * mu)) * mask).sum(axis=1)
+    n_obs = mask.sum(axis=1)
+    df_resid = n_obs - n_params
+    k = n_params + (0 if alpha is None else 1)
+    return {
+        "n_obs": n_obs.astype(int),
+        "df_resid": df_resid,
+        "deviance": dev,
+        "pearson_chi2": pearson,
+        "dispersion": dev / df_resid,
+        "pearson_dispersion": pearson / df_resid,
+        "llf": llf,
+        "aic": 2 * k - 2 * llf,
+    }
+
+
+# ---------------------------------
+# 4. statsmodels fallback (one stratum)
+# ---------------------------------
+def _statsmodels_fit(task):
+    """Fit one stratum with statsmodels GLM; returns (s, beta, bse, mu) or (s, error string)."""
+    import statsmodels.api as sm
+
+    s, X, y, family, alpha = task
+    try:
+        fam = sm.families.Poisson() if family == "poisson" else sm.families.NegativeBinomial(alpha=alpha)
+        res = sm.GLM(y, X, family=fam).fit()
+        return s, res.params, res.bse, res.mu
+    except Exception as exc:
+        return s, f"{type(exc).__name__}: {exc}"
+
+
+# ---------------------------------
+# 5. Batch API
+# ---------------------------------
+def fit_stratified(counts, days, strata=STRATA, feature_sets=FEATURE_SETS, families=FAMILIES,
+                   max_workers=None):
+    """
+    Fit every (feature set, family, stratum) and return one results table.
+    Coefficient / standard error columns are named coef_<term> and se_<term>.
+    """
+    strata = [s for s in strata if s in counts.columns]
+    rows = []
+    for set_name, features in feature_sets.items():
+        features = [f for f in features if f in days.columns]
+        keys, X, y, mask = _pad_designs(counts, days, strata, features)
+        if not keys:
+            continue
+        terms = ["const"] + features
+        p = len(terms)
+
+        pois_beta, pois_mu, pois_info, pois_iter, pois_conv, dropped = _irls(X, y, mask)
+        for family in families:
+            if family == "poisson":
+                alpha = None
+                beta, mu, info, iters, conv = pois_beta, pois_mu, pois_info, pois_iter, pois_conv
+            elif family == "negbin":
+                # Alternate alpha (moments) and beta (IRLS) a few times from the Poisson fit
+                alpha = _nb_alpha(y, pois_mu, mask)
+                start = np.nan_to_num(pois_beta)
+                for _ in range(3):
+                    beta, mu, info, iters, conv, dropped = _irls(X, y, mask, alpha=alpha, beta=start)
+                    alpha = _nb_alpha(y, mu, mask)
+                    start = np.nan_to_num(beta)
+            else:
+                raise ValueError(f"Unknown family: {family}")
+
+            with np.errstate(invalid="ignore"):
+                cov = np.linalg.pinv(info)
+                bse = np.sqrt(np.diagonal(cov, axis1=1, axis2=2))
+            bse = np.where(dropped, np.nan, bse)
+            method = np.array(["irls"] * len(keys), dtype=object)
+
+            # Non-converged strata -> statsmodels, in parallel
+            retry = np.flatnonzero(~conv)
+            if len(retry):
+                tasks = []
+                for s in retry:
+                    n = int(mask[s].sum())
+                    cols = ~dropped[s]
+                    tasks.append((s, X[s, :n][:, cols], y[s, :n], family,
+                                  None if alpha is None else float(alpha[s])))
+                with ProcessPoolExecutor(max_workers=max_workers) as pool:
+                    for out in pool.map(_statsmodels_fit, tasks):
+                        s = out[0]
+                        if isinstance(out[1], str):
+                            method[s] = f"failed ({out[1]})"
+                            continue
+                        cols = ~dropped[s]
+                        beta[s, cols], bse[s, cols] = out[1], out[2]
+                        n = len(out[3])
+                        mu[s, :n] = out[3]
+                        conv[s] = True
+                        method[s] = "statsmodels"
+
+            stats = _fit_stats(y, mu, mask, alpha, (~dropped).sum(axis=1))
+            for s, key in enumerate(keys):
+                key = key if isinstance(key, tuple) else (key,)
+                row = dict(zip(strata, key))
+                row.update({
+                    "feature_set": set_name,
+                    "family": family,
+                    "method": method[s],
+                    "converged": bool(conv[s]),
+                    "iterations": int(iters[s]),
+                    "alpha": np.nan if alpha is None else float(alpha[s]),
+                })
+                row.update({name: values[s] for name, values in stats.items()})
+                for j, term in enumerate(terms):
+                    row[f"coef_{term}"] = beta[s, j]
+                    row[f"se_{term}"] = bse[s, j]
+                rows.append(row)
+
+    return pd.DataFrame(rows)
+
+
+if __name__ == "__main__":
+    # ---------------------------------
+    # Load + aggregate
+    # ---------------------------------
+    t0 = time.perf_counter()
+    df = load_collision_level(file_path)
+    counts, days = build_daily_designs(df)
+    n_strata = counts[[s for s in STRATA if s in counts.columns]].drop_duplicates().shape[0]
+    print(f"Collisions: {len(df):,}  strata: {n_strata:,}  stratum-days: {len(counts):,} "
+          f"({time.perf_counter() - t0:.1f}s)")
+
+    # ---------------------------------
+    # Fit all strata x feature sets x families
+    # ---------------------------------
+    t0 = time.perf_counter()
+    results = fit_stratified(counts, days)
+    print(f"Fitted {len(results):,} models in {time.perf_counter() - t0:.2f}s")
+    print(results["method"].value_counts().to_string())
+
+    results.to_parquet(output_path, index=False)
+    print("Saved:", output_path)
+
+    # ---------------------------------
+    # Overdispersion: Poisson vs negative binomial
+    # ---------------------------------
+    summary = (
+        results[results["feature_set"] == "prcp"]
+        .groupby("family")[["dispersion", "aic"]]
+        .median()
+    )
+    print("\nMedian dispersion / AIC across strata (feature_set = prcp):")
+    print(summary.round(3).to_string())
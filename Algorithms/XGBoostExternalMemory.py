@@ -0,0 +1,254 @@
+# ===============================
+# XGBOOST (External Memory) - Severity Prediction
+# ===============================
+# XGBoost.ipynb only explores the raw person CSV. This script trains the
+# severity model with XGBoost directly from person_vehicle_weather.parquet
+# (the input of HistGradientBoosting.py) WITHOUT loading it into pandas: record batches are streamed through an
+# xgboost.DataIter into an external-memory ExtMemQuantileDMatrix (or an
+# in-memory QuantileDMatrix on xgboost < 3.0, which still only holds the
+# quantized matrix, never the raw frame).
+#
+# Pass 1 streams only the categorical + label columns to fix category
+# vocabularies and the class ratio. Pass 2 (inside xgboost) streams all
+# feature columns batch by batch. Rows are split into train / validation by a
+# hash of collision_id, so no row is ever held twice.
+#
+# Throughput (rows/s) and process memory are reported per boosting iteration.
+
+import os
+import resource
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow.dataset as ds
+import xgboost as xgb
+
+from HistGradientBoosting import categorical_features, numeric_features
+
+# -------------------------------
+# Configuration
+# -------------------------------
+file_path = "person_vehicle_weather.parquet"    # file or directory of parquet files
+model_path = "xgboost_severity.ubj"
+cache_dir = os.path.join(tempfile.gettempdir(), "xgb_severity_cache")
+
+BATCH_ROWS = 500_000         # rows per record batch handed to xgboost
+MAX_CATEGORIES = 255         # most frequent levels kept per categorical column
+VALID_BUCKET = 0             # hash(collision_id) % 10 == VALID_BUCKET -> validation
+
+XGB_PARAMS = {
+    "objective": "binary:logistic",
+    "eval_metric": ["logloss", "aucpr"],
+    "tree_method": "hist",
+    "max_depth": 8,
+    "eta": 0.1,
+    "max_bin": 256,
+    "max_cat_to_onehot": 1,
+    "subsample": 0.8,
+    "nthread": os.cpu_count(),
+}
+NUM_BOOST_ROUND = 500
+EARLY_STOPPING_ROUNDS = 20
+
+SOURCE_COLUMNS = ["collision_id", "person_injury", "crash_time"] + categorical_features + [
+    c for c in numeric_features if c != "hour"
+]
+
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+# Without psutil only the process peak (ru_maxrss) is available, so label it as such
+RSS_LABEL = "rss" if psutil is not None else "peak rss"
+RSS_COLUMN = "rss_mb" if psutil is not None else "peak_rss_mb"
+
+
+def check_source_columns(dataset):
+    """Raise up front when the dataset lacks a label / feature column (crash_time is optional)."""
+    missing = [c for c in SOURCE_COLUMNS if c != "crash_time" and c not in dataset.schema.names]
+    if missing:
+        raise KeyError(f"Columns not available in the dataset: {missing}. Train on person_vehicle_weather.parquet "
+                       f"(the builder's integrated output renames them with _person / _vehicle suffixes).")
+
+
+def _rss_mb():
+    """Resident set size in MB: current with psutil, else the peak so far (see RSS_LABEL)."""
+    if psutil is not None:
+        return psutil.Process().memory_info().rss / 1e6
+    # ru_maxrss is KB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1e6 if os.uname().sysname == "Darwin" else peak / 1e3
+
+
+def _prepare_batch(batch, vocab):
+    """Arrow record batch -> (features DataFrame with fixed categories, label, validation mask)."""
+    df = batch.to_pandas()
+    label = df["person_injury"].isin(["Injured", "Killed"]).to_numpy(dtype=np.float32)
+
+    if "crash_time" in df.columns:
+        df["hour"] = pd.to_datetime(df["crash_time"].astype(str).str.strip(),
+                                    format="%H:%M", errors="coerce").dt.hour
+
+    X = pd.DataFrame(index=df.index)
+    for c in categorical_features:
+        # Fixed category list -> identical codes in every batch; rare/unseen -> missing
+        values = df[c].astype(str).where(df[c].notna())
+        X[c] = pd.Categorical(values.where(values.isin(vocab[c])), categories=vocab[c])
+    for c in numeric_features:
+        # Optional source columns (no crash_time -> no hour) become missing values
+        values = pd.to_numeric(df[c], errors="coerce") if c in df.columns else pd.Series(np.nan, index=df.index)
+        X[c] = values.astype(np.float32)
+
+    bucket = pd.util.hash_pandas_object(df["collision_id"].astype(str), index=False).to_numpy() % 10
+    return X, label, bucket == VALID_BUCKET
+
+
+# -------------------------------
+# Pass 1: vocabularies + class balance (categorical and label columns only)
+# -------------------------------
+def scan_vocabulary(dataset, batch_rows=BATCH_ROWS):
+    """Stream categorical/label columns once; return (vocab, n_rows, n_positive)."""
+    check_source_columns(dataset)
+    counts = {c: {} for c in categorical_features}
+    n_rows = n_pos = 0
+    cols = ["person_injury"] + categorical_features
+    for batch in dataset.to_batches(columns=cols, batch_size=batch_rows):
+        df = batch.to_pandas()
+        n_rows += len(df)
+        n_pos += int(df["person_injury"].isin(["Injured", "Killed"]).sum())
+        for c in categorical_features:
+            for value, n in df[c].dropna().astype(str).value_counts().items():
+                counts[c][value] = counts[c].get(value, 0) + n
+
+    vocab = {
+        c: sorted(sorted(v, key=v.get, reverse=True)[:MAX_CATEGORIES])
+        for c, v in counts.items()
+    }
+    return vocab, n_rows, n_pos
+
+
+# -------------------------------
+# Pass 2: streaming iterator consumed by xgboost
+# -------------------------------
+class ParquetBatchIter(xgb.DataIter):
+    """Feeds one parquet record batch at a time (train or validation rows) to xgboost."""
+
+    def __init__(self, dataset, vocab, validation, batch_rows=BATCH_ROWS, cache_prefix=None):
+        self._dataset = dataset
+        self._vocab = vocab
+        self._validation = validation
+        self._batch_rows = batch_rows
+        self._batches = None
+        self.rows_seen = 0
+        super().__init__(cache_prefix=cache_prefix)
+
+    def reset(self):
+        self._batches = None
+
+    def next(self, input_data):
+        if self._batches is None:
+            self._batches = iter(self._dataset.to_batches(
+                columns=[c for c in SOURCE_COLUMNS if c in self._dataset.schema.names],
+                batch_size=self._batch_rows,
+            ))
+        for batch in self._batches:
+            X, y, valid = _prepare_batch(batch, self._vocab)
+            keep = valid if self._validation else ~valid
+            if not keep.any():
+                continue
+            input_data(data=X[keep], label=y[keep])
+            self.rows_seen += int(keep.sum())
+            return True
+        return False
+
+
+class IterationReport(xgb.callback.TrainingCallback):
+    """Prints wall time, rows/s and RSS (peak RSS without psutil) for every boosting iteration."""
+
+    def __init__(self, n_rows):
+        self.n_rows = n_rows
+        self.history = []
+        self._t0 = None
+
+    def before_iteration(self, model, epoch, evals_log):
+        self._t0 = time.perf_counter()
+        return False
+
+    def after_iteration(self, model, epoch, evals_log):
+        seconds = time.perf_counter() - self._t0
+        metrics = {f"{d}-{m}": v[-1] for d, log in evals_log.items() for m, v in log.items()}
+        row = {"iteration": epoch, "seconds": seconds,
+               "rows_per_s": self.n_rows / seconds if seconds > 0 else np.nan,
+               RSS_COLUMN: _rss_mb(), **metrics}
+        self.history.append(row)
+        print(f"[{epoch:>4}] {seconds:6.2f}s  {row['rows_per_s']:>12,.0f} rows/s  "
+              f"{RSS_LABEL} {row[RSS_COLUMN]:8.0f} MB  "
+              + "  ".join(f"{k}={v:.4f}" for k, v in metrics.items()))
+        return False
+
+
+def build_dmatrices(dataset, vocab, max_bin=XGB_PARAMS["max_bin"]):
+    """Construct the streamed training matrix (external memory when available) and validation matrix."""
+    check_source_columns(dataset)
+    os.makedirs(cache_dir, exist_ok=True)
+    train_it = ParquetBatchIter(dataset, vocab, validation=False,
+                                cache_prefix=os.path.join(cache_dir, "train"))
+    valid_it = ParquetBatchIter(dataset, vocab, validation=True)
+
+    if hasattr(xgb, "ExtMemQuantileDMatrix"):
+        dtrain = xgb.ExtMemQuantileDMatrix(train_it, max_bin=max_bin, enable_categorical=True)
+    else:
+        dtrain = xgb.QuantileDMatrix(train_it, max_bin=max_bin, enable_categorical=True)
+    dvalid = xgb.QuantileDMatrix(valid_it, ref=dtrain, enable_categorical=True)
+    return dtrain, dvalid, train_it, valid_it
+
+
+if __name__ == "__main__":
+    dataset = ds.dataset(file_path, format="parquet")
+
+    print("=== Pass 1: vocabularies and class balance ===")
+    t0 = time.perf_counter()
+    vocab, n_rows, n_pos = scan_vocabulary(dataset)
+    print(f"Rows: {n_rows:,}  severe: {n_pos:,} ({n_pos / max(n_rows, 1):.2%})  "
+          f"scan {time.perf_counter() - t0:.1f}s  {RSS_LABEL} {_rss_mb():.0f} MB")
+    for c in categorical_features:
+        print(f"  {c}: {len(vocab[c])} categories kept")
+
+    print("\n=== Pass 2: streaming into quantized DMatrix ===")
+    t0 = time.perf_counter()
+    dtrain, dvalid, train_it, valid_it = build_dmatrices(dataset, vocab)
+    seconds = time.perf_counter() - t0
+    print(f"Train rows: {dtrain.num_row():,}  valid rows: {dvalid.num_row():,}  "
+          f"built in {seconds:.1f}s ({(train_it.rows_seen + valid_it.rows_seen) / seconds:,.0f} rows/s)  "
+          f"{RSS_LABEL} {_rss_mb():.0f} MB")
+
+    params = dict(XGB_PARAMS, scale_pos_weight=(n_rows - n_pos) / max(n_pos, 1))
+    report = IterationReport(dtrain.num_row())
+    booster = xgb.train(
+        params, dtrain,
+        num_boost_round=NUM_BOOST_ROUND,
+        evals=[(dtrain, "train"), (dvalid, "valid")],
+        early_stopping_rounds=EARLY_STOPPING_ROUNDS,
+        callbacks=[report],
+        verbose_eval=False,
+    )
+    booster.save_model(model_path)
+
+    history = pd.DataFrame(report.history)
+    print(f"\nBest iteration: {booster.best_iteration}  valid aucpr: "
+          f"{history['valid-aucpr'].iloc[booster.best_iteration]:.4f}")
+    print(f"Median {history['rows_per_s'].median():,.0f} rows/s per iteration, "
+          f"peak RSS {history[RSS_COLUMN].max():.0f} MB")
+    print("Saved model:", model_path)
+
+    # -------------------------------
+    # Feature Importance (gain, Top 20)
+    # -------------------------------
+    gain = booster.get_score(importance_type="total_gain")
+    feature_imp = pd.DataFrame({"feature": list(gain), "importance": list(gain.values())})
+    feature_imp["importance"] /= feature_imp["importance"].sum()
+    print(feature_imp.sort_values(by="importance", ascending=False).head(20))
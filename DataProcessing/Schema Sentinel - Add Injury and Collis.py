@@ -1,10 +1,12 @@
 #Schema Sentinel - Add Injury and Collision Severity Factors
 #-----------------------------------------------------------
 
-import pandas as pd
 import numpy as np
 import os
 
+from intermediate_io import read_intermediate, write_intermediate
+from step_trace import Tracer
+
 # --------------------------
 # CONFIGURATION
 # --------------------------
@@ -12,6 +14,9 @@ BASE_PATH = "/"
 INTEGRATED_FILE = f"{BASE_PATH}"
 OUTPUT_FILE = f"{BASE_PATH}"
 
+# Step timing / memory (enable with SCHEMA_SENTINEL_TRACE=1)
+trace = Tracer("severity_factors")
+
 print("=" * 80)
 print("SCHEMA SENTINEL - ADDING INJURY AND COLLISION SEVERITY FACTORS")
 print("=" * 80)
@@ -20,13 +25,15 @@ print("=" * 80)
 # STEP 1: LOAD DATASET
 # --------------------------
 print("\nSTEP 1: Loading integrated dataset...")
-df = pd.read_parquet(INTEGRATED_FILE)
+trace.step("STEP 1: Loading integrated dataset")
+df = read_intermediate(INTEGRATED_FILE)
 print(f"Loaded {len(df):,} records.")
 
 # --------------------------
 # STEP 2: CREATE PERSON-LEVEL INJURY SEVERITY
 # --------------------------
 print("\nSTEP 2: Creating person-level injury severity classification...")
+trace.step("STEP 2: Creating person-level injury severity classification", rows_in=df)
 
 df["person_injury"] = df["person_injury"].astype(str).str.title().fillna("Unspecified")
 
@@ -48,6 +55,7 @@ print(df["injury_severity"].value_counts(dropna=False))
 # STEP 3: CREATE COLLISION-LEVEL SEVERITY
 # --------------------------
 print("\nSTEP 3: Creating collision-level severity classification...")
+trace.step("STEP 3: Creating collision-level severity classification", rows_in=df)
 
 if {"number_of_persons_injured", "number_of_persons_killed"}.issubset(df.columns):
     severity_df = (
@@ -77,12 +85,15 @@ else:
 # STEP 4: SAVE UPDATED DATASET
 # --------------------------
 print("\nSTEP 4: Saving dataset with severity factors...")
+trace.step("STEP 4: Saving dataset with severity factors", rows_in=df)
 
 os.makedirs(f"{BASE_PATH}/conditioning", exist_ok=True)
-df.to_parquet(OUTPUT_FILE, index=False)
+OUTPUT_FILE = write_intermediate(df, OUTPUT_FILE)
 
 print(f"Saved updated dataset: {OUTPUT_FILE}")
 
 print("\n" + "=" * 80)
 print("PROCESS COMPLETE - SEVERITY FACTORS ADDED")
-print("=" * 80)
\ No newline at end of file
+print("=" * 80)
+
+trace.finish()
\ No newline at end of file
@@ -1,3 +1,4 @@
+"""
 Schema Sentinel - Integrated Analytical Dataset Builder
 -------------------------------------------------------
 Integrates POST-conditioned Person, Vehicle, Weather, and Crashes datasets into
@@ -14,9 +15,13 @@ Output:
 - schema_sentinel_integrated.csv
 """
 
-import pandas as pd
 import os
 
+from concurrent_loader import load_datasets
+from intermediate_io import write_intermediate
+from step_trace import Tracer
+from vehicle_linkage import JOIN_ENV, JOIN_MODES, link_person_vehicle, linkage_report
+
 # --------------------------
 # CONFIG (update path to where you stored to files)
 # --------------------------
@@ -25,6 +30,23 @@ COND_PATH = f""
 OUT_PATH = f""
 os.makedirs(OUT_PATH, exist_ok=True)
 
+# Person + Vehicle join (see vehicle_linkage.py):
+#   "collision" - every person x every vehicle in the crash (original behaviour)
+#   "linked"    - one row per person, joined on person.vehicle_id -> vehicle unique_id
+JOIN_MODE = os.environ.get(JOIN_ENV, "collision")
+if JOIN_MODE not in JOIN_MODES:
+    raise ValueError(f"JOIN_MODE must be one of {JOIN_MODES}, got {JOIN_MODE!r}")
+
+# Backend: pandas (reference) or the polars lazy engine (SCHEMA_SENTINEL_BACKEND=polars)
+BACKEND = os.environ.get("SCHEMA_SENTINEL_BACKEND", "pandas")
+if BACKEND == "polars":
+    from polars_pipeline import run_stage
+    run_stage("integration", COND_PATH, OUT_PATH, join_mode=JOIN_MODE)
+    raise SystemExit(0)
+
+# Step timing / memory (enable with SCHEMA_SENTINEL_TRACE=1)
+trace = Tracer("integration")
+
 print("=" * 80)
 print("SCHEMA SENTINEL - INTEGRATION PIPELINE")
 print("=" * 80)
@@ -33,11 +55,16 @@ print("=" * 80)
 # STEP 1: LOAD CONDITIONED DATASETS
 # --------------------------
 print("\nSTEP 1: Loading POST-conditioned datasets...")
+trace.step("STEP 1: load conditioned datasets")
 
-person = pd.read_parquet(f"{COND_PATH}/person_POST_conditioning.parquet")
-vehicles = pd.read_parquet(f"{COND_PATH}/vehicles_POST_conditioning.parquet")
-weather = pd.read_parquet(f"{COND_PATH}/weather_POST_conditioning.parquet")
-crashes = pd.read_parquet(f"{COND_PATH}/crashes_POST_conditioning.parquet")
+# All four files are read concurrently (bounded thread pool, see concurrent_loader.py)
+loaded = load_datasets({
+    "person": f"{COND_PATH}/person_POST_conditioning.parquet",
+    "vehicles": f"{COND_PATH}/vehicles_POST_conditioning.parquet",
+    "weather": f"{COND_PATH}/weather_POST_conditioning.parquet",
+    "crashes": f"{COND_PATH}/crashes_POST_conditioning.parquet",
+}, verbose=True)
+person, vehicles, weather, crashes = (loaded[k] for k in ("person", "vehicles", "weather", "crashes"))
 
 
 # ------------------------------------------------------------------
@@ -66,24 +93,35 @@ for name, df, cols in [
         if c not in df.columns:
             raise KeyError(f"{name} dataset missing required column: {c}")
 
+trace.end(rows_out=len(person) + len(vehicles) + len(weather) + len(crashes))
+
 # --------------------------
 # STEP 2: MERGE PERSON + VEHICLE
 # --------------------------
-print("\nSTEP 2: Merging Person + Vehicle on (collision_id, merge_date)...")
-
-pv = person.merge(
-    vehicles,
-    on=["collision_id", "merge_date"],
-    how="inner",
-    suffixes=("_person", "_vehicle")
-)
-
+print(f"\nSTEP 2: Merging Person + Vehicle ({JOIN_MODE} mode)...")
+trace.step("STEP 2: merge person + vehicle", rows_in=len(person) + len(vehicles))
+
+if JOIN_MODE == "linked":
+    # One row per person: vehicle_id -> unique_id, single-vehicle fallback, else unlinked
+    pv = link_person_vehicle(person, vehicles)
+    assert len(pv) == len(person), "Linked join must keep exactly one row per person."
+    print(linkage_report(pv).to_string())
+else:
+    pv = person.merge(
+        vehicles,
+        on=["collision_id", "merge_date"],
+        how="inner",
+        suffixes=("_person", "_vehicle")
+    )
+
+trace.end(rows_out=pv)
 print(f"Person-Vehicle merged: {len(pv):,} records")
 
 # --------------------------
 # STEP 3: ADD WEATHER (BY DATE)
 # --------------------------
 print("\nSTEP 3: Adding Weather on merge_date...")
+trace.step("STEP 3: add weather", rows_in=pv)
 
 pvw = pv.merge(
     weather,
@@ -91,12 +129,14 @@ pvw = pv.merge(
     how="left"
 )
 
+trace.end(rows_out=pvw)
 print(f"After Weather merge: {len(pvw):,} records")
 
 # --------------------------
 # STEP 4: ADD CRASHES (BY collision_id)
 # --------------------------
 print("\nSTEP 4: Adding Crashes on collision_id...")
+trace.step("STEP 4: add crashes", rows_in=pvw)
 
 keep_crash_cols = [
     "collision_id",
@@ -120,12 +160,14 @@ full = pvw.merge(
     how="left"
 )
 
+trace.end(rows_out=full)
 print(f"After Crashes merge: {len(full):,} records")
 
 # --------------------------
 # STEP 5: VALIDATIONS
 # --------------------------
 print("\nSTEP 5: Validating integrated dataset...")
+trace.step("STEP 5: validate", rows_in=full)
 
 if "injury_occurred" not in full.columns:
     raise KeyError("injury_occurred not found in integrated dataset (from person conditioning).")
@@ -140,55 +182,57 @@ print("Basic integrity checks passed.")
 # STEP 6: SAVE OUTPUTS
 # --------------------------
 print("\nSTEP 6: Saving integrated dataset...")
+trace.step("STEP 6: save outputs", rows_in=full)
 
 parquet_path = f"{OUT_PATH}/schema_sentinel_integrated.parquet"
 csv_path = f"{OUT_PATH}/schema_sentinel_integrated.csv"
 
-full.to_parquet(parquet_path, index=False)
-full.to_csv(csv_path, index=False)
+with trace.span("write parquet", rows_in=full):
+    # Published output (read by the models): the parquet is kept in arrow mode too
+    handoff_path = write_intermediate(full, parquet_path, publish=True)
+with trace.span("write csv", rows_in=full):
+    full.to_csv(csv_path, index=False)
 
 print(f"Saved Parquet: {parquet_path}")
+if handoff_path != parquet_path:
+    print(f"Saved Arrow:   {handoff_path}")
 print(f"Saved CSV:     {csv_path}")
 
 print("\n" + "=" * 80)
 print("INTEGRATION PIPELINE COMPLETE")
 print("=" * 80)
 
-
-
-
-
-
-
-
-================================================================================
-SCHEMA SENTINEL - INTEGRATION PIPELINE
-================================================================================
-
-STEP 1: Loading POST-conditioned datasets...
-
-Collision ID types standardized to string for person, vehicle, and crashes.
-Person:   5,807,949 records
-Vehicle:  4,448,313 records
-Weather:  4,865 records
-Crashes:  2,219,657 records
-
-STEP 2: Merging Person + Vehicle on (collision_id, merge_date)...
-Person-Vehicle merged: 12,344,659 records
-
-STEP 3: Adding Weather on merge_date...
-After Weather merge: 12,344,659 records
-
-STEP 4: Adding Crashes on collision_id...
-After Crashes merge: 12,344,659 records
-
-STEP 5: Validating integrated dataset...
-Null collision_id in final dataset: 0
-Basic integrity checks passed.
-
-STEP 6: Saving integrated dataset...
-Saved Parquet: /home/jovyan/shared-datasets/nyc-collisions/integrated/schema_sentinel_integrated.parquet
-Saved CSV:     /home/jovyan/shared-datasets/nyc-collisions/integrated/schema_sentinel_integrated.csv
-
-================================================================================
-INTEGRATION PIPELINE COMPLETE
\ No newline at end of file
+trace.finish()
+
+# Example run on the full NYC extracts:
+# ================================================================================
+# SCHEMA SENTINEL - INTEGRATION PIPELINE
+# ================================================================================
+#
+# STEP 1: Loading POST-conditioned datasets...
+#
+# Collision ID types standardized to string for person, vehicle, and crashes.
+# Person:   5,807,949 records
+# Vehicle:  4,448,313 records
+# Weather:  4,865 records
+# Crashes:  2,219,657 records
+#
+# STEP 2: Merging Person + Vehicle on (collision_id, merge_date)...
+# Person-Vehicle merged: 12,344,659 records
+#
+# STEP 3: Adding Weather on merge_date...
+# After Weather merge: 12,344,659 records
+#
+# STEP 4: Adding Crashes on collision_id...
+# After Crashes merge: 12,344,659 records
+#
+# STEP 5: Validating integrated dataset...
+# Null collision_id in final dataset: 0
+# Basic integrity checks passed.
+#
+# STEP 6: Saving integrated dataset...
+# Saved Parquet: /home/jovyan/shared-datasets/nyc-collisions/integrated/schema_sentinel_integrated.parquet
+# Saved CSV:     /home/jovyan/shared-datasets/nyc-collisions/integrated/schema_sentinel_integrated.csv
+#
+# ================================================================================
+# INTEGRATION PIPELINE COMPLETE
@@ -3,9 +3,12 @@ drive.mount('/content/drive')
 
 import polars as pl
 
+from intermediate_io import scan_intermediate
+from parquet_layout import sink_optimized
+
 file_path = "/content/drive/MyDrive/Colab Notebooks/CS-504/project/schema_sentinel_integrated_with_severity.parquet"
 
-scan_df = pl.scan_parquet(file_path)  # LazyFrame, doesn't load all data
+scan_df = scan_intermediate(file_path)  # LazyFrame, doesn't load all data (parquet or Arrow IPC hand-off)
 
 preview = scan_df.head(5).collect()
 print(preview)
@@ -29,8 +32,18 @@ filtered_lazy = scan_df.filter(
 
 output_path = "/content/drive/MyDrive/Colab Notebooks/CS-504/project/schema_sentinel_last5yrs.parquet"
 
-# This writes the filtered dataset to a new Parquet file without loading everything into RAM
-filtered_lazy.sink_parquet(output_path)
+# Published output: sorted by (merge_date, borough, collision_id), zstd, row groups sized
+# for scans, statistics + page index, so date / borough filters skip row groups
+# (parquet_layout.py). Sorted one year at a time, so peak memory stays near one
+# year of rows. Set OPTIMIZE_LAYOUT = False to stream it out unsorted instead.
+OPTIMIZE_LAYOUT = True
+
+if OPTIMIZE_LAYOUT:
+    layout = sink_optimized(filtered_lazy, output_path)
+    print(f"Optimized layout: sorted by {layout['sort_keys']}, {layout['row_group_rows']:,} rows per row group")
+else:
+    # This writes the filtered dataset to a new Parquet file without loading everything into RAM
+    filtered_lazy.sink_parquet(output_path)
 
 print("Filtered 5-year dataset written to:", output_path)
 
@@ -42,7 +55,7 @@ date_col = "crash_date_x"
 
 
 def print_date_range(path, label):
-    scan = pl.scan_parquet(path)
+    scan = scan_intermediate(path)
 
     date_range = scan.select([
         pl.col(date_col).min().alias("min_date"),
@@ -0,0 +1,315 @@
+"""
+Schema Sentinel - Collision Bitmap Index
+----------------------------------------
+Per-value bitmaps over the collision-level table, so conjunctions of
+categorical filters (license status x severity x weather x borough x time
+range) are answered with bitwise AND / OR and a popcount instead of a pandas
+boolean-mask scan over every row.
+
+- one row (bit position) per collision_id
+- one bitmap per (column, value), stored as numpy packed bits (uint64 words)
+- multi-valued attributes are natural: a collision with an unlicensed driver
+  AND a licensed one is set in both driver_license_status bitmaps, so filters
+  mean "any vehicle / person in the collision has this value"
+- derived time columns: year, year_month ("2023-07") and time_range_7 (the
+  7 time-of-day bins used by FeatureStore.py / StratifiedCountModels.py);
+  ranges on year / year_month are an OR over the buckets in range
+
+The index is saved as one compressed .npz (bitmaps + value dictionaries +
+collision_id per bit) and loaded back in milliseconds.
+
+Usage:
+    python bitmap_index.py build --data schema_sentinel_last5yrs.parquet --index collision_bitmaps.npz
+    python bitmap_index.py query --index collision_bitmaps.npz \
+        --where borough=BROOKLYN --where collision_severity="Fatal Collision" --where year_month=2022-01..2022-12
+
+Python:
+    idx = BitmapIndex.load("collision_bitmaps.npz")
+    idx.count(borough="BROOKLYN", weather_condition=["Rain", "Snow"], year=(2021, 2023))
+    idx.group_counts("driver_license_status", collision_severity="Fatal Collision")
+    idx.ids_where(borough="QUEENS", time_range_7="PM Peak (16:00–18:59)")
+"""
+
+import argparse
+import json
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow.dataset as ds
+
+# --------------------------
+# CONFIGURATION
+# --------------------------
+INDEX_PATH = "collision_bitmaps.npz"
+
+INDEX_COLUMNS = [
+    "borough",
+    "collision_severity",
+    "weather_condition",
+    "driver_license_status",
+    "vehicle_type",
+    "contributing_factor_vehicle_1",
+    "person_type",
+    "driver_sex",
+]
+DATE_CANDIDATES = ["crash_date_vehicle", "crash_date_x", "crash_date_person", "crash_date"]
+TIME_CANDIDATES = ["crash_time", "crash_time_person", "crash_time_vehicle"]
+MISSING = "Unknown"
+
+TIME_BINS = [0, 4, 7, 10, 16, 19, 22, 24]
+TIME_LABELS = [
+    "Late Night (00:00–03:59)",
+    "Early Morning (04:00–06:59)",
+    "AM Peak (07:00–09:59)",
+    "Midday (10:00–15:59)",
+    "PM Peak (16:00–18:59)",
+    "Evening (19:00–21:59)",
+    "Late Evening (22:00–23:59)",
+]
+ORDERED_COLUMNS = ("year", "year_month")
+
+
+def _words(n_rows):
+    return (n_rows + 63) // 64
+
+
+def _bitmap(rows, n_rows):
+    """Packed bitmap (uint64 words, little bit order) with the given row positions set."""
+    bits = np.zeros(_words(n_rows) * 64, dtype=bool)
+    bits[rows] = True
+    return np.packbits(bits, bitorder="little").view(np.uint64)
+
+
+def _popcount(words):
+    return int(np.bitwise_count(words).sum())
+
+
+class BitmapIndex:
+    """Bitmaps keyed by (column, value) over a fixed set of collisions."""
+
+    def __init__(self, collision_ids, bitmaps):
+        self.collision_ids = np.asarray(collision_ids)
+        self.n_rows = len(self.collision_ids)
+        self.bitmaps = bitmaps                   # {column: {value: uint64 words}}
+        self._all = _bitmap(np.arange(self.n_rows), self.n_rows)
+
+    # ---- build ----
+    @classmethod
+    def from_frame(cls, df, columns=INDEX_COLUMNS):
+        """
+        df: one or more rows per collision (person / vehicle level is fine).
+        Every (collision, value) pair present sets that collision's bit.
+        """
+        codes, collision_ids = pd.factorize(df["collision_id"].astype(str), sort=True)
+        n_rows = len(collision_ids)
+        bitmaps = {}
+        for column in columns:
+            if column not in df.columns:
+                continue
+            values = df[column]
+            if column not in ORDERED_COLUMNS:
+                values = values.astype(object).where(values.notna(), MISSING).astype(str)
+            pairs = pd.DataFrame({"row": codes, "value": values.to_numpy()}).dropna().drop_duplicates()
+            bitmaps[column] = {
+                value: _bitmap(group["row"].to_numpy(), n_rows)
+                for value, group in pairs.groupby("value", sort=True)
+            }
+        return cls(collision_ids.to_numpy(), bitmaps)
+
+    # ---- persistence ----
+    def save(self, path=INDEX_PATH):
+        arrays = {"collision_id": self.collision_ids.astype(str)}
+        catalog = {}
+        for c, (column, values) in enumerate(self.bitmaps.items()):
+            keys = list(values)
+            catalog[column] = {"key": f"b{c}", "values": [v.item() if hasattr(v, "item") else v for v in keys]}
+            arrays[f"b{c}"] = np.stack([values[v] for v in keys]) if keys else np.zeros((0, _words(self.n_rows)), np.uint64)
+        arrays["catalog"] = np.array(json.dumps(catalog))
+        np.savez_compressed(path, **arrays)
+        return path
+
+    @classmethod
+    def load(cls, path=INDEX_PATH):
+        with np.load(path, allow_pickle=False) as npz:
+            catalog = json.loads(str(npz["catalog"]))
+            bitmaps = {column: dict(zip(spec["values"], npz[spec["key"]]))
+                       for column, spec in catalog.items()}
+            return cls(npz["collision_id"], bitmaps)
+
+    # ---- query ----
+    def _values_for(self, column, condition):
+        """Values selected by one condition: scalar, list (OR) or (low, high) range."""
+        values = self.bitmaps[column]
+        if isinstance(condition, tuple) and len(condition) == 2:
+            low, high = condition
+            return [v for v in values if (low is None or v >= low) and (high is None or v <= high)]
+        if isinstance(condition, (list, set, frozenset)):
+            return [v for v in condition if v in values]
+        return [condition] if condition in values else []
+
+    def mask(self, **conditions):
+        """Packed bitmap of collisions matching every condition (AND across columns, OR within)."""
+        result = self._all.copy()
+        for column, condition in conditions.items():
+            if column not in self.bitmaps:
+                raise KeyError(f"{column} is not indexed. Indexed columns: {list(self.bitmaps)}")
+            selected = np.zeros_like(result)
+            for value in self._values_for(column, condition):
+                np.bitwise_or(selected, self.bitmaps[column][value], out=selected)
+            np.bitwise_and(result, selected, out=result)
+        return result
+
+    def count(self, **conditions):
+        return _popcount(self.mask(**conditions))
+
+    def rows(self, **conditions):
+        """Row positions (into collision_ids) of the matching collisions."""
+        bits = np.unpackbits(self.mask(**conditions).view(np.uint8), bitorder="little")[: self.n_rows]
+        return np.flatnonzero(bits)
+
+    def ids_where(self, **conditions):
+        """collision_id values of the matching collisions."""
+        return self.collision_ids[self.rows(**conditions)]
+
+    def group_counts(self, column, **conditions):
+        """Collisions per value of `column` within the filtered set (a dashboard facet)."""
+        base = self.mask(**conditions)
+        return pd.Series({value: _popcount(np.bitwise_and(base, bm)) for value, bm in self.bitmaps[column].items()},
+                         name="collisions").sort_values(ascending=False)
+
+    def describe(self):
+        return pd.DataFrame([
+            {"column": column, "values": len(values), "bytes": sum(bm.nbytes for bm in values.values())}
+            for column, values in self.bitmaps.items()
+        ])
+
+
+# --------------------------
+# Build from the pipeline output
+# --------------------------
+def load_collision_rows(path, columns=INDEX_COLUMNS):
+    """Read the index columns (plus date / time for the derived buckets) from a parquet file."""
+    names = ds.dataset(path, format="parquet").schema.names
+    date_col = next((c for c in DATE_CANDIDATES if c in names), None)
+    time_col = next((c for c in TIME_CANDIDATES if c in names), None)
+    read = ["collision_id"] + [c for c in columns if c in names] + [c for c in (date_col, time_col) if c]
+    df = pd.read_parquet(path, columns=list(dict.fromkeys(read)))
+
+    if date_col:
+        dates = pd.to_datetime(df[date_col], errors="coerce")
+        df["year"] = dates.dt.year.astype("Int64")
+        df["year_month"] = dates.dt.strftime("%Y-%m")
+    if time_col:
+        hour = pd.to_datetime(df[time_col].astype(str).str.strip(), format="%H:%M", errors="coerce").dt.hour
+        df["time_range_7"] = pd.cut(hour, bins=TIME_BINS, right=False, labels=TIME_LABELS).astype(object)
+    return df.dropna(subset=["collision_id"])
+
+
+def build_index(path, columns=INDEX_COLUMNS):
+    df = load_collision_rows(path, columns)
+    derived = [c for c in ("year", "year_month", "time_range_7") if c in df.columns]
+    return BitmapIndex.from_frame(df, list(columns) + derived), df
+
+
+def _parse_value(column, value):
+    if column != "year":
+        return value
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f"year values must be integers, got {value!r}")
+
+
+def _parse_where(items, idx):
+    """
+    --where col=value | col=a,b (OR) | col=low..high (range). Values (not range
+    bounds) must be in the index, so a typo fails instead of matching nothing.
+    """
+    conditions = {}
+    for item in items or []:
+        column, _, value = item.partition("=")
+        if column not in idx.bitmaps:
+            raise ValueError(f"{column} is not indexed. Indexed columns: {list(idx.bitmaps)}")
+        if ".." in value:
+            low, high = value.split("..", 1)
+            conditions[column] = tuple(_parse_value(column, v) if v else None for v in (low, high))
+            continue
+        cond = [_parse_value(column, v) for v in value.split(",")]
+        unknown = [v for v in cond if v not in idx.bitmaps[column]]
+        if unknown:
+            known = sorted(map(str, idx.bitmaps[column]))
+            more = f" (+{len(known) - 20} more)" if len(known) > 20 else ""
+            raise ValueError(f"{column}: {unknown} not in the index. Indexed values: {known[:20]}{more}")
+        conditions[column] = cond if len(cond) > 1 else cond[0]
+    return conditions
+
+
+def benchmark(idx, df, conditions, repeat=20):
+    """Bitmap count vs the equivalent pandas mask + nunique on the row-level frame."""
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        n_bitmap = idx.count(**conditions)
+    t_bitmap = (time.perf_counter() - t0) / repeat
+
+    def pandas_count():
+        matched = None
+        for column, condition in conditions.items():
+            s = df[column].astype(object).where(df[column].notna(), MISSING) if column not in ORDERED_COLUMNS else df[column]
+            if isinstance(condition, tuple):
+                low, high = condition
+                hit = s.notna() & ((s >= low) if low is not None else True) & ((s <= high) if high is not None else True)
+            else:
+                hit = s.isin(condition if isinstance(condition, list) else [condition])
+            ids = set(df.loc[hit.fillna(False).to_numpy(dtype=bool), "collision_id"].astype(str))
+            matched = ids if matched is None else matched & ids
+        return len(matched) if matched is not None else df["collision_id"].nunique()
+
+    t0 = time.perf_counter()
+    n_pandas = pandas_count()
+    t_pandas = time.perf_counter() - t0
+    return {"bitmap_count": n_bitmap, "pandas_count": n_pandas,
+            "bitmap_ms": t_bitmap * 1e3, "pandas_ms": t_pandas * 1e3}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bitmap index over collision-level categorical columns.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    b = sub.add_parser("build", help="build and save the index")
+    b.add_argument("--data", required=True, help="integrated / windowed parquet (any row grain)")
+    b.add_argument("--index", default=INDEX_PATH)
+    b.add_argument("--check", nargs="*", metavar="COL=VALUE", help="also time this filter vs pandas")
+    q = sub.add_parser("query", help="count / facet with --where filters")
+    q.add_argument("--index", default=INDEX_PATH)
+    q.add_argument("--where", action="append", metavar="COL=VALUE")
+    q.add_argument("--facet", help="also show counts per value of this column")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        t0 = time.perf_counter()
+        idx, df = build_index(args.data)
+        idx.save(args.index)
+        print(f"Indexed {idx.n_rows:,} collisions from {len(df):,} rows in {time.perf_counter() - t0:.1f}s -> {args.index}")
+        print(idx.describe().to_string(index=False))
+        if args.check:
+            try:
+                conditions = _parse_where(args.check, idx)
+            except ValueError as exc:
+                parser.error(str(exc))
+            result = benchmark(idx, df, conditions)
+            print(f"\nCheck: bitmap {result['bitmap_count']:,} in {result['bitmap_ms']:.3f} ms, "
+                  f"pandas {result['pandas_count']:,} in {result['pandas_ms']:.1f} ms")
+    else:
+        t0 = time.perf_counter()
+        idx = BitmapIndex.load(args.index)
+        t_load = time.perf_counter() - t0
+        try:
+            conditions = _parse_where(args.where, idx)
+        except ValueError as exc:
+            parser.error(str(exc))
+        t0 = time.perf_counter()
+        n = idx.count(**conditions)
+        print(f"{n:,} of {idx.n_rows:,} collisions match {conditions} "
+              f"({(time.perf_counter() - t0) * 1e3:.3f} ms; index loaded in {t_load * 1e3:.0f} ms)")
+        if args.facet:
+            print(idx.group_counts(args.facet, **conditions).to_string())
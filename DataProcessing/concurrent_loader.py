@@ -0,0 +1,136 @@
+"""
+Schema Sentinel - Concurrent Dataset Loader
+-------------------------------------------
+Loads several parquet / Arrow IPC files at once through ONE bounded thread
+pool. Each parquet file is split into tasks (row groups, and column groups when
+a file has fewer row groups than workers) that pyarrow decodes with the GIL
+released, so the files overlap each other and a large file is spread across
+workers. Loading time approaches the slowest single file instead of the sum.
+
+The pool size is the I/O concurrency limit: MAX_WORKERS, or the
+SCHEMA_SENTINEL_IO_THREADS environment variable, default min(8, cores + 4).
+pyarrow's own per-file threading is turned off inside tasks so the limit holds.
+
+Results are pandas DataFrames with the same dtypes as pd.read_parquet (or
+intermediate_io.read_intermediate for Arrow IPC hand-offs).
+
+    from concurrent_loader import load_datasets, load_parquet
+    frames = load_datasets({"person": ".../person_POST_conditioning.parquet",
+                            "vehicles": ".../vehicles_POST_conditioning.parquet"})
+    crashes = load_parquet(".../Motor_Vehicle_Collisions_-_Crashes_20251111.parquet")
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from intermediate_io import is_arrow, read_table, resolve
+
+IO_THREADS_ENV = "SCHEMA_SENTINEL_IO_THREADS"
+MAX_WORKERS = None        # None = SCHEMA_SENTINEL_IO_THREADS or min(8, cores + 4)
+
+
+def io_workers(max_workers=MAX_WORKERS):
+    """Pool size: explicit value, then the environment, then min(8, cores + 4)."""
+    if max_workers:
+        return int(max_workers)
+    env = os.environ.get(IO_THREADS_ENV, "")
+    if env.strip().isdigit() and int(env) > 0:
+        return int(env)
+    return min(8, (os.cpu_count() or 1) + 4)
+
+
+def _plan(path, columns, workers):
+    """Split one parquet file into (row_groups, columns) read tasks."""
+    pf = pq.ParquetFile(path)
+    names = [c for c in pf.schema_arrow.names if columns is None or c in columns]
+    n_groups = max(pf.metadata.num_row_groups, 1)
+    col_splits = max(1, min(len(names), workers // n_groups))
+    col_groups = [names[i::col_splits] for i in range(col_splits)]
+    return pf, names, [(rg, cols) for rg in range(pf.metadata.num_row_groups) for cols in col_groups]
+
+
+def _read_task(path, row_group, cols):
+    # One ParquetFile per task: handles are not shared across threads
+    return pq.ParquetFile(path).read_row_group(row_group, columns=cols, use_threads=False)
+
+
+def _assemble(pf, names, tasks, tables):
+    """Stitch column groups back per row group, then row groups in file order."""
+    schema = pf.schema_arrow
+    schema = pa.schema([schema.field(n) for n in names], metadata=schema.metadata)
+    by_group = {}
+    for (rg, _), table in zip(tasks, tables):
+        by_group.setdefault(rg, {}).update({n: table.column(n) for n in table.column_names})
+    if not by_group:
+        return schema.empty_table()
+    parts = [pa.Table.from_arrays([by_group[rg][n] for n in names], schema=schema) for rg in sorted(by_group)]
+    return pa.concat_tables(parts)
+
+
+def load_tables(paths, columns=None, max_workers=MAX_WORKERS):
+    """{name: pyarrow Table} for {name: path}; `columns` is a list or {name: list}."""
+    workers = io_workers(max_workers)
+    plans, futures = {}, {}
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="loader") as pool:
+        for name, path in paths.items():
+            cols = columns.get(name) if isinstance(columns, dict) else columns
+            src = resolve(path)
+            if not os.path.exists(src):
+                raise FileNotFoundError(f"{name}: {path} not found")
+            if is_arrow(src) or not src.endswith(".parquet"):
+                # Memory-mapped Arrow IPC: nothing to decode, one task
+                plans[name] = None
+                futures[name] = [pool.submit(read_table, src, cols)]
+                continue
+            pf, names, tasks = _plan(src, cols, workers)
+            plans[name] = (pf, names, tasks)
+            futures[name] = [pool.submit(_read_task, src, rg, c) for rg, c in tasks]
+
+        tables = {}
+        for name, futs in futures.items():
+            results = [f.result() for f in futs]
+            tables[name] = results[0] if plans[name] is None else _assemble(*plans[name], results)
+    return tables
+
+
+def load_datasets(paths, columns=None, max_workers=MAX_WORKERS, verbose=False):
+    """{name: pandas DataFrame} for {name: path}, all files read concurrently."""
+    t0 = time.perf_counter()
+    tables = load_tables(paths, columns, max_workers)
+    # self_destruct releases each Arrow column as soon as it is converted (lower peak RSS)
+    frames = {name: tables.pop(name).to_pandas(split_blocks=True, self_destruct=True) for name in list(tables)}
+    if verbose:
+        rows = sum(len(df) for df in frames.values())
+        print(f"Loaded {len(frames)} datasets ({rows:,} rows) in {time.perf_counter() - t0:.2f}s "
+              f"with {io_workers(max_workers)} I/O threads")
+    return frames
+
+
+def load_parquet(path, columns=None, max_workers=MAX_WORKERS):
+    """One file, row groups / column groups decoded in parallel."""
+    return load_datasets({"data": path}, columns, max_workers)["data"]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare sequential vs concurrent loading of parquet files.")
+    parser.add_argument("paths", nargs="+")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS)
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    sequential = {p: pd.read_parquet(resolve(p)) if not is_arrow(resolve(p)) else read_table(p).to_pandas()
+                  for p in args.paths}
+    t_seq = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    concurrent = load_datasets({p: p for p in args.paths}, max_workers=args.workers)
+    t_conc = time.perf_counter() - t0
+    for p in args.paths:
+        pd.testing.assert_frame_equal(sequential[p], concurrent[p], check_dtype=True)
+    print(f"sequential {t_seq:.2f}s  concurrent {t_conc:.2f}s ({io_workers(args.workers)} threads)  "
+          f"-> {t_seq / max(t_conc, 1e-9):.2f}x, outputs identical")
@@ -6,6 +6,17 @@ Schema Sentinel - Crashes Dataset Conditioning
 import pandas as pd
 import os
 
+from concurrent_loader import load_parquet
+from intermediate_io import write_intermediate
+from step_trace import Tracer
+from reverse_geocode import (
+    BOROUGH_NAME_FIELDS,
+    ZCTA_NAME_FIELDS,
+    PolygonGridIndex,
+    backfill_from_coordinates,
+    load_geojson_polygons,
+)
+
 # --------------------------
 # CONFIGURATION
 # --------------------------
@@ -13,9 +24,24 @@ RAW_DATA_PATH = ""
 OUTPUT_PATH = ""
 os.makedirs(OUTPUT_PATH, exist_ok=True)
 
+# Step timing / memory (enable with SCHEMA_SENTINEL_TRACE=1)
+trace = Tracer("crashes_conditioning")
+
 INPUT_FILE = f"{RAW_DATA_PATH}/Motor_Vehicle_Collisions_-_Crashes_20251111.parquet"
 OUTPUT_FILE = f"{OUTPUT_PATH}/crashes_POST_conditioning.parquet"
 
+# Local boundary files for backfilling blank borough / zip_code (skipped if missing)
+BOROUGH_BOUNDARY_FILE = f"{RAW_DATA_PATH}/nyc_borough_boundaries.geojson"
+ZCTA_BOUNDARY_FILE = f"{RAW_DATA_PATH}/nyc_zcta_boundaries.geojson"
+
+# Backend: pandas (reference) or the polars lazy engine (SCHEMA_SENTINEL_BACKEND=polars)
+BACKEND = os.environ.get("SCHEMA_SENTINEL_BACKEND", "pandas")
+if BACKEND == "polars":
+    from polars_pipeline import run_stage
+    run_stage("crashes", RAW_DATA_PATH, OUTPUT_PATH,
+              boundary_files={"borough": BOROUGH_BOUNDARY_FILE, "zip_code": ZCTA_BOUNDARY_FILE})
+    raise SystemExit(0)
+
 print("=" * 80)
 print("CRASHES DATASET CONDITIONING - PIPELINE")
 print("=" * 80)
@@ -24,17 +50,20 @@ print("=" * 80)
 # STEP 1: LOAD & PROFILE
 # --------------------------
 print("\nSTEP 1: Loading crashes parquet file...")
-crash_raw = pd.read_parquet(INPUT_FILE)
+trace.step("STEP 1: Loading crashes parquet file")
+crash_raw = load_parquet(INPUT_FILE)
 
 print(f"Records: {len(crash_raw):,}")
 print(f"Columns: {len(crash_raw.columns)}")
 print("\nSample of column names:")
 print(crash_raw.columns.tolist()[:20])
+trace.end(rows_out=crash_raw)
 
 # --------------------------
 # STEP 2: AUTO-DETECT COLLISION ID COLUMN
 # --------------------------
 print("\nSTEP 2: Detecting collision ID column...")
+trace.step("STEP 2: Detecting collision id column", rows_in=crash_raw)
 
 id_col_candidates = [
     c for c in crash_raw.columns
@@ -54,11 +83,13 @@ null_id = crash_raw["collision_id"].isna().sum()
 dup_id = crash_raw["collision_id"].duplicated().sum()
 print(f"Null collision_id: {null_id:,}")
 print(f"Duplicate collision_id: {dup_id:,}")
+trace.end(rows_out=crash_raw)
 
 # --------------------------
 # STEP 3: STANDARDIZE DATES
 # --------------------------
 print("\nSTEP 3: Standardizing crash_date and merge_date...")
+trace.step("STEP 3: Standardizing crash_date and merge_date", rows_in=crash_raw)
 
 # Identify potential crash date column
 date_col_candidates = [
@@ -80,11 +111,13 @@ crash_df["crash_date"] = pd.to_datetime(crash_df[src_date_col], errors="coerce")
 crash_df["merge_date"] = crash_df["crash_date"].dt.date
 
 print(f"Date range: {crash_df['crash_date'].min()} -> {crash_df['crash_date'].max()}")
+trace.end(rows_out=crash_df)
 
 # --------------------------
 # STEP 4: SELECT & RENAME ANALYTICAL COLUMNS
 # --------------------------
 print("\nSTEP 4: Selecting standardized analytical columns...")
+trace.step("STEP 4: Selecting standardized analytical columns", rows_in=crash_df)
 
 def pick(candidates):
     """Return the first matching column from a list of candidates."""
@@ -139,11 +172,45 @@ crashes_clean = crashes_clean.rename(columns=rename_map)
 
 print(f"Final crashes columns: {list(crashes_clean.columns)}")
 print(f"Final records: {len(crashes_clean):,}")
+trace.end(rows_out=crashes_clean)
+
+# --------------------------
+# STEP 5: BACKFILL BOROUGH / ZIP CODE FROM COORDINATES
+# --------------------------
+print("\nSTEP 5: Backfilling blank borough and zip_code from latitude/longitude...")
+trace.step("STEP 5: Backfilling blank borough and zip_code from latitude/longitude", rows_in=crashes_clean)
+
+for column, boundary_file, name_fields, normalize in [
+    ("borough", BOROUGH_BOUNDARY_FILE, BOROUGH_NAME_FIELDS, lambda v: v.upper()),
+    ("zip_code", ZCTA_BOUNDARY_FILE, ZCTA_NAME_FIELDS, lambda v: v.strip()[:5]),
+]:
+    if not os.path.exists(boundary_file):
+        print(f"Warning: {boundary_file} not found. Skipping {column} backfill.")
+        continue
+    if not {"latitude", "longitude"}.issubset(crashes_clean.columns):
+        print(f"Warning: latitude/longitude not available. Skipping {column} backfill.")
+        continue
+
+    if column in crashes_clean.columns:
+        blank_before = (
+            crashes_clean[column].isna() | (crashes_clean[column].astype(str).str.strip() == "")
+        ).sum()
+    else:
+        blank_before = len(crashes_clean)
+    labels, rings = load_geojson_polygons(boundary_file, name_fields)
+    polygon_index = PolygonGridIndex(labels, rings)
+    recovered = backfill_from_coordinates(crashes_clean, column, polygon_index, normalize=normalize)
+
+    print(f"{column}: {len(labels):,} boundary polygons loaded")
+    print(f"{column}: blank before = {blank_before:,}, recovered from coordinates = {recovered:,}")
+
+trace.end(rows_out=crashes_clean)
 
 # --------------------------
-# STEP 5: QUALITY CHECKS
+# STEP 6: QUALITY CHECKS
 # --------------------------
-print("\nSTEP 5: Running quality checks...")
+print("\nSTEP 6: Running quality checks...")
+trace.step("STEP 6: Running quality checks", rows_in=crashes_clean)
 
 null_ids = crashes_clean["collision_id"].isna().sum()
 dups = crashes_clean["collision_id"].duplicated().sum()
@@ -155,16 +222,19 @@ assert crashes_clean["merge_date"].isna().sum() == 0, "merge_date has nulls!"
 print("merge_date valid: no nulls detected.")
 
 print("Basic validation passed.")
+trace.end(rows_out=crashes_clean)
 
 # --------------------------
-# STEP 6: SAVE CONDITIONED DATASET
+# STEP 7: SAVE CONDITIONED DATASET
 # --------------------------
-print("\nSTEP 6: Saving conditioned crashes dataset...")
-crashes_clean.to_parquet(OUTPUT_FILE, index=False)
-print(f"Saved: {OUTPUT_FILE}")
+print("\nSTEP 7: Saving conditioned crashes dataset...")
+trace.step("STEP 7: Saving conditioned crashes dataset", rows_in=crashes_clean)
+saved_path = write_intermediate(crashes_clean, OUTPUT_FILE)
+print(f"Saved: {saved_path}")
+trace.end(rows_out=crashes_clean)
 
 print("\n" + "=" * 80)
 print("CRASHES CONDITIONING COMPLETE")
 print("=" * 80)
 
-shared-datasets/pipeline_project_data/NYC_data/schema_sentinel_integrated.parquet
\ No newline at end of file
+trace.finish()
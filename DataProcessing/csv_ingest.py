@@ -0,0 +1,285 @@
+"""
+Schema Sentinel - Raw CSV Ingestion
+-----------------------------------
+Converts the raw NYC Open Data / NOAA CSV exports to typed parquet ONCE, so
+no stage (or notebook) has to re-parse a multi-GB CSV:
+
+    Motor_Vehicle_Collisions_-_Person.csv    -> person_full.parquet
+    Motor_Vehicle_Collisions_-_Vehicles.csv  -> vehicles_full.parquet
+    Motor_Vehicle_Collisions_-_Crashes*.csv  -> <same name>.parquet
+    nyc weather data.csv                     -> nyc weather data.parquet
+
+The CSV is streamed with pyarrow.csv.open_csv (multithreaded block parsing,
+BLOCK_SIZE_MB per batch) and every batch is converted and appended to the
+parquet file as its own row group, so memory stays at a few blocks whatever
+the file size.
+
+The schema is pinned per dataset (PROFILES) instead of inferred:
+- ids      -> int64
+- dates    -> timestamp[us] at midnight, what pd.to_datetime gives the
+              stages for the string dates (MM/DD/YYYY, YYYY-MM-DD and
+              YYYY-MM-DDT... accepted)
+- times    -> string, validated as H:MM / HH:MM[:SS] (stages parse "%H:%M")
+- ages and measures -> float64
+- everything else stays string (ZIP codes keep their leading zeros)
+
+A value that does not parse as its pinned type becomes null and is counted;
+the per-column error counts (with a few example values) are printed and
+returned, and can be written to a JSON report. Person / vehicle headers are
+lower-cased to the names the conditioning scripts read (person_full.parquet);
+--keep-names keeps the CSV headers (e.g. for the XGBoost notebook and
+AgeAndGender.R, which use PERSON_AGE / PERSON_SEX).
+
+    python csv_ingest.py Motor_Vehicle_Collisions_-_Person.csv --out raw
+    python csv_ingest.py "nyc weather data.csv" --report weather_ingest.json
+    python csv_ingest.py big.csv --profile person --output person.parquet --keep-names
+"""
+
+import argparse
+import csv
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pv
+import pyarrow.parquet as pq
+
+# --------------------------
+# CONFIGURATION
+# --------------------------
+BLOCK_SIZE_MB = 64                  # CSV bytes parsed per batch (one parquet row group each)
+COMPRESSION = "zstd"
+# (strptime format, regex capturing the day field); arrow rolls 02/30 over to
+# 03/02, so the parsed day must equal the written one
+DATE_FORMATS = [("%m/%d/%Y", r"^\s*\d{1,2}/(?P<day>\d{1,2})/"),
+                ("%Y-%m-%d", r"^\s*\d{4}-\d{1,2}-(?P<day>\d{1,2})")]
+ERROR_EXAMPLES = 5                  # bad values kept per column for the report
+
+INT_PATTERN = r"^\s*[-+]?\d{1,18}\s*$"
+FLOAT_PATTERN = r"^\s*[-+]?(\d+\.?\d*|\.\d+)([eE][-+]?\d+)?\s*$"
+TIME_PATTERN = r"^\s*\d{1,2}:\d{2}(:\d{2})?\s*$"
+
+TYPES = {
+    "id": pa.int64(),
+    "date": pa.timestamp("us"),
+    "time": pa.string(),
+    "float": pa.float64(),
+    "string": pa.string(),
+}
+
+# Column kinds per dataset, keyed by lower-case header; unlisted columns get "default".
+# Profiles are matched against the file name in this order.
+PROFILES = {
+    "person": {
+        "match": "person", "output": "person_full.parquet", "lowercase": True, "default": "string",
+        "columns": {"unique_id": "id", "collision_id": "id", "crash_date": "date", "crash_time": "time",
+                    "vehicle_id": "id", "person_age": "float"},
+    },
+    "crashes": {
+        "match": "crash", "output": None, "lowercase": False, "default": "string",
+        "columns": {"crash date": "date", "crash time": "time", "latitude": "float", "longitude": "float",
+                    "collision_id": "id",
+                    **{f"number of {who} {what}": "float"
+                       for who in ("persons", "pedestrians", "cyclist", "motorist")
+                       for what in ("injured", "killed")}},
+    },
+    "vehicles": {
+        "match": "vehicle", "output": "vehicles_full.parquet", "lowercase": True, "default": "string",
+        "columns": {"unique_id": "id", "collision_id": "id", "crash_date": "date", "crash_time": "time",
+                    "vehicle_year": "float", "vehicle_occupants": "float"},
+    },
+    "weather": {
+        "match": "weather", "output": None, "lowercase": False, "default": "float",
+        "columns": {"station": "string", "name": "string", "date": "date"},
+    },
+}
+
+
+def detect_profile(path):
+    """Dataset profile from the file name (person / vehicles / crashes / weather)."""
+    name = os.path.basename(path).lower()
+    # "Motor_Vehicle_Collisions_-_Crashes.csv": only the part after the prefix
+    # names the dataset (the prefix itself contains "vehicle")
+    name = name.split("collisions_-_", 1)[-1]
+    for profile, spec in PROFILES.items():
+        if spec["match"] in name:
+            return profile
+    raise ValueError(f"Cannot tell the dataset of {path!r}; pass --profile ({', '.join(PROFILES)})")
+
+
+def output_path(path, profile, out_dir=None):
+    """Parquet written for `path`: the profile's raw file name, else the CSV stem."""
+    name = PROFILES[profile]["output"] or os.path.splitext(os.path.basename(path))[0] + ".parquet"
+    return os.path.join(out_dir if out_dir is not None else os.path.dirname(path), name)
+
+
+def read_header(path, delimiter=","):
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        return next(csv.reader(f, delimiter=delimiter))
+
+
+def pinned_schema(header, profile, keep_names=False):
+    """(output schema, {csv column: kind}) for a CSV header."""
+    spec = PROFILES[profile]
+    kinds = {c: spec["columns"].get(c.strip().lower(), spec["default"]) for c in header}
+    rename = spec["lowercase"] and not keep_names
+    fields = [pa.field(c.strip().lower() if rename else c, TYPES[kinds[c]]) for c in header]
+    return pa.schema(fields), kinds
+
+
+def ingested_path(csv_path, profile=None):
+    """
+    The typed parquet ingest_csv wrote next to `csv_path`, or None when it is
+    missing or older than the CSV (then the caller reads the CSV).
+    """
+    parquet = output_path(csv_path, profile or detect_profile(csv_path))
+    if not os.path.exists(parquet):
+        return None
+    if os.path.exists(csv_path) and os.path.getmtime(csv_path) > os.path.getmtime(parquet):
+        return None
+    return parquet
+
+
+# --------------------------
+# Tolerant conversion
+# --------------------------
+def _parse_dates(text):
+    head = pc.utf8_slice_codeunits(pc.utf8_trim_whitespace(text), 0, 10)   # drops a T00:00:00.000 suffix
+    parsed = []
+    for fmt, day_pattern in DATE_FORMATS:
+        values = pc.strptime(head, format=fmt, unit="s", error_is_null=True)
+        day = pc.cast(pc.struct_field(pc.extract_regex(head, day_pattern), [0]), pa.int64())
+        valid = pc.fill_null(pc.equal(pc.day(values), day), False)
+        parsed.append(pc.if_else(valid, values, pa.scalar(None, values.type)))
+    return pc.cast(pc.coalesce(*parsed), TYPES["date"])
+
+
+def convert_column(text, kind):
+    """
+    Convert a string column to its pinned kind. Returns (array, bad mask);
+    values that do not parse are null in the array and True in the mask.
+    """
+    if kind == "string":
+        return text, None
+    if kind == "date":
+        values = _parse_dates(text)
+    else:
+        pattern = {"id": INT_PATTERN, "float": FLOAT_PATTERN, "time": TIME_PATTERN}[kind]
+        ok = pc.match_substring_regex(text, pattern)
+        clean = pc.if_else(ok, pc.utf8_trim_whitespace(text), pa.scalar(None, pa.string()))
+        values = clean if kind == "time" else pc.cast(clean, TYPES[kind])
+    bad = pc.and_(pc.is_valid(text), pc.is_null(values))
+    return values, bad
+
+
+def convert_batch(batch, kinds, schema, pool):
+    """Typed table for one CSV batch, plus {column: (errors, examples)}."""
+    names = batch.schema.names
+    results = list(pool.map(lambda i: convert_column(batch.column(i), kinds[names[i]]), range(len(names))))
+    errors = {}
+    for name, (values, bad) in zip(names, results):
+        if bad is None:
+            continue
+        n_bad = pc.sum(bad).as_py() or 0
+        if n_bad:
+            examples = pc.filter(batch.column(name), bad).slice(0, ERROR_EXAMPLES).to_pylist()
+            errors[name] = (n_bad, examples)
+    return pa.Table.from_arrays([values for values, _ in results], schema=schema), errors
+
+
+# --------------------------
+# Ingestion
+# --------------------------
+def ingest_csv(path, output=None, profile=None, keep_names=False, block_size_mb=BLOCK_SIZE_MB,
+               delimiter=",", verbose=True):
+    """Stream one CSV into typed parquet; returns the ingestion report (dict)."""
+    t0 = time.perf_counter()
+    profile = profile or detect_profile(path)
+    output = output or output_path(path, profile)
+    header = read_header(path, delimiter)
+    schema, kinds = pinned_schema(header, profile, keep_names)
+
+    # Everything is read as string and converted per column, so one bad value
+    # is counted and nulled instead of failing the whole file
+    reader = pv.open_csv(
+        path,
+        # header names come from read_header (which also strips a UTF-8 BOM)
+        read_options=pv.ReadOptions(use_threads=True, block_size=block_size_mb << 20,
+                                    column_names=header, skip_rows=1),
+        parse_options=pv.ParseOptions(delimiter=delimiter),
+        convert_options=pv.ConvertOptions(column_types={c: pa.string() for c in header},
+                                          strings_can_be_null=True, quoted_strings_can_be_null=True),
+    )
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    tmp = output + ".tmp"
+    rows, batches = 0, 0
+    errors = {c: 0 for c in header if kinds[c] != "string"}
+    examples = {}
+    with ThreadPoolExecutor(max_workers=pa.cpu_count(), thread_name_prefix="ingest") as pool, \
+            pq.ParquetWriter(tmp, schema, compression=COMPRESSION) as writer:
+        for batch in reader:
+            table, batch_errors = convert_batch(batch, kinds, schema, pool)
+            writer.write_table(table)
+            rows += table.num_rows
+            batches += 1
+            for name, (n_bad, sample) in batch_errors.items():
+                errors[name] += n_bad
+                examples.setdefault(name, [])
+                examples[name] = (examples[name] + sample)[:ERROR_EXAMPLES]
+            if verbose:
+                print(f"  {rows:,} rows", end="\r", flush=True)
+    os.replace(tmp, output)
+
+    report = {
+        "source": path,
+        "output": output,
+        "profile": profile,
+        "rows": rows,
+        "row_groups": batches,
+        "seconds": round(time.perf_counter() - t0, 3),
+        "source_mb": round(os.path.getsize(path) / 1e6, 1),
+        "output_mb": round(os.path.getsize(output) / 1e6, 1),
+        "schema": {f.name: str(f.type) for f in schema},
+        "parse_errors": {c: {"kind": kinds[c], "errors": n, "examples": examples.get(c, [])}
+                         for c, n in errors.items()},
+    }
+    if verbose:
+        print_report(report)
+    return report
+
+
+def print_report(report):
+    print(f"\nIngested {report['source']} -> {report['output']}")
+    print(f"  {report['rows']:,} rows in {report['row_groups']} row groups, {report['seconds']:.1f}s "
+          f"({report['source_mb']:,.1f} MB CSV -> {report['output_mb']:,.1f} MB parquet)")
+    print("  parse errors per typed column:")
+    for column, info in report["parse_errors"].items():
+        sample = f"  e.g. {info['examples']}" if info["examples"] else ""
+        print(f"    {column:32} {info['kind']:6} {info['errors']:>10,}{sample}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stream raw CSV exports into typed parquet.")
+    parser.add_argument("paths", nargs="+", help="CSV files")
+    parser.add_argument("--out", help="output directory (default: next to each CSV)")
+    parser.add_argument("--output", help="output file (single CSV only)")
+    parser.add_argument("--profile", choices=list(PROFILES), help="dataset (default: from the file name)")
+    parser.add_argument("--keep-names", action="store_true", help="keep the CSV header names")
+    parser.add_argument("--block-mb", type=int, default=BLOCK_SIZE_MB)
+    parser.add_argument("--report", help="write the ingestion report(s) to this JSON file")
+    args = parser.parse_args()
+
+    if args.output and len(args.paths) > 1:
+        parser.error("--output needs a single CSV; use --out for a directory")
+    reports = []
+    for p in args.paths:
+        prof = args.profile or detect_profile(p)
+        target = args.output or output_path(p, prof, args.out)
+        reports.append(ingest_csv(p, target, prof, args.keep_names, args.block_mb))
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(reports if len(reports) > 1 else reports[0], f, indent=2, default=str)
+        print(f"\nReport saved: {args.report}")
@@ -0,0 +1,161 @@
+"""
+Schema Sentinel - Intermediate Hand-off Format
+----------------------------------------------
+Read / write helpers for files that one pipeline stage writes and the next
+stage reads back:
+
+- *_POST_conditioning.parquet               (conditioning -> integration)
+- schema_sentinel_integrated.parquet        (integration -> severity factors)
+- schema_sentinel_integrated_with_severity  (severity factors -> 5-year window)
+
+By default these stay compressed parquet. With
+SCHEMA_SENTINEL_INTERMEDIATE=arrow they are written as uncompressed Arrow IPC
+(Feather v2) next to the parquet name (same stem, .arrow suffix). The reader
+memory-maps the file, so a downstream stage gets the column buffers straight
+from the page cache with no decompression or decoding. Published artifacts
+(schema_sentinel_last5yrs.parquet, the CSVs, PRE snapshots) are always parquet.
+
+schema_sentinel_integrated.parquet is both: the builder's documented output,
+read directly by the models (XGBoostExternalMemory, SeverityBatchScoring). It
+is written with publish=True, which always writes the parquet and, in arrow
+mode, the .arrow hand-off next to it; neither copy is removed as stale.
+
+Stages keep their configured .parquet paths; the helpers map them to the
+.arrow file when that format is selected, and readers fall back to whichever
+of the two exists.
+
+    from intermediate_io import read_intermediate, write_intermediate
+    write_intermediate(person_df, f"{OUTPUT_PATH}/person_POST_conditioning.parquet")
+    person = read_intermediate(f"{COND_PATH}/person_POST_conditioning.parquet")
+"""
+
+import os
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+INTERMEDIATE_ENV = "SCHEMA_SENTINEL_INTERMEDIATE"
+FORMATS = ("parquet", "arrow")
+ARROW_SUFFIX = ".arrow"
+
+
+def intermediate_format():
+    """Hand-off format from SCHEMA_SENTINEL_INTERMEDIATE (default: parquet)."""
+    fmt = os.environ.get(INTERMEDIATE_ENV, "parquet").strip().lower()
+    if fmt in ("ipc", "feather"):
+        fmt = "arrow"
+    if fmt not in FORMATS:
+        raise ValueError(f"{INTERMEDIATE_ENV} must be one of {FORMATS}, got {fmt!r}")
+    return fmt
+
+
+def intermediate_path(path, fmt=None):
+    """Path the hand-off file is written to for `fmt` (.parquet name -> .arrow for arrow)."""
+    if (fmt or intermediate_format()) == "arrow" and path.endswith(".parquet"):
+        return path[: -len(".parquet")] + ARROW_SUFFIX
+    return path
+
+
+def resolve(path):
+    """Existing file for a hand-off path: the selected format first, then the other one."""
+    preferred = intermediate_path(path)
+    for candidate in (preferred, intermediate_path(path, "arrow"), path):
+        if os.path.exists(candidate):
+            return candidate
+    return preferred
+
+
+def is_arrow(path):
+    return path.endswith(ARROW_SUFFIX)
+
+
+def _drop_stale(path, written):
+    """Remove the other-format copy of a hand-off so readers never pick up old data."""
+    for candidate in (path, intermediate_path(path, "arrow")):
+        if candidate not in written and os.path.exists(candidate):
+            os.remove(candidate)
+
+
+def _write_parquet(df, path):
+    if isinstance(df, pa.Table):
+        pq.write_table(df, path)
+    elif hasattr(df, "write_parquet"):
+        df.write_parquet(path)
+    else:
+        df.to_parquet(path, index=False)
+
+
+def _write_arrow(df, path):
+    if isinstance(df, pa.Table):
+        table = df
+    elif hasattr(df, "to_arrow"):
+        table = df.to_arrow()
+    else:
+        table = pa.Table.from_pandas(df, preserve_index=False)
+    # Uncompressed so the reader can map the buffers directly
+    with pa.OSFile(path, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+
+
+def write_intermediate(df, path, publish=False):
+    """
+    Write a pandas / polars DataFrame or pyarrow Table; returns the hand-off
+    path. publish=True: `path` is also a published parquet output and is
+    always written.
+    """
+    out = intermediate_path(path)
+    if is_arrow(out):
+        _write_arrow(df, out)
+    if not is_arrow(out) or publish:
+        _write_parquet(df, path)
+    _drop_stale(path, {out, path} if publish else {out})
+    return out
+
+
+def sink_intermediate(lf, path, publish=False):
+    """Stream a polars LazyFrame to the hand-off file; returns the hand-off path."""
+    out = intermediate_path(path)
+    if is_arrow(out):
+        lf.sink_ipc(out, compression="uncompressed")
+        if publish:
+            # From the hand-off file: the plan is not run twice
+            import polars as pl
+
+            pl.scan_ipc(out).sink_parquet(path)
+    else:
+        lf.sink_parquet(out)
+    _drop_stale(path, {out, path} if publish else {out})
+    return out
+
+
+def read_table(path, columns=None):
+    """pyarrow Table; Arrow IPC files are memory-mapped (zero-copy)."""
+    src = resolve(path)
+    if is_arrow(src):
+        table = pa.ipc.open_file(pa.memory_map(src, "r")).read_all()
+        return table.select(columns) if columns else table
+    return pq.read_table(src, columns=columns)
+
+
+def read_intermediate(path, columns=None):
+    """pandas DataFrame (same dtypes as pd.read_parquet on the parquet version)."""
+    # split_blocks avoids consolidating columns into 2-D blocks, so numeric
+    # columns without nulls stay views on the mapped buffers
+    return read_table(path, columns).to_pandas(split_blocks=True)
+
+
+def scan_intermediate(path):
+    """polars LazyFrame over the hand-off file (polars memory-maps Arrow IPC)."""
+    import polars as pl
+
+    src = resolve(path)
+    return pl.scan_ipc(src) if is_arrow(src) else pl.scan_parquet(src)
+
+
+def num_rows(path):
+    """Row count from file metadata, without reading the data."""
+    src = resolve(path)
+    if is_arrow(src):
+        reader = pa.ipc.open_file(pa.memory_map(src, "r"))
+        return sum(reader.get_batch(i).num_rows for i in range(reader.num_record_batches))
+    return pq.ParquetFile(src).metadata.num_rows
@@ -0,0 +1,317 @@
+"""
+Schema Sentinel - Parquet Storage Layout Optimizer
+--------------------------------------------------
+Rewrites a published parquet output so that date-window, borough and
+collision_id filters can skip data instead of scanning the whole file:
+
+- rows sorted by (merge_date, borough, collision_id), recorded as the file's
+  sorting_columns, so every row group covers a narrow date range
+- row groups sized for scans: about TARGET_ROW_GROUP_MB of uncompressed data,
+  clamped to [MIN_ROW_GROUP_ROWS, MAX_ROW_GROUP_ROWS]
+- zstd compression; dictionary encoding only for low-cardinality columns
+  (high-cardinality strings such as ids and street names stay plain)
+- column statistics and the page index (per-page min/max) for every column
+- optional bloom filters (collision_id by default) for point lookups
+
+sink_optimized writes the same layout from a polars LazyFrame one year of
+merge_date at a time, for outputs too large to sort in memory.
+
+The pruning report compares the original and optimized files: size, row
+groups, and for typical filters (recent date window, one month, one borough,
+borough + year, one collision_id) how many row groups min/max statistics let a
+reader skip, plus the measured filtered read time.
+
+    python parquet_layout.py optimize schema_sentinel_last5yrs.parquet            # in place
+    python parquet_layout.py optimize in.parquet --out out.parquet --bloom collision_id
+    python parquet_layout.py report schema_sentinel_last5yrs.parquet
+"""
+
+import argparse
+import datetime as dt
+import os
+import shutil
+import time
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+# --------------------------
+# CONFIGURATION
+# --------------------------
+SORT_KEYS = ["merge_date", "borough", "collision_id"]
+DATE_CANDIDATES = ["merge_date", "crash_date_vehicle", "crash_date_x", "crash_date_person", "crash_date"]
+COMPRESSION = "zstd"
+COMPRESSION_LEVEL = 3
+TARGET_ROW_GROUP_MB = 64
+MIN_ROW_GROUP_ROWS = 50_000
+MAX_ROW_GROUP_ROWS = 1_000_000
+DICTIONARY_MAX_RATIO = 0.05       # dictionary-encode when distinct / rows is below this ...
+DICTIONARY_MAX_VALUES = 50_000    # ... and there are at most this many distinct values
+BLOOM_COLUMNS = ["collision_id"]
+BLOOM_FPP = 0.01
+
+
+def row_group_rows(table, target_mb=TARGET_ROW_GROUP_MB):
+    """Rows per row group so each holds about target_mb of uncompressed data."""
+    bytes_per_row = max(table.nbytes / max(table.num_rows, 1), 1)
+    rows = int(target_mb * 1e6 / bytes_per_row)
+    return int(np.clip(rows, MIN_ROW_GROUP_ROWS, MAX_ROW_GROUP_ROWS))
+
+
+def dictionary_columns(table, sample_rows=200_000):
+    """Columns worth dictionary-encoding: strings / dates with low cardinality (on a sample)."""
+    sample = table.slice(0, min(sample_rows, table.num_rows))
+    chosen = []
+    for name, column in zip(sample.column_names, sample.columns):
+        t = column.type
+        if not (pa.types.is_string(t) or pa.types.is_large_string(t) or pa.types.is_string_view(t)
+                or pa.types.is_date(t) or pa.types.is_dictionary(t)):
+            continue
+        distinct = pc.count_distinct(column).as_py()
+        if distinct <= DICTIONARY_MAX_VALUES and distinct <= max(DICTIONARY_MAX_RATIO * len(column), 1):
+            chosen.append(name)
+    return chosen
+
+
+def sort_table(table, sort_keys=SORT_KEYS):
+    """Sort by the keys that exist (nulls last); returns (table, keys used)."""
+    keys = [k for k in sort_keys if k in table.column_names]
+    if not keys:
+        return table, keys
+    order = pc.sort_indices(table, sort_keys=[(k, "ascending", "at_end") for k in keys])
+    return table.take(order), keys
+
+
+def _layout(table, keys, bloom_columns, target_mb):
+    """Row group size and ParquetWriter options for data shaped like `table`."""
+    rg_rows = row_group_rows(table, target_mb)
+    dictionary = dictionary_columns(table)
+
+    if bloom_columns is True:
+        bloom_columns = BLOOM_COLUMNS
+    bloom = {c: {"ndv": rg_rows, "fpp": BLOOM_FPP} for c in (bloom_columns or []) if c in table.column_names}
+
+    sorting = pq.SortingColumn.from_ordering(table.schema, [(k, "ascending") for k in keys],
+                                             null_placement="at_end") if keys else None
+    options = dict(compression=COMPRESSION, compression_level=COMPRESSION_LEVEL,
+                   use_dictionary=dictionary, write_statistics=True, write_page_index=True,
+                   sorting_columns=sorting, bloom_filter_options=bloom or None)
+    info = {"row_group_rows": rg_rows, "sort_keys": keys,
+            "dictionary_columns": dictionary, "bloom_columns": list(bloom)}
+    return options, info
+
+
+def write_optimized(data, path, sort_keys=SORT_KEYS, bloom_columns=None, target_mb=TARGET_ROW_GROUP_MB):
+    """
+    Write a pandas DataFrame / pyarrow Table with the optimized layout.
+    bloom_columns: None = no bloom filters, True = BLOOM_COLUMNS, or a list.
+    Returns a dict describing the layout used.
+    """
+    table = data if isinstance(data, pa.Table) else pa.Table.from_pandas(data, preserve_index=False)
+    table, keys = sort_table(table, sort_keys)
+    options, info = _layout(table, keys, bloom_columns, target_mb)
+    tmp = path + ".tmp"
+    with pq.ParquetWriter(tmp, table.schema, **options) as writer:
+        writer.write_table(table, row_group_size=info["row_group_rows"])
+    os.replace(tmp, path)
+    return {"rows": table.num_rows, **info}
+
+
+def optimize_file(src, dst=None, **kwargs):
+    """Rewrite an existing parquet file (in place when dst is None)."""
+    return write_optimized(pq.read_table(src), dst or src, **kwargs)
+
+
+def sink_optimized(lf, path, sort_keys=SORT_KEYS, bloom_columns=None, target_mb=TARGET_ROW_GROUP_MB):
+    """
+    write_optimized for a polars LazyFrame without materializing all of it.
+    When the first sort key is a date, the plan is collected and sorted one
+    year at a time (nulls last) and each year is appended to the same writer,
+    so peak memory is about one year of rows instead of the whole result plus
+    its sorted copy. Layout options are chosen from the first year written.
+    """
+    import polars as pl
+
+    schema = lf.collect_schema()
+    keys = [k for k in sort_keys if k in schema.names()]
+    parts = [lf]
+    if keys and schema[keys[0]].is_temporal():
+        first = pl.col(keys[0])
+        years = lf.select(first.dt.year().unique().sort(nulls_last=True)).collect().to_series().to_list()
+        parts = [lf.filter(first.dt.year() == y) if y is not None else lf.filter(first.is_null()) for y in years]
+
+    tmp = path + ".tmp"
+    writer, info, rows = None, None, 0
+    try:
+        for part in parts:
+            table = (part.sort(keys, nulls_last=True, maintain_order=True) if keys else part).collect().to_arrow()
+            if writer is None:
+                options, info = _layout(table, keys, bloom_columns, target_mb)
+                writer = pq.ParquetWriter(tmp, table.schema, **options)
+            writer.write_table(table.cast(writer.schema), row_group_size=info["row_group_rows"])
+            rows += table.num_rows
+            del table
+    finally:
+        if writer is not None:
+            writer.close()
+    if writer is None:
+        return write_optimized(lf.head(0).collect().to_arrow(), path, sort_keys, bloom_columns, target_mb)
+    os.replace(tmp, path)
+    return {"rows": rows, **info}
+
+
+# --------------------------
+# Pruning report
+# --------------------------
+def _date_column(schema):
+    return next((c for c in DATE_CANDIDATES if c in schema.names), None)
+
+
+def typical_filters(path):
+    """
+    Filters analysts run on the windowed data, built from the file's own values.
+    Each filter is a list of (column, low, high) inclusive ranges (AND-ed).
+    """
+    schema = pq.read_schema(path)
+    date_col = _date_column(schema)
+    table = pq.read_table(path, columns=[c for c in dict.fromkeys([date_col, "borough", "collision_id"])
+                                         if c in schema.names])
+    filters = {}
+    if date_col is not None:
+        hi = pc.max(table.column(date_col)).as_py()
+        if hi is not None:
+            is_ts = isinstance(hi, dt.datetime)
+            last = hi.date() if is_ts else hi
+
+            def bound(day, end=False):
+                # inclusive bounds in the column's own type (date or timestamp)
+                if not is_ts:
+                    return day - dt.timedelta(days=1) if end else day
+                return dt.datetime.combine(day, dt.time()) - (dt.timedelta(microseconds=1) if end else dt.timedelta(0))
+
+            month = (last - dt.timedelta(days=180)).replace(day=1)
+            next_month = (month + dt.timedelta(days=32)).replace(day=1)
+            filters["last 12 months"] = [(date_col, bound(last - dt.timedelta(days=365)), hi)]
+            filters[f"one month ({month:%Y-%m})"] = [(date_col, bound(month), bound(next_month, end=True))]
+    if "borough" in table.column_names:
+        counts = pc.value_counts(pc.drop_null(table.column("borough")))
+        if len(counts):
+            top = counts.field("values")[int(np.argmax(counts.field("counts").to_numpy()))].as_py()
+            filters[f"borough = {top}"] = [("borough", top, top)]
+            if "last 12 months" in filters:
+                filters[f"borough = {top}, last 12 months"] = filters["last 12 months"] + [("borough", top, top)]
+    if "collision_id" in table.column_names and table.num_rows:
+        value = table.column("collision_id")[table.num_rows // 3].as_py()
+        filters[f"collision_id = {value}"] = [("collision_id", value, value)]
+    return filters
+
+
+def _stats(metadata, column):
+    """(min, max) per row group for one column (None where statistics are missing)."""
+    idx = metadata.schema.names.index(column)
+    out = []
+    for i in range(metadata.num_row_groups):
+        stats = metadata.row_group(i).column(idx).statistics
+        out.append((stats.min, stats.max) if stats is not None and stats.has_min_max else (None, None))
+    return out
+
+
+def _overlaps(lo_hi, low, high):
+    lo, hi = lo_hi
+    if lo is None or hi is None:
+        return True
+    try:
+        return not (hi < low or lo > high)
+    except TypeError:
+        return True
+
+
+def row_groups_scanned(path, ranges):
+    """Row groups a reader must scan for AND-ed (column, low, high) ranges, and the total."""
+    metadata = pq.ParquetFile(path).metadata
+    keep = np.ones(metadata.num_row_groups, dtype=bool)
+    for column, low, high in ranges:
+        if column not in metadata.schema.names:
+            continue
+        keep &= np.array([_overlaps(s, low, high) for s in _stats(metadata, column)], dtype=bool)
+    return int(keep.sum()), metadata.num_row_groups
+
+
+def _timed_read(path, ranges, repeat=3):
+    filters = [f for column, low, high in ranges for f in ((column, ">=", low), (column, "<=", high))]
+    best, rows = float("inf"), 0
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        rows = pq.read_table(path, filters=filters).num_rows
+        best = min(best, time.perf_counter() - t0)
+    return best, rows
+
+
+def pruning_report(original, optimized):
+    """Size / row-group / pruning comparison between two versions of the same data."""
+    import pandas as pd
+
+    rows = []
+    for label, path in [("original", original), ("optimized", optimized)]:
+        md = pq.ParquetFile(path).metadata
+        rows.append({"filter": "(file)", "version": label, "size_mb": os.path.getsize(path) / 1e6,
+                     "row_groups_scanned": md.num_row_groups, "row_groups": md.num_row_groups,
+                     "skipped": 0.0, "read_s": None, "rows": md.num_rows})
+    for name, ranges in typical_filters(optimized).items():
+        for label, path in [("original", original), ("optimized", optimized)]:
+            scanned, total = row_groups_scanned(path, ranges)
+            read_s, n = _timed_read(path, ranges)
+            rows.append({"filter": name, "version": label, "size_mb": None,
+                         "row_groups_scanned": scanned, "row_groups": total,
+                         "skipped": 1 - scanned / max(total, 1), "read_s": read_s, "rows": n})
+    return pd.DataFrame(rows)
+
+
+def print_report(report):
+    print("\n" + "=" * 80)
+    print("PARQUET LAYOUT - PRUNING REPORT")
+    print("=" * 80)
+    view = report.copy()
+    view["skipped"] = view["skipped"].map(lambda v: f"{v:.0%}")
+    print(view.to_string(index=False, float_format=lambda v: f"{v:,.3f}"))
+
+
+def optimize_and_report(path, out=None, bloom_columns=None):
+    """Optimize `path` (in place unless out is given) and print the pruning report."""
+    target = out or path
+    original = path + ".orig" if out is None else path
+    if out is None:
+        shutil.copyfile(path, original)
+    t0 = time.perf_counter()
+    layout = write_optimized(pq.read_table(original), target, bloom_columns=bloom_columns)
+    print(f"Optimized layout written in {time.perf_counter() - t0:.1f}s: {target}")
+    print(f"  sort keys: {layout['sort_keys']}, {layout['row_group_rows']:,} rows per row group, "
+          f"{COMPRESSION} level {COMPRESSION_LEVEL}")
+    print(f"  dictionary columns: {len(layout['dictionary_columns'])}, bloom filters: {layout['bloom_columns'] or 'none'}")
+    report = pruning_report(original, target)
+    print_report(report)
+    if out is None:
+        os.remove(original)
+    return layout, report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Optimize the storage layout of a published parquet output.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    opt = sub.add_parser("optimize", help="rewrite with the optimized layout and print the pruning report")
+    opt.add_argument("path")
+    opt.add_argument("--out", help="output path (default: rewrite in place)")
+    opt.add_argument("--bloom", nargs="*", help="bloom filter columns (no value = collision_id)")
+    rep = sub.add_parser("report", help="row groups skipped per typical filter for one file")
+    rep.add_argument("path")
+    args = parser.parse_args()
+
+    if args.command == "optimize":
+        bloom = None if args.bloom is None else (args.bloom or True)
+        optimize_and_report(args.path, args.out, bloom)
+    else:
+        for name, ranges in typical_filters(args.path).items():
+            scanned, total = row_groups_scanned(args.path, ranges)
+            print(f"  {name:40} scans {scanned:>4} / {total} row groups ({1 - scanned / max(total, 1):.0%} skipped)")
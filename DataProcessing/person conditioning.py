@@ -2,6 +2,10 @@ import pandas as pd
 import numpy as np
 import os
 
+from concurrent_loader import load_parquet
+from intermediate_io import write_intermediate
+from step_trace import Tracer
+
 # Set paths
 RAW_DATA_PATH = ''
 OUTPUT_PATH = ''
@@ -9,6 +13,16 @@ OUTPUT_PATH = ''
 # Create output directory
 os.makedirs(OUTPUT_PATH, exist_ok=True)
 
+# Backend: pandas (reference) or the polars lazy engine (SCHEMA_SENTINEL_BACKEND=polars)
+BACKEND = os.environ.get("SCHEMA_SENTINEL_BACKEND", "pandas")
+if BACKEND == "polars":
+    from polars_pipeline import run_stage
+    run_stage("person", RAW_DATA_PATH, OUTPUT_PATH)
+    raise SystemExit(0)
+
+# Step timing / memory (enable with SCHEMA_SENTINEL_TRACE=1)
+trace = Tracer("person_conditioning")
+
 print("="*80)
 print("PERSON DATASET CONDITIONING - COMPLETE PIPELINE")
 print("="*80)
@@ -17,7 +31,8 @@ print("="*80)
 # STEP 1: LOAD RAW DATA
 # ============================================================================
 print("\nSTEP 1: Loading raw person data...")
-person_raw = pd.read_parquet(f'{RAW_DATA_PATH}/person_full.parquet')
+trace.step("STEP 1: Loading raw person data")
+person_raw = load_parquet(f'{RAW_DATA_PATH}/person_full.parquet')
 
 print(f"Raw person data loaded: {len(person_raw):,} records")
 print(f"Columns: {len(person_raw.columns)}")
@@ -31,6 +46,7 @@ print(person_raw['person_injury'].value_counts())
 # Save pre-conditioning snapshot
 person_raw.to_parquet(f'{OUTPUT_PATH}/person_PRE_conditioning.parquet', index=False)
 print(f"\nPre-conditioning dataset saved: person_PRE_conditioning.parquet")
+trace.end(rows_out=person_raw)
 
 # ============================================================================
 # STEP 2: DATE STANDARDIZATION
@@ -38,6 +54,7 @@ print(f"\nPre-conditioning dataset saved: person_PRE_conditioning.parquet")
 print("\n" + "="*80)
 print("STEP 2: DATE STANDARDIZATION")
 print("="*80)
+trace.step("STEP 2: Date standardization", rows_in=person_raw)
 
 # Create working copy
 person_df = person_raw.copy()
@@ -58,6 +75,7 @@ print(f"merge_date created: {person_df['merge_date'].head(3).tolist()}")
 
 date_null_count = person_df['crash_date'].isna().sum()
 print(f"\nValidation: {date_null_count:,} null dates ({date_null_count/len(person_df)*100:.2f}%)")
+trace.end(rows_out=person_df)
 
 # ============================================================================
 # STEP 3: BINARY TARGET VARIABLE CREATION
@@ -65,6 +83,7 @@ print(f"\nValidation: {date_null_count:,} null dates ({date_null_count/len(perso
 print("\n" + "="*80)
 print("STEP 3: BINARY TARGET VARIABLE CREATION")
 print("="*80)
+trace.step("STEP 3: Binary target variable creation", rows_in=person_df)
 
 print("\nOriginal person_injury categories:")
 injury_dist = person_df['person_injury'].value_counts()
@@ -114,6 +133,7 @@ no_injury = (person_df['injury_occurred'] == 0).sum()
 injury = (person_df['injury_occurred'] == 1).sum()
 ratio = no_injury / injury
 print(f"\nClass imbalance ratio: {ratio:.1f}:1 (no injury : injury)")
+trace.end(rows_out=person_df)
 
 # ============================================================================
 # STEP 4: VALIDATION
@@ -121,6 +141,7 @@ print(f"\nClass imbalance ratio: {ratio:.1f}:1 (no injury : injury)")
 print("\n" + "="*80)
 print("STEP 4: VALIDATION")
 print("="*80)
+trace.step("STEP 4: Validation", rows_in=person_df)
 
 # Check for data loss
 assert len(person_raw) == len(person_df), "Record count changed!"
@@ -147,6 +168,7 @@ print(f"Injury (1): {injury:,} ({injury/len(person_df)*100:.2f}%)")
 print(f"Class imbalance: {ratio:.1f}:1")
 
 print("\nValidation: All checks passed!")
+trace.end(rows_out=person_df)
 
 # ============================================================================
 # STEP 5: SAVE POST-CONDITIONING
@@ -154,11 +176,13 @@ print("\nValidation: All checks passed!")
 print("\n" + "="*80)
 print("STEP 5: SAVE POST-CONDITIONING DATASET")
 print("="*80)
+trace.step("STEP 5: Save post-conditioning dataset", rows_in=person_df)
 
 # Save full dataset
-person_df.to_parquet(f'{OUTPUT_PATH}/person_POST_conditioning.parquet', index=False)
+write_intermediate(person_df, f'{OUTPUT_PATH}/person_POST_conditioning.parquet')
 
 print(f"\nPost-conditioning dataset saved: person_POST_conditioning.parquet")
+trace.end(rows_out=person_df)
 
 # ============================================================================
 # SUMMARY
@@ -178,4 +202,6 @@ print(f"  Imbalance ratio: {ratio:.1f}:1")
 
 print("\n" + "="*80)
 print("PERSON CONDITIONING COMPLETE!")
-print("="*80)
\ No newline at end of file
+print("="*80)
+
+trace.finish()
\ No newline at end of file
@@ -0,0 +1,418 @@
+"""
+Schema Sentinel - Pipeline Benchmark Suite
+------------------------------------------
+Runs every pipeline stage on fixed-size synthetic inputs (synthetic_nyc_data.py)
+and records, per stage:
+
+- wall time, CPU time (user + system), peak RSS, input rows and rows/s
+
+Each stage is the unmodified repo script run in its own subprocess, so the
+numbers are what a user of that script would see. Only the script's
+configuration assignments (RAW_DATA_PATH, file_path, ...) are replaced with
+paths inside the benchmark work directory; Colab-only lines (drive.mount) are
+dropped and matplotlib runs headless. CPU time comes from os.wait4() on the
+stage's process and peak RSS from its own VmHWM (falling back to ru_maxrss
+off Linux), so every stage is measured on its own.
+
+Results are appended to a JSON history and compared against a stored
+baseline: a stage whose wall time, CPU time or peak RSS grows by more than the
+threshold (or whose rows/s drops by more than it) is flagged as a regression,
+and the suite exits non-zero.
+
+Stages (in pipeline order):
+- conditioning: person, vehicle, weather, crashes
+- integration merge, severity factors, last-5-years window extraction
+- visualization aggregates (Visualizations/*.py)
+- model fits (HistGradientBoosting, random forest, multinomial LR, Poisson,
+  time series decomposition)
+
+Usage:
+    python pipeline_benchmark.py --persons 200000                    # run + compare
+    python pipeline_benchmark.py --persons 200000 --save-baseline    # accept as baseline
+    python pipeline_benchmark.py --stages conditioning integration --repeat 3
+    python pipeline_benchmark.py --stages conditioning integration --intermediate arrow
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import pandas as pd
+
+from intermediate_io import FORMATS, INTERMEDIATE_ENV, num_rows, resolve
+from synthetic_nyc_data import SEED, generate
+
+# --------------------------
+# CONFIGURATION
+# --------------------------
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WORK_DIR = "benchmark_work"
+HISTORY_FILE = "benchmark_history.json"
+BASELINE_FILE = "benchmark_baseline.json"
+
+PERSONS = 200_000                 # fixed input size (person rows) for comparable runs
+THRESHOLD = 0.15                  # flag > 15% worse than baseline
+MIN_SECONDS = 0.5                 # ignore time regressions on stages faster than this
+
+# Notebook-cell visualization scripts expect `df` (with `severe`) to exist already
+SEVERITY_PRELUDE = (
+    "import numpy as np\n"
+    "import pandas as pd\n"
+    "import matplotlib.pyplot as plt\n"
+    "import seaborn as sns\n"
+    "df = pd.read_parquet('person_vehicle_weather.parquet')\n"
+    "df['severe'] = np.where(df['person_injury'].isin(['Injured', 'Killed']), 1, 0)\n"
+)
+
+# script: path relative to the repo root
+# config: top-level assignments to override (paths relative to the work dir)
+# rows:   input file whose row count defines rows/s
+STAGES = [
+    {"name": "person_conditioning", "group": "conditioning",
+     "script": "DataProcessing/person conditioning.py",
+     "config": {"RAW_DATA_PATH": "raw", "OUTPUT_PATH": "cond"},
+     "rows": "raw/person_full.parquet"},
+    {"name": "vehicle_conditioning", "group": "conditioning",
+     "script": "DataProcessing/vehicle conditioning.py",
+     "config": {"RAW_DATA_PATH": "raw", "OUTPUT_PATH": "cond"},
+     "rows": "raw/vehicles_full.parquet"},
+    {"name": "weather_conditioning", "group": "conditioning",
+     "script": "DataProcessing/weather conditioning.py",
+     "config": {"RAW_DATA_PATH": "raw", "OUTPUT_PATH": "cond"},
+     "rows": "raw/nyc weather data.csv"},
+    {"name": "crashes_conditioning", "group": "conditioning",
+     "script": "DataProcessing/crashes dataset conditioning.py",
+     "config": {"RAW_DATA_PATH": "raw", "OUTPUT_PATH": "cond"},
+     "rows": "raw/Motor_Vehicle_Collisions_-_Crashes_20251111.parquet"},
+    {"name": "integration", "group": "integration",
+     "script": "DataProcessing/Schema Sentinel - Integrated Analytical Dataset Builder.py",
+     "config": {"BASE_PATH": ".", "COND_PATH": "cond", "OUT_PATH": "."},
+     "rows": "cond/person_POST_conditioning.parquet"},
+    {"name": "severity_factors", "group": "integration",
+     "script": "DataProcessing/Schema Sentinel - Add Injury and Collis.py",
+     "config": {"BASE_PATH": ".", "INTEGRATED_FILE": "schema_sentinel_integrated.parquet",
+                "OUTPUT_FILE": "schema_sentinel_integrated_with_severity.parquet"},
+     "rows": "schema_sentinel_integrated.parquet"},
+    {"name": "window_extraction", "group": "integration",
+     "script": "DataProcessing/SchemaSential_last5yrs.py",
+     "config": {"file_path": "schema_sentinel_integrated_with_severity.parquet",
+                "output_path": "schema_sentinel_last5yrs.parquet"},
+     "rows": "schema_sentinel_integrated_with_severity.parquet"},
+    {"name": "viz_license_status", "group": "visualization",
+     "script": "Visualizations/CollisionSeveritybyLicenseStatusCode.py",
+     "config": {"file_path": "schema_sentinel_last5yrs.parquet"},
+     "rows": "schema_sentinel_last5yrs.parquet"},
+    {"name": "viz_time_of_day", "group": "visualization",
+     "script": "Visualizations/CollisionsByTimeOfDayRange.py",
+     "config": {"file_path": "schema_sentinel_last5yrs.parquet"},
+     "rows": "schema_sentinel_last5yrs.parquet"},
+    {"name": "viz_trends", "group": "visualization",
+     "script": "Visualizations/NycCollisionTrendsOverTime.py",
+     "config": {"file_path": "schema_sentinel_last5yrs.parquet"},
+     "rows": "schema_sentinel_last5yrs.parquet"},
+    {"name": "viz_most_common", "group": "visualization",
+     "script": "Visualizations/NycMostCommonCollisions.py",
+     "config": {"file_path": "schema_sentinel_last5yrs.parquet"},
+     "rows": "schema_sentinel_last5yrs.parquet"},
+    {"name": "viz_severity_age", "group": "visualization",
+     "script": "Visualizations/severity by age_2.py", "prelude": SEVERITY_PRELUDE,
+     "rows": "person_vehicle_weather.parquet"},
+    {"name": "viz_severity_weather", "group": "visualization",
+     "script": "Visualizations/severity by weather.py", "prelude": SEVERITY_PRELUDE,
+     "rows": "person_vehicle_weather.parquet"},
+    {"name": "viz_severity_time", "group": "visualization",
+     "script": "Visualizations/severity by time of day.py", "prelude": SEVERITY_PRELUDE,
+     "rows": "person_vehicle_weather.parquet"},
+    {"name": "model_hist_gradient_boosting", "group": "models",
+     "script": "Algorithms/HistGradientBoosting.py",
+     "config": {"file_path": "person_vehicle_weather.parquet"},
+     "rows": "person_vehicle_weather.parquet"},
+    {"name": "model_random_forest", "group": "models",
+     "script": "Algorithms/random forest.py",
+     "rows": "person_vehicle_weather.parquet"},
+    {"name": "model_multinomial_lr", "group": "models",
+     "script": "Algorithms/MultinomialLogisticRegression.py",
+     "config": {"file_path": "schema_sentinel_last5yrs.parquet"},
+     "rows": "schema_sentinel_last5yrs.parquet"},
+    {"name": "model_poisson", "group": "models",
+     "script": "Algorithms/PoissonRegression.py",
+     "config": {"file_path": "schema_sentinel_last5yrs.parquet"},
+     "rows": "schema_sentinel_last5yrs.parquet"},
+    {"name": "model_time_series", "group": "models",
+     "script": "Algorithms/TimeSeriesDecomposition.py",
+     "config": {"file_path": "schema_sentinel_last5yrs.parquet"},
+     "rows": "schema_sentinel_last5yrs.parquet"},
+]
+
+# Lines that only make sense inside Colab
+DROP_LINES = [r"^\s*from google\.colab import", r"^\s*drive\.mount\("]
+
+# Runs inside the stage subprocess: apply config overrides, then exec the script
+_BOOTSTRAP = r"""
+import atexit, json, os, re, sys
+spec = json.loads(sys.argv[1])
+
+def _report_hwm():
+    # VmHWM is reset by exec, unlike ru_maxrss which inherits the parent's peak
+    try:
+        with open("/proc/self/status") as f:
+            kb = next(int(line.split()[1]) for line in f if line.startswith("VmHWM:"))
+        with open(spec["hwm_file"], "w") as f:
+            f.write(str(kb))
+    except (OSError, StopIteration):
+        pass
+
+atexit.register(_report_hwm)
+source = open(spec["script"], encoding="utf-8").read().replace("\r\n", "\n")
+for pattern in spec["drop"]:
+    source = re.sub(pattern + r".*$", "pass", source, flags=re.M)
+for name, value in spec["config"].items():
+    source, n = re.subn(r"^" + re.escape(name) + r"\s*=.*$", name + " = " + repr(value), source, count=1, flags=re.M)
+    if not n:
+        sys.exit(f"benchmark: config '{name}' not found in {spec['script']}")
+sys.path.insert(0, os.path.dirname(spec["script"]))
+sys.argv = [spec["script"]]
+glb = {"__name__": "__main__", "__file__": spec["script"]}
+if spec["prelude"]:
+    exec(compile(spec["prelude"], "<prelude>", "exec"), glb)
+exec(compile(source, spec["script"], "exec"), glb)
+"""
+
+
+# --------------------------
+# Inputs
+# --------------------------
+def count_rows(path):
+    """Row count of a parquet / Arrow IPC hand-off (from metadata) or CSV file."""
+    if path.endswith(".parquet"):
+        return num_rows(path)
+    with open(path, "rb") as f:
+        return max(sum(1 for _ in f) - 1, 0)
+
+
+def prepare_inputs(work_dir, persons, seed=SEED):
+    """Generate the synthetic raw files once per (persons, seed)."""
+    raw = os.path.join(work_dir, "raw")
+    stamp = os.path.join(raw, "generated.json")
+    wanted = {"persons": persons, "seed": seed}
+    if os.path.exists(stamp):
+        with open(stamp) as f:
+            if json.load(f).get("params") == wanted:
+                return
+    counts = generate(raw, persons=persons, seed=seed)
+    with open(stamp, "w") as f:
+        json.dump({"params": wanted, "counts": counts}, f)
+
+
+def prepare_person_vehicle_weather(work_dir):
+    """
+    Person-level model input used by HistGradientBoosting.py / random forest.py
+    and the severity visualizations: the 5-year window with the vehicle's
+    contributing factor as contributing_factor_1.
+    """
+    src = os.path.join(work_dir, "schema_sentinel_last5yrs.parquet")
+    if not os.path.exists(src):
+        return
+    df = pd.read_parquet(src)
+    if "contributing_factor_1" not in df.columns and "contributing_factor_1_vehicle" in df.columns:
+        df = df.rename(columns={"contributing_factor_1_vehicle": "contributing_factor_1"})
+    df.to_parquet(os.path.join(work_dir, "person_vehicle_weather.parquet"), index=False)
+
+
+# --------------------------
+# Run one stage
+# --------------------------
+def run_stage(stage, work_dir):
+    """Run a stage script in a subprocess and measure it."""
+    spec = {
+        "script": os.path.join(REPO_ROOT, stage["script"]),
+        "config": stage.get("config", {}),
+        "prelude": stage.get("prelude", ""),
+        "drop": DROP_LINES,
+        "hwm_file": os.path.join(work_dir, "logs", f"{stage['name']}.hwm"),
+    }
+    rows_path = os.path.join(work_dir, stage["rows"])
+    rows = count_rows(rows_path) if os.path.exists(resolve(rows_path)) else None
+
+    os.makedirs(os.path.join(work_dir, "logs"), exist_ok=True)
+    log_path = os.path.join(work_dir, "logs", f"{stage['name']}.log")
+    env = dict(os.environ, MPLBACKEND="Agg", PYTHONUNBUFFERED="1")
+
+    with open(log_path, "w") as log:
+        t0 = time.perf_counter()
+        proc = subprocess.Popen([sys.executable, "-c", _BOOTSTRAP, json.dumps(spec)],
+                                cwd=work_dir, env=env, stdout=log, stderr=subprocess.STDOUT)
+        _, status, usage = os.wait4(proc.pid, 0)
+        wall = time.perf_counter() - t0
+    proc.returncode = os.waitstatus_to_exitcode(status)
+
+    peak_kb = usage.ru_maxrss / 1024 if platform.system() == "Darwin" else usage.ru_maxrss
+    if os.path.exists(spec["hwm_file"]):
+        with open(spec["hwm_file"]) as f:
+            peak_kb = int(f.read())
+        os.remove(spec["hwm_file"])
+    result = {
+        "status": "ok" if proc.returncode == 0 else f"failed ({proc.returncode})",
+        "wall_s": round(wall, 3),
+        "cpu_s": round(usage.ru_utime + usage.ru_stime, 3),
+        "peak_rss_mb": round(peak_kb / 1024, 1),
+        "rows": rows,
+        "rows_per_s": round(rows / wall, 1) if rows and wall > 0 else None,
+        "log": log_path,
+    }
+    if proc.returncode != 0:
+        with open(log_path) as f:
+            result["error"] = f.read().strip().splitlines()[-1:] or [""]
+            result["error"] = result["error"][0][:300]
+    return result
+
+
+def _best(results):
+    """Keep the fastest of repeated runs (least disturbed by other load)."""
+    ok = [r for r in results if r["status"] == "ok"]
+    return min(ok, key=lambda r: r["wall_s"]) if ok else results[-1]
+
+
+# --------------------------
+# History + baseline
+# --------------------------
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def append_history(run, path=HISTORY_FILE):
+    history = []
+    if os.path.exists(path):
+        with open(path) as f:
+            history = json.load(f)
+    history.append(run)
+    with open(path, "w") as f:
+        json.dump(history, f, indent=2)
+
+
+def compare(run, baseline, threshold=THRESHOLD, min_seconds=MIN_SECONDS):
+    """Return a table of per-stage ratios vs baseline with a regression flag."""
+    rows = []
+    for name, cur in run["stages"].items():
+        base = baseline["stages"].get(name)
+        if base is None or base["status"] != "ok" or cur["status"] != "ok":
+            rows.append({"stage": name, "regression": cur["status"] != "ok" and base is not None
+                         and base["status"] == "ok", "note": "failed" if cur["status"] != "ok" else "no baseline"})
+            continue
+        ratios = {
+            "wall_ratio": cur["wall_s"] / max(base["wall_s"], 1e-9),
+            "cpu_ratio": cur["cpu_s"] / max(base["cpu_s"], 1e-9),
+            "rss_ratio": cur["peak_rss_mb"] / max(base["peak_rss_mb"], 1e-9),
+        }
+        worse = []
+        if base["wall_s"] >= min_seconds and ratios["wall_ratio"] > 1 + threshold:
+            worse.append("wall")
+        if base["cpu_s"] >= min_seconds and ratios["cpu_ratio"] > 1 + threshold:
+            worse.append("cpu")
+        if ratios["rss_ratio"] > 1 + threshold:
+            worse.append("rss")
+        if cur["rows_per_s"] and base["rows_per_s"] and base["wall_s"] >= min_seconds \
+                and cur["rows_per_s"] < base["rows_per_s"] * (1 - threshold):
+            worse.append("rows/s")
+        rows.append({"stage": name, **{k: round(v, 3) for k, v in ratios.items()},
+                     "regression": bool(worse), "note": ", ".join(worse)})
+    return pd.DataFrame(rows).set_index("stage")
+
+
+def select_stages(names):
+    if not names:
+        return STAGES
+    picked = [s for s in STAGES if s["name"] in names or s["group"] in names]
+    unknown = set(names) - {s["name"] for s in STAGES} - {s["group"] for s in STAGES}
+    if unknown:
+        raise KeyError(f"Unknown stage/group: {sorted(unknown)}")
+    return picked
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark every Schema Sentinel pipeline stage.")
+    parser.add_argument("--persons", type=int, default=PERSONS, help="synthetic input size (person rows)")
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--work", default=WORK_DIR)
+    parser.add_argument("--stages", nargs="*", help="stage names or groups (default: all)")
+    parser.add_argument("--repeat", type=int, default=1, help="runs per stage; the fastest is kept")
+    parser.add_argument("--history", default=HISTORY_FILE)
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--threshold", type=float, default=THRESHOLD)
+    parser.add_argument("--intermediate", choices=FORMATS, default=None,
+                        help="hand-off format between stages (default: SCHEMA_SENTINEL_INTERMEDIATE or parquet)")
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the new baseline")
+    args = parser.parse_args()
+    if args.intermediate:
+        os.environ[INTERMEDIATE_ENV] = args.intermediate
+
+    os.makedirs(args.work, exist_ok=True)
+    work = os.path.abspath(args.work)
+
+    print("=" * 80)
+    print("SCHEMA SENTINEL - PIPELINE BENCHMARK")
+    print("=" * 80)
+
+    print(f"\nSTEP 1: Preparing synthetic inputs ({args.persons:,} persons, seed {args.seed})...")
+    t0 = time.perf_counter()
+    prepare_inputs(work, args.persons, args.seed)
+    print(f"Inputs ready in {time.perf_counter() - t0:.1f}s: {os.path.join(work, 'raw')}")
+
+    print("\nSTEP 2: Running stages...")
+    stages = {}
+    for stage in select_stages(args.stages):
+        if stage["group"] in ("visualization", "models") and not os.path.exists(os.path.join(work, "person_vehicle_weather.parquet")):
+            prepare_person_vehicle_weather(work)
+        results = [run_stage(stage, work) for _ in range(max(args.repeat, 1))]
+        stages[stage["name"]] = best = _best(results)
+        rate = f"{best['rows_per_s']:>12,.0f} rows/s" if best["rows_per_s"] else " " * 19
+        print(f"  {stage['name']:30} {best['wall_s']:8.2f}s wall {best['cpu_s']:8.2f}s cpu "
+              f"{best['peak_rss_mb']:8.0f} MB  {rate}  {best['status']}")
+        if best["status"] != "ok":
+            print(f"    {best.get('error', '')}  (log: {best['log']})")
+        if stage["name"] == "window_extraction":
+            prepare_person_vehicle_weather(work)
+
+    run = {
+        "timestamp": pd.Timestamp.now().isoformat(timespec="seconds"),
+        "git_commit": _git_commit(),
+        "persons": args.persons,
+        "seed": args.seed,
+        "intermediate": os.environ.get(INTERMEDIATE_ENV, "parquet"),
+        "python": platform.python_version(),
+        "machine": f"{platform.system()} {platform.machine()}, {os.cpu_count()} cpus",
+        "stages": stages,
+    }
+    append_history(run, args.history)
+    print(f"\nSTEP 3: Appended run to {args.history}")
+
+    print("\nSTEP 4: Comparing against baseline...")
+    regressed = False
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get("persons") != args.persons:
+            print(f"Warning: baseline was recorded at {baseline.get('persons'):,} persons; "
+                  f"ratios are not comparable.")
+        table = compare(run, baseline, args.threshold)
+        print(table.to_string())
+        regressed = bool(table["regression"].any())
+        print(f"\n{int(table['regression'].sum())} regression(s) beyond {args.threshold:.0%}"
+              if regressed else f"\nNo regressions beyond {args.threshold:.0%}.")
+    else:
+        print(f"No baseline at {args.baseline} (run with --save-baseline to create one).")
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(run, f, indent=2)
+        print(f"Saved baseline: {args.baseline}")
+
+    sys.exit(1 if regressed and not args.save_baseline else 0)
@@ -0,0 +1,517 @@
+"""
+Schema Sentinel - Polars Lazy Backend (conditioning + integration)
+------------------------------------------------------------------
+LazyFrame implementations of the person, vehicle, weather and crashes
+conditioning scripts and of the integration merge. Each stage builds one query
+plan (scan -> transform -> sink), so polars prunes unused columns, pushes
+filters into the scan, runs the joins multithreaded and streams the output
+with sink_parquet instead of materializing every intermediate in pandas.
+
+The pandas scripts remain the reference implementation. They switch to this
+backend with SCHEMA_SENTINEL_BACKEND=polars (see BACKEND in each script), and
+write the same files with the same columns:
+
+- person_PRE/POST_conditioning.parquet
+- vehicles_PRE/POST_conditioning.parquet
+- weather_PRE/POST_conditioning.csv, weather_POST_conditioning.parquet
+- crashes_POST_conditioning.parquet
+- schema_sentinel_integrated.parquet / .csv
+
+Equivalence check (runs both backends on the same raw files and compares every
+output frame):
+    python polars_pipeline.py equivalence --raw synthetic --work backend_check
+
+Direct use:
+    python polars_pipeline.py run --raw RAW_DATA_PATH --cond COND_PATH --out OUT_PATH
+    python polars_pipeline.py compare --reference pandas_out --candidate polars_out
+"""
+
+import argparse
+import os
+import time
+
+import numpy as np
+import polars as pl
+
+from csv_ingest import ingested_path
+from intermediate_io import read_intermediate, resolve, scan_intermediate, sink_intermediate, write_intermediate
+from step_trace import Tracer
+from vehicle_linkage import JOIN_ENV
+
+# --------------------------
+# CONFIGURATION
+# --------------------------
+BACKEND_ENV = "SCHEMA_SENTINEL_BACKEND"
+BACKENDS = ("pandas", "polars")
+
+CRASHES_FILE = "Motor_Vehicle_Collisions_-_Crashes_20251111.parquet"
+
+# Same mapping as vehicle conditioning.py STEP 4
+VEHICLE_CONSOLIDATION = {
+    "4 Dr Sedan": "Sedan",
+    "2 Dr Sedan": "Sedan",
+    "Passenger Vehicle": "Sedan",
+    "Pick-Up Truck": "Pickup Truck",
+    "Pk": "Pickup Truck",
+    "Sport Utility / Station Wagon": "SUV/Station Wagon",
+    "Station Wagon/Sport Utility Vehicle": "SUV/Station Wagon",
+}
+
+# output name: candidate source columns (crashes conditioning.py STEP 4)
+CRASH_COLUMNS = {
+    "crash_time": ["CRASH TIME", "crash_time"],
+    "borough": ["BOROUGH", "borough"],
+    "zip_code": ["ZIP CODE", "zip_code"],
+    "latitude": ["LATITUDE", "latitude"],
+    "longitude": ["LONGITUDE", "longitude"],
+    "on_street_name": ["ON STREET NAME", "on_street_name"],
+    "cross_street_name": ["CROSS STREET NAME", "cross_street_name"],
+    "number_of_persons_injured": ["NUMBER OF PERSONS INJURED", "number_of_persons_injured"],
+    "number_of_persons_killed": ["NUMBER OF PERSONS KILLED", "number_of_persons_killed"],
+    "number_of_pedestrians_injured": ["NUMBER OF PEDESTRIANS INJURED", "number_of_pedestrians_injured"],
+    "number_of_cyclist_injured": ["NUMBER OF CYCLIST INJURED", "number_of_cyclist_injured"],
+    "number_of_motorist_injured": ["NUMBER OF MOTORIST INJURED", "number_of_motorist_injured"],
+    "contributing_factor_vehicle_1": ["CONTRIBUTING FACTOR VEHICLE 1", "contributing_factor_vehicle_1"],
+}
+
+# Tried in order before format inference (see _parse_datetime)
+DATE_FORMATS = ["%Y-%m-%dT%H:%M:%S%.f", "%Y-%m-%d", "%m/%d/%Y", "%m/%d/%Y %I:%M:%S %p"]
+
+KEEP_CRASH_COLS = [
+    "collision_id", "crash_date", "crash_time", "borough", "zip_code", "latitude", "longitude",
+    "on_street_name", "cross_street_name", "number_of_persons_injured", "number_of_persons_killed",
+    "contributing_factor_vehicle_1",
+]
+
+
+def _parse_datetime(lf, column):
+    """
+    Parse a string date column the way pd.to_datetime does. Polars infers
+    day-first for "03/11/2023", so the month-first NYC Open Data format is
+    tried before falling back to inference.
+    """
+    dtype = lf.collect_schema()[column]
+    if isinstance(dtype, pl.Datetime):
+        return pl.col(column)
+    if dtype == pl.Date:
+        return pl.col(column).cast(pl.Datetime("us"))
+    text = pl.col(column).cast(pl.String)
+    parsed = [text.str.to_datetime(fmt, strict=False, time_unit="us") for fmt in DATE_FORMATS]
+    return pl.coalesce(parsed + [text.str.to_datetime(strict=False, time_unit="us")])
+
+
+def _pandas_style_join(left, right, on, how, suffixes=("_x", "_y")):
+    """
+    Join like DataFrame.merge: overlapping non-key columns get a suffix on
+    BOTH sides, null keys match each other and the left row order is kept.
+    """
+    on = [on] if isinstance(on, str) else list(on)
+    overlap = (set(left.collect_schema().names()) & set(right.collect_schema().names())) - set(on)
+    left = left.rename({c: c + suffixes[0] for c in overlap})
+    right = right.rename({c: c + suffixes[1] for c in overlap})
+    return left.join(right, on=on, how=how, nulls_equal=True, maintain_order="left_right", coalesce=True)
+
+
+# --------------------------
+# Conditioning
+# --------------------------
+def person_plan(raw_path):
+    lf = pl.scan_parquet(f"{raw_path}/person_full.parquet")
+    return lf.with_columns(_parse_datetime(lf, "crash_date").alias("crash_date")).with_columns(
+        pl.col("crash_date").dt.date().alias("merge_date"),
+        pl.when(pl.col("person_injury").is_in(["Injured", "Killed"]))
+          .then(1).otherwise(0).cast(pl.Int64).alias("injury_occurred"),
+    )
+
+
+def vehicle_plan(raw_path):
+    lf = pl.scan_parquet(f"{raw_path}/vehicles_full.parquet")
+    return lf.with_columns(_parse_datetime(lf, "crash_date").alias("crash_date")).with_columns(
+        pl.col("crash_date").dt.date().alias("merge_date"),
+        pl.col("vehicle_type").str.to_titlecase().str.strip_chars()
+          .replace(VEHICLE_CONSOLIDATION).alias("vehicle_type"),
+    )
+
+
+def weather_raw_plan(raw_path):
+    csv_path = f"{raw_path}/nyc weather data.csv"
+    parquet = ingested_path(csv_path)
+    if parquet:
+        # csv_ingest.py output: DATE is a midnight timestamp, kept as a date like the CSV
+        return pl.scan_parquet(parquet).with_columns(pl.col("DATE").cast(pl.Date))
+    # Full-file schema inference: WT flag columns are empty for long stretches
+    return pl.scan_csv(csv_path, infer_schema_length=None)
+
+
+def weather_plan(raw_path):
+    lf = weather_raw_plan(raw_path)
+    names = lf.collect_schema().names()
+
+    def flag(c):
+        return pl.col(c).is_not_null() if c in names else pl.lit(False)
+
+    def positive(c):
+        return (pl.col(c) > 0).fill_null(False) if c in names else pl.lit(False)
+
+    # Priority: Snow > Rain > Fog > Clear (weather conditioning.py STEP 3)
+    condition = (
+        pl.when(flag("WT18") | positive("SNOW")).then(pl.lit("Snow"))
+          .when(flag("WT16") | positive("PRCP")).then(pl.lit("Rain"))
+          .when(flag("WT01") | flag("WT02")).then(pl.lit("Fog"))
+          .otherwise(pl.lit("Clear"))
+    )
+    return (
+        lf.with_columns(_parse_datetime(lf, "DATE").alias("crash_date"))
+          .with_columns(condition.alias("weather_condition"),
+                        pl.col("crash_date").dt.date().alias("merge_date"))
+          .select(["crash_date", "merge_date", "weather_condition", "PRCP", "SNOW", "TMAX", "TMIN"])
+    )
+
+
+def crashes_plan(raw_path):
+    lf = pl.scan_parquet(f"{raw_path}/{CRASHES_FILE}")
+    names = lf.collect_schema().names()
+
+    def norm(c):
+        return c.strip().lower().replace(" ", "_")
+
+    id_col = next((c for c in names if norm(c) in ("collision_id", "collisionid")), None)
+    if id_col is None:
+        raise KeyError(f"No collision ID column found. Available columns: {names}")
+    date_col = next((c for c in names if norm(c) in ("crash_date", "crashdate")), None)
+    if date_col is None:
+        raise KeyError("Could not detect a crash date column in dataset.")
+
+    select = [pl.col(id_col).alias("collision_id"),
+              _parse_datetime(lf, date_col).alias("crash_date")]
+    rest = []
+    for out, candidates in CRASH_COLUMNS.items():
+        src = next((c for c in candidates if c in names), None)
+        if src is not None:
+            rest.append(pl.col(src).alias(out))
+    return lf.select(select + rest).with_columns(pl.col("crash_date").dt.date().alias("merge_date")) \
+             .select(["collision_id", "crash_date", "merge_date"] + [e.meta.output_name() for e in rest])
+
+
+def backfill_crashes(df, boundary_files):
+    """reverse_geocode backfill of blank borough / zip_code on a collected frame."""
+    from reverse_geocode import (BOROUGH_NAME_FIELDS, ZCTA_NAME_FIELDS, PolygonGridIndex,
+                                 load_geojson_polygons)
+
+    for column, name_fields, normalize in [
+        ("borough", BOROUGH_NAME_FIELDS, lambda v: v.upper()),
+        ("zip_code", ZCTA_NAME_FIELDS, lambda v: v.strip()[:5]),
+    ]:
+        path = boundary_files.get(column)
+        if not path or not os.path.exists(path):
+            print(f"Warning: {path} not found. Skipping {column} backfill.")
+            continue
+        if not {"latitude", "longitude"}.issubset(df.columns):
+            print(f"Warning: latitude/longitude not available. Skipping {column} backfill.")
+            continue
+        lat = df["latitude"].cast(pl.Float64, strict=False).to_numpy()
+        lon = df["longitude"].cast(pl.Float64, strict=False).to_numpy()
+        has_coords = ~np.isnan(lat) & ~np.isnan(lon) & (lat != 0) & (lon != 0)
+        if column in df.columns:
+            values = df[column].cast(pl.String)
+            blank = (values.is_null() | (values.str.strip_chars() == "")).to_numpy()
+        else:
+            values = pl.Series(column, [None] * len(df), dtype=pl.String)
+            blank = np.ones(len(df), dtype=bool)
+        target = np.flatnonzero(blank & has_coords)
+        if len(target) == 0:
+            continue
+
+        labels, rings = load_geojson_polygons(path, name_fields)
+        found_labels = PolygonGridIndex(labels, rings).assign(lon[target], lat[target])
+        found = np.array([v is not None and v == v for v in found_labels])
+        filled = [normalize(v) for v in found_labels[found]]
+        out = values.to_numpy().astype(object)
+        out[target[found]] = filled
+        series = pl.Series(column, out, dtype=pl.String, strict=False)
+        if column in df.columns and df[column].dtype.is_numeric():
+            series = series.cast(df[column].dtype, strict=False)
+        df = df.with_columns(series)
+        print(f"{column}: {len(labels):,} boundary polygons loaded")
+        print(f"{column}: blank before = {int(blank.sum()):,}, recovered from coordinates = {int(found.sum()):,}")
+    return df
+
+
+# --------------------------
+# Integration
+# --------------------------
+def _vehicle_uid(column):
+    """Vehicle ids as Int64 (person.vehicle_id is float / string in the extracts)."""
+    return pl.col(column).cast(pl.String).str.strip_chars().cast(pl.Float64, strict=False).cast(pl.Int64, strict=False)
+
+
+def _linked_join(person, vehicles, suffixes=("_person", "_vehicle")):
+    """vehicle_linkage.link_person_vehicle as a lazy plan: one row per person."""
+    key = "_linked_vehicle_uid"
+    if "vehicle_id" in person.collect_schema().names():
+        claimed = _vehicle_uid("vehicle_id")
+    else:
+        claimed = pl.lit(None, dtype=pl.Int64)
+    # Linkable vehicles: non-null unique_id, first row per (collision_id, unique_id)
+    without_id = vehicles.filter(_vehicle_uid("unique_id").is_null()).select("collision_id").unique()
+    vehicles = (vehicles.with_columns(_vehicle_uid("unique_id").alias(key))
+                        .filter(pl.col(key).is_not_null())
+                        .unique(subset=["collision_id", key], keep="first", maintain_order=True))
+    pairs = vehicles.select("collision_id", pl.col(key).alias("_claimed"), pl.lit(True).alias("_direct"))
+    single = (vehicles.join(without_id, on="collision_id", how="anti")
+                      .group_by("collision_id")
+                      .agg(pl.len().alias("_n"), pl.col(key).first().alias("_single"))
+                      .filter(pl.col("_n") == 1).select("collision_id", "_single"))
+    direct = pl.col("_direct").fill_null(False)
+    person = (
+        person.with_columns(claimed.alias("_claimed"))
+              .join(pairs, on=["collision_id", "_claimed"], how="left", maintain_order="left")
+              .join(single, on="collision_id", how="left", maintain_order="left")
+              .with_columns(
+                  pl.when(direct).then(pl.col("_claimed")).otherwise(pl.col("_single")).alias(key),
+                  pl.when(direct).then(pl.lit("vehicle_id"))
+                    .when(pl.col("_single").is_not_null()).then(pl.lit("single_vehicle"))
+                    .otherwise(pl.lit("unlinked")).alias("vehicle_link"),
+              )
+              .drop("_claimed", "_direct", "_single")
+    )
+    # The right side has no null keys, so unlinked persons (null key) match nothing
+    pv = _pandas_style_join(person, vehicles, ["collision_id", "merge_date", key], "left", suffixes).drop(key)
+    names = pv.collect_schema().names()
+    return pv.select([c for c in names if c != "vehicle_link"] + ["vehicle_link"])
+
+
+def integration_plan(cond_path, join_mode="collision"):
+    def scan(name):
+        return scan_intermediate(f"{cond_path}/{name}")
+
+    def standardize_id(lf):
+        return lf.with_columns(pl.col("collision_id").cast(pl.String).str.strip_chars())
+
+    person = standardize_id(scan("person_POST_conditioning.parquet"))
+    vehicles = standardize_id(scan("vehicles_POST_conditioning.parquet"))
+    weather = scan("weather_POST_conditioning.parquet")
+    crashes = standardize_id(scan("crashes_POST_conditioning.parquet"))
+
+    for name, lf, cols in [("Person", person, ["collision_id", "merge_date"]),
+                           ("Vehicle", vehicles, ["collision_id", "merge_date"]),
+                           ("Weather", weather, ["merge_date"]),
+                           ("Crashes", crashes, ["collision_id", "merge_date"])]:
+        missing = [c for c in cols if c not in lf.collect_schema().names()]
+        if missing:
+            raise KeyError(f"{name} dataset missing required column: {missing[0]}")
+
+    keep = [c for c in KEEP_CRASH_COLS if c in crashes.collect_schema().names()]
+    if join_mode == "linked":
+        pv = _linked_join(person, vehicles)
+    else:
+        pv = _pandas_style_join(person, vehicles, ["collision_id", "merge_date"], "inner", ("_person", "_vehicle"))
+    pvw = _pandas_style_join(pv, weather, "merge_date", "left")
+    return _pandas_style_join(pvw, crashes.select(keep), "collision_id", "left")
+
+
+# --------------------------
+# Stage runners (same files as the pandas scripts)
+# --------------------------
+def _sink(lf, path, trace, label, handoff=True, publish=False):
+    """Stream a plan to a hand-off file (or plain parquet); returns the rows written."""
+    with trace.span(label) as s:
+        if handoff:
+            path = sink_intermediate(lf, path, publish=publish)
+        else:
+            lf.sink_parquet(path)
+        rows = scan_intermediate(path).select(pl.len()).collect().item()
+        s.rows_out = rows
+    return rows
+
+
+def run_stage(stage, input_path, output_path, boundary_files=None, join_mode=None):
+    """
+    Run one stage with the polars backend. stage: person|vehicle|weather|crashes|integration.
+    join_mode (integration): "collision" or "linked", default SCHEMA_SENTINEL_JOIN.
+    """
+    os.makedirs(output_path, exist_ok=True)
+    trace = Tracer(f"{stage}_polars")
+    t0 = time.perf_counter()
+    print("=" * 80)
+    print(f"{stage.upper()} - POLARS LAZY BACKEND")
+    print("=" * 80)
+
+    if stage == "person":
+        _sink(pl.scan_parquet(f"{input_path}/person_full.parquet"),
+              f"{output_path}/person_PRE_conditioning.parquet", trace, "PRE snapshot", handoff=False)
+        _sink(person_plan(input_path), f"{output_path}/person_POST_conditioning.parquet", trace, "POST conditioning")
+    elif stage == "vehicle":
+        _sink(pl.scan_parquet(f"{input_path}/vehicles_full.parquet"),
+              f"{output_path}/vehicles_PRE_conditioning.parquet", trace, "PRE snapshot", handoff=False)
+        _sink(vehicle_plan(input_path), f"{output_path}/vehicles_POST_conditioning.parquet", trace, "POST conditioning")
+    elif stage == "weather":
+        with trace.span("PRE snapshot"):
+            weather_raw_plan(input_path).sink_csv(f"{output_path}/weather_PRE_conditioning.csv")
+        with trace.span("POST conditioning") as s:
+            weather = weather_plan(input_path).collect()
+            weather.write_csv(f"{output_path}/weather_POST_conditioning.csv")
+            write_intermediate(weather, f"{output_path}/weather_POST_conditioning.parquet")
+            s.rows_out = weather
+    elif stage == "crashes":
+        with trace.span("POST conditioning") as s:
+            crashes = crashes_plan(input_path).collect()
+            if boundary_files is None:
+                boundary_files = {"borough": f"{input_path}/nyc_borough_boundaries.geojson",
+                                  "zip_code": f"{input_path}/nyc_zcta_boundaries.geojson"}
+            crashes = backfill_crashes(crashes, boundary_files)
+            if crashes["merge_date"].null_count():
+                raise AssertionError("merge_date has nulls!")
+            write_intermediate(crashes, f"{output_path}/crashes_POST_conditioning.parquet")
+            s.rows_out = crashes
+        print(f"Duplicate collision_id: {crashes['collision_id'].is_duplicated().sum():,}")
+    elif stage == "integration":
+        parquet_path = f"{output_path}/schema_sentinel_integrated.parquet"
+        full = integration_plan(input_path, join_mode or os.environ.get(JOIN_ENV, "collision"))
+        if "injury_occurred" not in full.collect_schema().names():
+            raise KeyError("injury_occurred not found in integrated dataset (from person conditioning).")
+        rows = _sink(full, parquet_path, trace, "merge + write parquet", publish=True)
+        null_cid = scan_intermediate(parquet_path).select(pl.col("collision_id").null_count()).collect().item()
+        assert null_cid == 0, "collision_id should not be null in integrated dataset."
+        with trace.span("write csv"):
+            scan_intermediate(parquet_path).sink_csv(f"{output_path}/schema_sentinel_integrated.csv")
+        print(f"Integrated records: {rows:,}")
+    else:
+        raise ValueError(f"Unknown stage: {stage}")
+
+    print(f"{stage} complete in {time.perf_counter() - t0:.2f}s -> {output_path}")
+    trace.finish()
+
+
+# --------------------------
+# Equivalence check
+# --------------------------
+OUTPUT_FILES = [
+    "person_POST_conditioning.parquet",
+    "vehicles_POST_conditioning.parquet",
+    "weather_POST_conditioning.parquet",
+    "crashes_POST_conditioning.parquet",
+    "schema_sentinel_integrated.parquet",
+]
+
+
+def _normalized(path):
+    """Read with pandas and normalize representation-only differences between backends."""
+    import pandas as pd
+
+    df = read_intermediate(path)
+    for c in df.columns:
+        s = df[c]
+        if pd.api.types.is_datetime64_any_dtype(s):
+            df[c] = s.astype("datetime64[ns]")
+        elif s.dtype == object or pd.api.types.is_string_dtype(s):
+            # datetime.date objects (pandas) vs date32 (polars) and str dtypes
+            df[c] = s.astype(str).where(s.notna(), None).astype(object)
+        elif pd.api.types.is_integer_dtype(s) or pd.api.types.is_float_dtype(s):
+            df[c] = s.astype("float64")
+    return df
+
+
+def compare_outputs(reference_dir, candidate_dir, files=OUTPUT_FILES):
+    """Compare the pandas (reference) and polars (candidate) outputs file by file."""
+    import pandas as pd
+
+    results = []
+    for name in files:
+        ref_path, cand_path = os.path.join(reference_dir, name), os.path.join(candidate_dir, name)
+        if not (os.path.exists(resolve(ref_path)) and os.path.exists(resolve(cand_path))):
+            results.append({"file": name, "equal": False, "detail": "missing output"})
+            continue
+        ref, cand = _normalized(ref_path), _normalized(cand_path)
+        detail = ""
+        if list(ref.columns) != list(cand.columns):
+            detail = f"columns differ: {sorted(set(ref.columns) ^ set(cand.columns)) or 'order'}"
+        else:
+            try:
+                pd.testing.assert_frame_equal(ref.reset_index(drop=True), cand.reset_index(drop=True),
+                                              check_dtype=False, check_exact=False, rtol=1e-9)
+            except AssertionError as exc:
+                detail = str(exc).strip().splitlines()[0][:200]
+        results.append({"file": name, "rows": len(ref), "rows_candidate": len(cand),
+                        "equal": not detail, "detail": detail})
+    return pd.DataFrame(results)
+
+
+def equivalence(raw_path, work_dir):
+    """
+    Run the pandas scripts and the polars backend on the same raw files (through
+    the benchmark runner, so both are timed) and compare every output.
+    Each backend runs in a freshly emptied <work_dir>/<backend> directory, and a
+    stage that does not finish "ok" is reported as a failed (equal=False) row,
+    so outputs left over from an earlier run can never pass the check.
+    """
+    import shutil
+
+    from pipeline_benchmark import STAGES, run_stage as run_script
+
+    stages = [s for s in STAGES if s["group"] == "conditioning" or s["name"] == "integration"]
+    timings, failed = {}, []
+    for name in BACKENDS:
+        work = os.path.abspath(os.path.join(work_dir, name))
+        if os.path.lexists(work):
+            shutil.rmtree(work)
+        os.makedirs(work)
+        os.symlink(os.path.abspath(raw_path), os.path.join(work, "raw"))
+        os.environ[BACKEND_ENV] = name
+        for stage in stages:
+            result = run_script(stage, work)
+            timings[(stage["name"], name)] = result["wall_s"]
+            if result["status"] != "ok":
+                print(f"  {name}/{stage['name']}: {result['status']} - {result.get('error', '')}")
+                failed.append({"file": f"{stage['name']} ({name} stage)", "equal": False,
+                               "detail": f"{result['status']}: {result.get('error', '')}"[:200]})
+    os.environ.pop(BACKEND_ENV, None)
+
+    print("\nWall time by stage (s):")
+    for stage in stages:
+        pd_s, pl_s = timings[(stage["name"], "pandas")], timings[(stage["name"], "polars")]
+        print(f"  {stage['name']:24} pandas {pd_s:8.2f}  polars {pl_s:8.2f}  ({pd_s / max(pl_s, 1e-9):.1f}x)")
+
+    import pandas as pd
+
+    ref = os.path.join(work_dir, "pandas")
+    cand = os.path.join(work_dir, "polars")
+    tables = [compare_outputs(os.path.join(ref, "cond"), os.path.join(cand, "cond"), OUTPUT_FILES[:4]),
+              compare_outputs(ref, cand, OUTPUT_FILES[4:])]
+    if failed:
+        tables.insert(0, pd.DataFrame(failed))
+    return pd.concat(tables, ignore_index=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Polars lazy backend for conditioning + integration.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("run", help="run conditioning + integration with polars")
+    run.add_argument("--raw", required=True, help="RAW_DATA_PATH (raw NYC / NOAA files)")
+    run.add_argument("--cond", required=True, help="conditioned output directory")
+    run.add_argument("--out", required=True, help="integrated output directory")
+    run.add_argument("--stages", nargs="*", default=["person", "vehicle", "weather", "crashes", "integration"])
+
+    cmp = sub.add_parser("compare", help="compare two output directories")
+    cmp.add_argument("--reference", required=True)
+    cmp.add_argument("--candidate", required=True)
+
+    eq = sub.add_parser("equivalence", help="run both backends on the same raw files and compare")
+    eq.add_argument("--raw", required=True)
+    eq.add_argument("--work", default="backend_check")
+
+    args = parser.parse_args()
+
+    if args.command == "run":
+        for stage in args.stages:
+            if stage == "integration":
+                run_stage(stage, args.cond, args.out)
+            else:
+                run_stage(stage, args.raw, args.cond)
+    else:
+        table = compare_outputs(args.reference, args.candidate) if args.command == "compare" \
+            else equivalence(args.raw, args.work)
+        print("\nBackend equivalence:")
+        print(table.to_string(index=False))
+        raise SystemExit(0 if table["equal"].all() else 1)
@@ -0,0 +1,265 @@
+"""
+Schema Sentinel - Vectorized Reverse Geocoding
+----------------------------------------------
+Assigns borough and ZIP code (ZCTA) labels to latitude/longitude points using
+locally stored GeoJSON boundary files, without geopandas or shapely.
+
+Polygons are bucketed into a uniform grid:
+- each cell stores the polygon edges that touch it, and
+- the polygon containing the cell center is pre-computed with one scanline
+  per grid row.
+
+A point in a cell with no edges inherits the center's label directly. A point
+in a boundary cell starts from the center's label and flips in/out of each
+polygon whose edges cross the segment from the center to the point (ray
+casting restricted to the cell), all done as flat numpy arrays.
+
+Inputs
+- nyc_borough_boundaries.geojson (e.g. NYC Open Data "Borough Boundaries")
+- nyc_zcta_boundaries.geojson (e.g. Census ZCTA / NYC "Modified ZCTA")
+"""
+
+import json
+
+import numpy as np
+import pandas as pd
+
+BOROUGH_NAME_FIELDS = ["boro_name", "BoroName", "boroname", "borough", "BOROUGH"]
+ZCTA_NAME_FIELDS = ["ZCTA5CE20", "ZCTA5CE10", "postalCode", "MODZCTA", "modzcta", "zcta", "ZIPCODE", "zip_code"]
+
+# Max edge/point pairs tested at once in boundary cells (bounds peak memory)
+PAIR_CHUNK = 4_000_000
+
+
+def load_geojson_polygons(path, name_fields):
+    """
+    Read a GeoJSON FeatureCollection into (labels, rings).
+    `rings` is a list of (feature_index, Nx2 lon/lat array); holes and
+    multipolygon parts are just additional rings of the same feature.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        collection = json.load(f)
+
+    labels = []
+    rings = []
+    for feature in collection.get("features", []):
+        geometry = feature.get("geometry") or {}
+        props = feature.get("properties") or {}
+        name = next((props[k] for k in name_fields if props.get(k) not in (None, "")), None)
+        if name is None:
+            continue
+
+        if geometry.get("type") == "Polygon":
+            polygons = [geometry["coordinates"]]
+        elif geometry.get("type") == "MultiPolygon":
+            polygons = geometry["coordinates"]
+        else:
+            continue
+
+        fid = len(labels)
+        labels.append(str(name))
+        for polygon in polygons:
+            for ring in polygon:
+                ring = np.asarray(ring, dtype=np.float64)[:, :2]
+                if len(ring) >= 3:
+                    rings.append((fid, ring))
+
+    if not labels:
+        raise ValueError(f"No polygon features with any of {name_fields} found in {path}")
+    return labels, rings
+
+
+class PolygonGridIndex:
+    """Grid-bucketed polygon layer answering point-in-polygon for many points at once."""
+
+    def __init__(self, labels, rings, cells_per_side=512):
+        self.labels = np.asarray(labels, dtype=object)
+
+        ax, ay, bx, by, fid = [], [], [], [], []
+        for f, ring in rings:
+            a = ring
+            b = np.roll(ring, -1, axis=0)   # closes the ring whether or not it repeats the first vertex
+            keep = np.any(a != b, axis=1)
+            ax.append(a[keep, 0]); ay.append(a[keep, 1])
+            bx.append(b[keep, 0]); by.append(b[keep, 1])
+            fid.append(np.full(int(keep.sum()), f, dtype=np.int32))
+        self.ax, self.ay = np.concatenate(ax), np.concatenate(ay)
+        self.bx, self.by = np.concatenate(bx), np.concatenate(by)
+        self.fid = np.concatenate(fid)
+
+        # Grid over the layer extent, square-ish cells
+        self.x0, self.y0 = min(self.ax.min(), self.bx.min()), min(self.ay.min(), self.by.min())
+        x1, y1 = max(self.ax.max(), self.bx.max()), max(self.ay.max(), self.by.max())
+        self.cell = max(x1 - self.x0, y1 - self.y0) / cells_per_side
+        self.nx = int((x1 - self.x0) / self.cell) + 1
+        self.ny = int((y1 - self.y0) / self.cell) + 1
+
+        self._bucket_edges()
+        self._label_cell_centers()
+
+    # --------------------------
+    # BUILD
+    # --------------------------
+    def _cell_range(self, lo, hi, origin, n):
+        c_lo = np.clip(((lo - origin) / self.cell).astype(np.int64), 0, n - 1)
+        c_hi = np.clip(((hi - origin) / self.cell).astype(np.int64), 0, n - 1)
+        return c_lo, c_hi
+
+    def _bucket_edges(self):
+        """CSR mapping cell -> edges whose bounding box overlaps the cell."""
+        cx_lo, cx_hi = self._cell_range(np.minimum(self.ax, self.bx), np.maximum(self.ax, self.bx), self.x0, self.nx)
+        cy_lo, cy_hi = self._cell_range(np.minimum(self.ay, self.by), np.maximum(self.ay, self.by), self.y0, self.ny)
+        wx = cx_hi - cx_lo + 1
+        wy = cy_hi - cy_lo + 1
+        per_edge = wx * wy
+
+        edge = np.repeat(np.arange(len(self.ax)), per_edge)
+        k = np.arange(per_edge.sum()) - np.repeat(np.cumsum(per_edge) - per_edge, per_edge)
+        cx = cx_lo[edge] + k % wx[edge]
+        cy = cy_lo[edge] + k // wx[edge]
+        cell = cy * self.nx + cx
+
+        order = np.argsort(cell, kind="stable")
+        self.cell_edges = edge[order]
+        counts = np.bincount(cell, minlength=self.nx * self.ny)
+        self.cell_start = np.zeros(self.nx * self.ny + 1, dtype=np.int64)
+        np.cumsum(counts, out=self.cell_start[1:])
+
+    def _center(self, cx, cy):
+        # Offset slightly off the exact center so rectilinear boundaries never pass through it
+        return (self.x0 + (cx + 0.5 + 1e-7) * self.cell,
+                self.y0 + (cy + 0.5 + 3e-7) * self.cell)
+
+    def _label_cell_centers(self):
+        """Scanline per grid row: label of the polygon containing each cell center (-1 = none)."""
+        self.center_label = np.full(self.nx * self.ny, -1, dtype=np.int32)
+        xc, _ = self._center(np.arange(self.nx), 0)
+
+        for cy in range(self.ny):
+            _, yc = self._center(0, cy)
+            row = self.cell_edges[self.cell_start[cy * self.nx]:self.cell_start[(cy + 1) * self.nx]]
+            row = np.unique(row)
+            spans = (self.ay[row] > yc) != (self.by[row] > yc)
+            e = row[spans]
+            if len(e) == 0:
+                continue
+
+            x_int = self.ax[e] + (yc - self.ay[e]) * (self.bx[e] - self.ax[e]) / (self.by[e] - self.ay[e])
+            f = self.fid[e]
+            order = np.lexsort((x_int, f))
+            x_int, f = x_int[order], f[order]
+
+            # Crossings of one polygon alternate enter/exit along the scanline
+            first = np.r_[True, f[1:] != f[:-1]]
+            group_start = np.maximum.accumulate(np.where(first, np.arange(len(f)), 0))
+            rank = np.arange(len(f)) - group_start
+            enter = (rank % 2 == 0) & (np.r_[f[1:] == f[:-1], False])
+            starts, ends, owner = x_int[enter], x_int[np.flatnonzero(enter) + 1], f[enter]
+
+            by_start = np.argsort(starts)
+            starts, ends, owner = starts[by_start], ends[by_start], owner[by_start]
+            k = np.searchsorted(starts, xc, side="right") - 1
+            hit = (k >= 0) & (xc < ends[np.maximum(k, 0)])
+            self.center_label[cy * self.nx:(cy + 1) * self.nx][hit] = owner[k[hit]]
+
+    # --------------------------
+    # LOOKUP
+    # --------------------------
+    def lookup(self, lon, lat):
+        """Return the label index (-1 where no polygon contains the point) for each point."""
+        lon = np.asarray(lon, dtype=np.float64)
+        lat = np.asarray(lat, dtype=np.float64)
+        result = np.full(len(lon), -1, dtype=np.int32)
+
+        cx = np.floor((lon - self.x0) / self.cell)
+        cy = np.floor((lat - self.y0) / self.cell)
+        in_grid = (cx >= 0) & (cx < self.nx) & (cy >= 0) & (cy < self.ny)
+        pts = np.flatnonzero(in_grid)
+        cx, cy = cx[pts].astype(np.int64), cy[pts].astype(np.int64)
+        cell = cy * self.nx + cx
+        result[pts] = self.center_label[cell]
+
+        n_edges = self.cell_start[cell + 1] - self.cell_start[cell]
+        boundary = np.flatnonzero(n_edges > 0)
+        if len(boundary) == 0:
+            return result
+
+        # Chunk boundary points so edge/point pairs stay bounded
+        cum = np.cumsum(n_edges[boundary])
+        chunk_ids = cum // PAIR_CHUNK
+        for chunk in np.unique(chunk_ids):
+            sel = boundary[chunk_ids == chunk]
+            self._resolve_boundary(
+                result, pts[sel], lon[pts[sel]], lat[pts[sel]], cx[sel], cy[sel], cell[sel], n_edges[sel]
+            )
+        return result
+
+    def _resolve_boundary(self, result, point_pos, px, py, cx, cy, cell, n_edges):
+        pair_pt = np.repeat(np.arange(len(point_pos)), n_edges)
+        within = np.arange(n_edges.sum()) - np.repeat(np.cumsum(n_edges) - n_edges, n_edges)
+        e = self.cell_edges[self.cell_start[cell][pair_pt] + within]
+
+        qx, qy = self._center(cx[pair_pt], cy[pair_pt])
+        sx, sy = px[pair_pt], py[pair_pt]
+        ax, ay, bx, by = self.ax[e], self.ay[e], self.bx[e], self.by[e]
+
+        # Segment (center -> point) vs polygon edge, via orientation signs
+        o1 = (bx - ax) * (qy - ay) - (by - ay) * (qx - ax)
+        o2 = (bx - ax) * (sy - ay) - (by - ay) * (sx - ax)
+        o3 = (sx - qx) * (ay - qy) - (sy - qy) * (ax - qx)
+        o4 = (sx - qx) * (by - qy) - (sy - qy) * (bx - qx)
+        crosses = ((o1 > 0) != (o2 > 0)) & ((o3 > 0) != (o4 > 0))
+
+        n_feat = len(self.labels)
+        key = pair_pt[crosses].astype(np.int64) * n_feat + self.fid[e[crosses]]
+        key, count = np.unique(key, return_counts=True)
+        key = key[count % 2 == 1]
+        flip_pt, flip_f = key // n_feat, (key % n_feat).astype(np.int32)
+
+        label = self.center_label[cell].copy()
+        left = flip_f == label[flip_pt]
+        label[flip_pt[left]] = -1
+        label[flip_pt[~left]] = flip_f[~left]
+        result[point_pos] = label
+
+    def assign(self, lon, lat):
+        """Return an object array of labels (None where no polygon contains the point)."""
+        idx = self.lookup(lon, lat)
+        out = np.full(len(idx), None, dtype=object)
+        hit = idx >= 0
+        out[hit] = self.labels[idx[hit]]
+        return out
+
+
+def _is_blank(series):
+    return series.isna() | (series.astype(str).str.strip().isin(["", "nan", "None", "<NA>"]))
+
+
+def backfill_from_coordinates(df, column, index, normalize=None):
+    """
+    Fill blank values of `column` from latitude/longitude using a PolygonGridIndex.
+    Returns the number of recovered records. Modifies `df` in place.
+    """
+    lat = pd.to_numeric(df["latitude"], errors="coerce")
+    lon = pd.to_numeric(df["longitude"], errors="coerce")
+    has_coords = lat.notna() & lon.notna() & (lat != 0) & (lon != 0)
+
+    if column not in df.columns:
+        df[column] = pd.Series(pd.NA, index=df.index, dtype="object")
+    target = (_is_blank(df[column]) & has_coords).to_numpy()
+    if not target.any():
+        return 0
+
+    labels = index.assign(lon.to_numpy()[target], lat.to_numpy()[target])
+    found = pd.notna(labels)
+    if normalize is not None:
+        labels[found] = [normalize(v) for v in labels[found]]
+
+    rows = df.index[target][found]
+    values = pd.Series(labels[found], index=rows)
+    if pd.api.types.is_numeric_dtype(df[column].dtype):
+        values = pd.to_numeric(values, errors="coerce")
+    else:
+        df[column] = df[column].astype(object)
+    df.loc[rows, column] = values
+    return int(found.sum())
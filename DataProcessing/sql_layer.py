@@ -0,0 +1,254 @@
+"""
+Schema Sentinel - SQL Query Layer (DuckDB)
+------------------------------------------
+Embedded SQL over the pipeline's parquet outputs, without loading them into
+pandas. Each dataset is registered as a DuckDB VIEW over its parquet file, so
+a query only reads the columns and row groups it needs; group-bys run
+vectorized on all cores and spill to disk (TEMP_DIR) when they do not fit in
+memory. Everything is local: no server, the database is in-memory.
+
+Views (registered when the file exists under DATA_PATH, skipped otherwise;
+Arrow IPC hand-offs written with SCHEMA_SENTINEL_INTERMEDIATE=arrow are used
+when there is no parquet):
+- integrated      schema_sentinel_integrated.parquet (person x vehicle rows)
+- with_severity   schema_sentinel_integrated_with_severity.parquet
+- last5yrs        schema_sentinel_last5yrs.parquet (windowed)
+- crashes         cond/crashes_POST_conditioning.parquet (one row per collision)
+- collisions      one row per collision_id, derived from with_severity
+                  (or integrated): date, borough, counts, collision_severity
+
+Command line:
+    python sql_layer.py --data DATA_PATH -c "SELECT borough, count(*) FROM last5yrs GROUP BY 1"
+    python sql_layer.py --data DATA_PATH -f query.sql --output result.parquet
+    python sql_layer.py --data DATA_PATH            # interactive (.help for commands)
+
+Python:
+    from sql_layer import connect, query
+    con = connect("project")
+    df = query("SELECT collision_severity, count(*) n FROM collisions GROUP BY 1", con)
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import duckdb
+import pyarrow.dataset as ds
+
+from intermediate_io import is_arrow, resolve
+
+# --------------------------
+# CONFIGURATION
+# --------------------------
+DATA_PATH = ""
+THREADS = None            # None = all cores
+MEMORY_LIMIT = None       # e.g. "4GB"; None = DuckDB default (80% of RAM)
+TEMP_DIR = None           # spill directory for out-of-core operators; None = DuckDB default
+
+# view name: parquet path relative to DATA_PATH
+VIEWS = {
+    "integrated": "schema_sentinel_integrated.parquet",
+    "with_severity": "schema_sentinel_integrated_with_severity.parquet",
+    "last5yrs": "schema_sentinel_last5yrs.parquet",
+    "crashes": "cond/crashes_POST_conditioning.parquet",
+}
+
+DATE_CANDIDATES = ["crash_date_vehicle", "crash_date_x", "crash_date_person", "crash_date"]
+
+# collisions view: output column -> aggregate over the person x vehicle rows
+COLLISION_COLUMNS = {
+    "borough": "any_value(borough)",
+    "zip_code": "any_value(zip_code)",
+    "latitude": "any_value(latitude)",
+    "longitude": "any_value(longitude)",
+    "number_of_persons_injured": "max(number_of_persons_injured)",
+    "number_of_persons_killed": "max(number_of_persons_killed)",
+    "collision_severity": "any_value(collision_severity)",
+    "weather_condition": "any_value(weather_condition)",
+}
+
+
+def _quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _quote_literal(value):
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def _columns(con, view):
+    return [row[0] for row in con.execute(f"DESCRIBE {_quote(view)}").fetchall()]
+
+
+def _collision_view_sql(con, base):
+    """SELECT for the collision-level view over `base` (columns that exist only)."""
+    cols = _columns(con, base)
+    date_col = next((c for c in DATE_CANDIDATES if c in cols), None)
+    select = ["collision_id"]
+    if date_col:
+        select.append(f"min({_quote(date_col)}) AS crash_date")
+    select += [f"{agg} AS {name}" for name, agg in COLLISION_COLUMNS.items() if name in cols]
+    select.append("count(*) AS person_vehicle_rows")
+    if "injury_occurred" in cols:
+        select.append("sum(injury_occurred) AS injury_rows")
+    return f"SELECT {', '.join(select)} FROM {_quote(base)} GROUP BY collision_id"
+
+
+def register_views(con, data_path=DATA_PATH, views=VIEWS):
+    """Create one view per parquet file that exists; returns {view: path}."""
+    registered = {}
+    for name, rel in views.items():
+        path = resolve(os.path.join(data_path, rel) if data_path else rel)
+        if not os.path.exists(path):
+            print(f"Warning: {path} not found. Skipping view {name}.", file=sys.stderr)
+            continue
+        if is_arrow(path):
+            # Arrow IPC hand-off (intermediate_io): scanned through pyarrow, memory-mapped
+            con.register(name, ds.dataset(path, format="arrow"))
+        else:
+            con.execute(f"CREATE OR REPLACE VIEW {_quote(name)} AS "
+                        f"SELECT * FROM read_parquet({_quote_literal(path)})")
+        registered[name] = path
+
+    base = next((v for v in ("with_severity", "integrated") if v in registered), None)
+    if base and "collision_id" in _columns(con, base):
+        con.execute(f"CREATE OR REPLACE VIEW collisions AS {_collision_view_sql(con, base)}")
+        registered["collisions"] = f"derived from {base}"
+    return registered
+
+
+def connect(data_path=DATA_PATH, threads=THREADS, memory_limit=MEMORY_LIMIT, temp_dir=TEMP_DIR):
+    """In-memory DuckDB connection with the Schema Sentinel views registered."""
+    con = duckdb.connect(":memory:")
+    con.execute(f"SET threads = {int(threads or os.cpu_count() or 1)}")
+    if memory_limit:
+        con.execute(f"SET memory_limit = {_quote_literal(memory_limit)}")
+    if temp_dir:
+        os.makedirs(temp_dir, exist_ok=True)
+        con.execute(f"SET temp_directory = {_quote_literal(temp_dir)}")
+    # Large group-bys do not need to keep input order
+    con.execute("SET preserve_insertion_order = false")
+    register_views(con, data_path)
+    return con
+
+
+def query(sql, con=None, data_path=DATA_PATH):
+    """Run SQL and return a pandas DataFrame (opens a connection if none is given)."""
+    con = con or connect(data_path)
+    return con.execute(sql).df()
+
+
+def export(sql, output, con):
+    """Write a query result to .parquet or .csv without going through pandas."""
+    fmt = "PARQUET" if output.endswith(".parquet") else "CSV, HEADER"
+    con.execute(f"COPY ({sql.rstrip().rstrip(';')}) TO {_quote_literal(output)} (FORMAT {fmt})")
+
+
+# --------------------------
+# CLI / REPL
+# --------------------------
+HELP = """Commands:
+  .views            list registered views
+  .schema VIEW      columns and types of a view
+  .timer on|off     print query time (default on)
+  .rows N           max rows printed (default 50)
+  .quit             exit
+Anything else is SQL; a statement runs when a line ends with ';'."""
+
+
+def run_sql(con, sql, max_rows=50, timer=True, output=None):
+    t0 = time.perf_counter()
+    if output:
+        export(sql, output, con)
+        print(f"Saved: {output}")
+    else:
+        result = con.execute(sql)
+        if result.description is not None:
+            df = result.df()
+            print(df.head(max_rows).to_string(index=False))
+            if len(df) > max_rows:
+                print(f"... {len(df) - max_rows:,} more rows ({len(df):,} total)")
+    if timer:
+        print(f"({time.perf_counter() - t0:.3f}s)")
+
+
+def show_views(con):
+    views = con.execute("SELECT view_name, sql FROM duckdb_views() WHERE NOT internal ORDER BY view_name").fetchall()
+    for name, sql in views:
+        if "read_parquet(" in sql:
+            source = sql.split("read_parquet(", 1)[1].split(")", 1)[0]
+        else:
+            source = "(derived)" if sql else "(arrow ipc)"
+        print(f"  {name:15} {source}")
+
+
+def repl(con):
+    try:
+        import readline  # noqa: F401  (line editing / history where available)
+    except ImportError:
+        pass
+    print("Schema Sentinel SQL. Views:")
+    show_views(con)
+    print(".help for commands")
+    timer, max_rows, buffer = True, 50, []
+    while True:
+        try:
+            line = input("...> " if buffer else "sql> ")
+        except (EOFError, KeyboardInterrupt):
+            print()
+            break
+        stripped = line.strip()
+        if not buffer and stripped.startswith("."):
+            cmd, _, arg = stripped.partition(" ")
+            if cmd in (".quit", ".exit"):
+                break
+            elif cmd == ".help":
+                print(HELP)
+            elif cmd == ".views":
+                show_views(con)
+            elif cmd == ".schema" and arg:
+                try:
+                    print(con.execute(f"DESCRIBE {_quote(arg.strip())}").df().to_string(index=False))
+                except duckdb.Error as exc:
+                    print(f"Error: {exc}")
+            elif cmd == ".timer":
+                timer = arg.strip() != "off"
+            elif cmd == ".rows" and arg.strip().isdigit():
+                max_rows = int(arg)
+            else:
+                print(HELP)
+            continue
+        if not stripped and not buffer:
+            continue
+        buffer.append(line)
+        if not stripped.endswith(";"):
+            continue
+        sql, buffer = "\n".join(buffer), []
+        try:
+            run_sql(con, sql, max_rows, timer)
+        except duckdb.Error as exc:
+            print(f"Error: {exc}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="SQL over the Schema Sentinel parquet outputs (DuckDB).")
+    parser.add_argument("--data", default=DATA_PATH, help="directory holding the pipeline outputs")
+    parser.add_argument("-c", "--command", help="SQL to run (non-interactive)")
+    parser.add_argument("-f", "--file", help="file with SQL to run (non-interactive)")
+    parser.add_argument("--output", help="write the result to .parquet / .csv instead of printing")
+    parser.add_argument("--rows", type=int, default=50, help="max rows printed")
+    parser.add_argument("--threads", type=int, default=THREADS)
+    parser.add_argument("--memory-limit", default=MEMORY_LIMIT)
+    parser.add_argument("--temp-dir", default=TEMP_DIR)
+    args = parser.parse_args()
+
+    con = connect(args.data, args.threads, args.memory_limit, args.temp_dir)
+    if args.command or args.file:
+        sql = args.command
+        if args.file:
+            with open(args.file) as f:
+                sql = f.read()
+        run_sql(con, sql, args.rows, output=args.output)
+    else:
+        repl(con)
@@ -0,0 +1,290 @@
+"""
+Schema Sentinel - Step Tracing
+------------------------------
+Lightweight timing / memory tracing for the pipeline's STEP banners.
+
+Each traced step records wall time, CPU time, RSS before/after (delta) and
+optional row counts in and out. At the end of a run the tracer prints a
+summary table and writes a Chrome-trace JSON file (open it in
+chrome://tracing or https://ui.perfetto.dev) with one bar per step and an RSS
+counter track.
+
+Tracing is off unless the SCHEMA_SENTINEL_TRACE environment variable is set
+(to "1" for <name>_trace.json in the working directory, or to an output path),
+or Tracer(enabled=True) is used. When off, every call returns immediately, so
+the scripts keep their instrumentation permanently.
+
+Usage (flat scripts - each step() closes the previous one):
+    trace = Tracer("integration")
+    print("\\nSTEP 2: Merging Person + Vehicle...")
+    trace.step("merge person + vehicle", rows_in=len(person))
+    ...
+    trace.end(rows_out=len(pv))
+    trace.finish()
+
+Usage (functions / nested blocks):
+    with trace.span("weather join", rows_in=pv) as s:
+        pvw = pv.merge(weather, on="merge_date", how="left")
+        s.rows_out = pvw
+
+    @trace.traced("categorize weather")
+    def categorize(df): ...
+"""
+
+import functools
+import json
+import numbers
+import os
+import resource
+import threading
+import time
+
+TRACE_ENV = "SCHEMA_SENTINEL_TRACE"
+
+try:
+    _PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+except (AttributeError, ValueError, OSError):
+    _PAGE_SIZE = 4096
+
+
+def _rss_bytes():
+    """Current resident set size (Linux /proc), else the peak from getrusage."""
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except OSError:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if os.uname().sysname == "Darwin" else peak * 1024
+
+
+def _rows(value):
+    """Row count from an integer (numpy ints included), a DataFrame/array (shape[0]) or anything with len()."""
+    if value is None:
+        return None
+    if isinstance(value, numbers.Integral):
+        return int(value)
+    shape = getattr(value, "shape", None)
+    if shape:
+        return int(shape[0])
+    try:
+        return len(value)
+    except TypeError:
+        return None
+
+
+class _NullSpan:
+    """Returned when tracing is off: accepts the same calls and does nothing."""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __setattr__(self, name, value):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Span:
+    """One traced step; set `rows_out` before it closes."""
+    __slots__ = ("tracer", "label", "rows_in", "rows_out", "depth",
+                 "_t0", "_c0", "_rss0", "tid")
+
+    def __init__(self, tracer, label, rows_in=None):
+        self.tracer = tracer
+        self.label = label
+        self.rows_in = _rows(rows_in)
+        self.rows_out = None
+        self.depth = 0
+        self.tid = threading.get_ident()
+
+    def start(self):
+        self.depth = self.tracer._enter()
+        self._rss0 = _rss_bytes()
+        self._c0 = time.process_time_ns()
+        self._t0 = time.perf_counter_ns()
+        return self
+
+    def stop(self, error=None):
+        t1 = time.perf_counter_ns()
+        c1 = time.process_time_ns()
+        rss1 = _rss_bytes()
+        self.tracer._exit()
+        self.tracer._record({
+            "label": self.label,
+            "depth": self.depth,
+            "tid": self.tid,
+            "start_ns": self._t0 - self.tracer._origin,
+            "wall_ns": t1 - self._t0,
+            "cpu_ns": c1 - self._c0,
+            "rss_before": self._rss0,
+            "rss_after": rss1,
+            "rows_in": self.rows_in,
+            "rows_out": _rows(self.rows_out),
+            "error": error,
+        })
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop(error=exc_type.__name__ if exc_type else None)
+        return False
+
+
+class Tracer:
+    """Collects step records for one script run."""
+
+    def __init__(self, name, enabled=None, output=None):
+        env = os.environ.get(TRACE_ENV, "")
+        self.name = name
+        self.enabled = bool(env) if enabled is None else enabled
+        if output is None and env not in ("", "1", "true", "True"):
+            output = env
+        self.output = output or f"{name}_trace.json"
+        self.records = []
+        self._current = None
+        self._lock = threading.Lock()
+        self._depth = threading.local()
+        self._origin = time.perf_counter_ns()
+        self._wall_origin = time.time()
+
+    # ---- bookkeeping (nesting depth is per thread) ----
+    def _enter(self):
+        d = getattr(self._depth, "value", 0)
+        self._depth.value = d + 1
+        return d
+
+    def _exit(self):
+        self._depth.value = max(getattr(self._depth, "value", 1) - 1, 0)
+
+    def _record(self, rec):
+        with self._lock:
+            self.records.append(rec)
+
+    # ---- API ----
+    def span(self, label, rows_in=None):
+        """Context manager around one block."""
+        if not self.enabled:
+            return _NULL_SPAN
+        return Span(self, label, rows_in)
+
+    def step(self, label, rows_in=None):
+        """Start a flat step; closes the previous one (for top-level script STEPs)."""
+        if not self.enabled:
+            return _NULL_SPAN
+        self.end()
+        self._current = Span(self, label, rows_in).start()
+        return self._current
+
+    def end(self, rows_out=None):
+        """Close the current flat step, optionally with its output row count."""
+        if not self.enabled or self._current is None:
+            return
+        if rows_out is not None:
+            self._current.rows_out = rows_out
+        self._current.stop()
+        self._current = None
+
+    def traced(self, label=None, rows_in_arg=0):
+        """
+        Decorator: trace each call. rows_in is taken from positional argument
+        `rows_in_arg` (None to skip) and rows_out from the return value.
+        """
+        def decorate(fn):
+            name = label or fn.__name__
+
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return fn(*args, **kwargs)
+                rows_in = args[rows_in_arg] if rows_in_arg is not None and len(args) > rows_in_arg else None
+                with Span(self, name, _rows(rows_in)) as s:
+                    result = fn(*args, **kwargs)
+                    s.rows_out = _rows(result)
+                return result
+            return wrapper
+        return decorate
+
+    # ---- output ----
+    def summary(self):
+        """One row per step label (calls aggregated), in start order."""
+        rows = {}
+        for r in sorted(self.records, key=lambda r: r["start_ns"]):
+            row = rows.setdefault(r["label"], {
+                "step": r["label"], "depth": r["depth"], "calls": 0, "wall_s": 0.0, "cpu_s": 0.0,
+                "rss_delta_mb": 0.0, "rss_after_mb": 0.0, "rows_in": None, "rows_out": None,
+            })
+            row["calls"] += 1
+            row["wall_s"] += r["wall_ns"] / 1e9
+            row["cpu_s"] += r["cpu_ns"] / 1e9
+            row["rss_delta_mb"] += (r["rss_after"] - r["rss_before"]) / 1e6
+            row["rss_after_mb"] = r["rss_after"] / 1e6
+            for k in ("rows_in", "rows_out"):
+                if r[k] is not None:
+                    row[k] = (row[k] or 0) + r[k]
+        for row in rows.values():
+            n = row["rows_in"] or row["rows_out"]
+            row["rows_per_s"] = n / row["wall_s"] if n and row["wall_s"] > 0 else None
+        return list(rows.values())
+
+    def report(self):
+        """Print the summary table."""
+        rows = self.summary()
+        if not rows:
+            return
+        total = sum(r["wall_s"] for r in rows if r["depth"] == 0) or 1e-9
+        width = max(30, max(len(r["step"]) + 2 * r["depth"] for r in rows))
+
+        def fmt(v):
+            return f"{v:>12,}" if v is not None else f"{'-':>12}"
+
+        print("\n" + "=" * 80)
+        print(f"STEP TRACE - {self.name}")
+        print("=" * 80)
+        print(f"{'step':{width}} {'wall s':>9} {'cpu s':>9} {'share':>6} {'RSS Δ MB':>9} {'RSS MB':>8} "
+              f"{'rows in':>12} {'rows out':>12} {'rows/s':>12}")
+        for r in rows:
+            share = f"{r['wall_s'] / total:6.1%}" if r["depth"] == 0 else " " * 6
+            rate = f"{r['rows_per_s']:>12,.0f}" if r["rows_per_s"] else f"{'-':>12}"
+            print(f"{'  ' * r['depth'] + r['step']:{width}} {r['wall_s']:9.3f} {r['cpu_s']:9.3f} {share} "
+                  f"{r['rss_delta_mb']:9.1f} {r['rss_after_mb']:8.0f} {fmt(r['rows_in'])} {fmt(r['rows_out'])} {rate}")
+        print(f"{'total (top-level steps)':{width}} {total:9.3f}")
+
+    def write_chrome_trace(self, path=None):
+        """Write a Chrome trace-event JSON file; returns its path."""
+        path = path or self.output
+        pid = os.getpid()
+        events = [{"name": "process_name", "ph": "M", "pid": pid, "args": {"name": self.name}}]
+        for r in sorted(self.records, key=lambda r: r["start_ns"]):
+            ts = r["start_ns"] / 1e3
+            events.append({
+                "name": r["label"], "cat": "step", "ph": "X", "pid": pid, "tid": r["tid"],
+                "ts": ts, "dur": r["wall_ns"] / 1e3,
+                "args": {
+                    "cpu_ms": round(r["cpu_ns"] / 1e6, 3),
+                    "rss_delta_mb": round((r["rss_after"] - r["rss_before"]) / 1e6, 2),
+                    "rows_in": r["rows_in"],
+                    "rows_out": r["rows_out"],
+                    **({"error": r["error"]} if r["error"] else {}),
+                },
+            })
+            for t, rss in ((ts, r["rss_before"]), (ts + r["wall_ns"] / 1e3, r["rss_after"])):
+                events.append({"name": "RSS MB", "ph": "C", "pid": pid, "ts": t,
+                               "args": {"rss": round(rss / 1e6, 1)}})
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms",
+                       "otherData": {"name": self.name, "started": self._wall_origin}}, f)
+        return path
+
+    def finish(self):
+        """Close any open step, print the summary and write the trace file."""
+        if not self.enabled:
+            return
+        self.end()
+        self.report()
+        print(f"Chrome trace written to: {self.write_chrome_trace()}")
@@ -0,0 +1,523 @@
+"""
+Schema Sentinel - Synthetic NYC Collisions Data Generator
+---------------------------------------------------------
+Generates raw Person, Vehicle, Crashes and Weather files with the same file
+names, column names and value formats as the NYC Open Data / NOAA downloads,
+so every conditioning, integration and model script can run end to end (and
+be benchmarked) without the real multi-GB files.
+
+What is mimicked:
+- persons-per-collision: 1-5 vehicles per collision (mostly 2), a driver plus
+  Poisson passengers per vehicle, parked vehicles with no occupants, and a
+  pedestrian or bicyclist in a share of single-vehicle collisions
+- person.vehicle_id -> vehicles.unique_id links (null for pedestrians/cyclists)
+- skewed categoricals: vehicle types with case variants ("Bus"/"BUS"/"bus",
+  "4 Dr Sedan", "Pk", ...) and a long Zipf tail of junk codes, Zipf street
+  names, contributing factors dominated by "Unspecified"
+- nulls where the real data has them: ~30% blank BOROUGH / ZIP CODE (with
+  coordinates still present), missing or 0/0 coordinates, missing ages,
+  missing license status
+- crash-level injury/fatality counts consistent with the person rows
+- daily weather with seasonal temperatures, rain/snow days and WT flags
+
+Outputs (in OUTPUT_PATH):
+- person_full.parquet
+- vehicles_full.parquet
+- Motor_Vehicle_Collisions_-_Crashes_20251111.parquet
+- nyc weather data.csv
+
+Usage:
+    python synthetic_nyc_data.py --persons 1000000 --out synthetic
+    python synthetic_nyc_data.py --persons 50000000 --out /data/sf50m --start 2013-01-01
+"""
+
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# --------------------------
+# CONFIGURATION
+# --------------------------
+OUTPUT_PATH = "synthetic"
+PERSONS = 1_000_000                  # target person rows (scale factor: 10K .. 50M)
+START_DATE = "2020-01-01"
+END_DATE = "2024-12-31"
+SEED = 42
+CHUNK_COLLISIONS = 250_000           # collisions generated and written per chunk
+
+PERSON_FILE = "person_full.parquet"
+VEHICLE_FILE = "vehicles_full.parquet"
+CRASHES_FILE = "Motor_Vehicle_Collisions_-_Crashes_20251111.parquet"
+WEATHER_FILE = "nyc weather data.csv"
+
+FIRST_COLLISION_ID = 4_000_000
+FIRST_PERSON_ID = 10_000_000
+FIRST_VEHICLE_ID = 20_000_000
+
+# Shape of a collision
+VEHICLES_PER_COLLISION = ([1, 2, 3, 4, 5], [0.20, 0.67, 0.09, 0.03, 0.01])
+PASSENGERS_MEAN = 0.35
+PARKED_SHARE = 0.05                  # vehicles with no person rows
+SINGLE_VEHICLE_NON_OCCUPANT = {"Pedestrian": 0.45, "Bicyclist": 0.20}   # rest: none
+
+BOROUGHS = {
+    # name: (share, center lat, center lon, lat sd, lon sd, zip codes)
+    "BROOKLYN": (0.31, 40.6500, -73.9500, 0.035, 0.040, list(range(11201, 11240))),
+    "QUEENS": (0.28, 40.7250, -73.8200, 0.045, 0.060,
+               list(range(11101, 11107)) + list(range(11354, 11380)) + list(range(11411, 11437))),
+    "MANHATTAN": (0.18, 40.7700, -73.9750, 0.040, 0.018, list(range(10001, 10041))),
+    "BRONX": (0.17, 40.8400, -73.8750, 0.025, 0.030, list(range(10451, 10476))),
+    "STATEN ISLAND": (0.06, 40.5800, -74.1400, 0.030, 0.040, list(range(10301, 10315))),
+}
+BLANK_BOROUGH_SHARE = 0.30
+MISSING_COORDS_SHARE = 0.06
+ZERO_COORDS_SHARE = 0.01
+
+HOUR_WEIGHTS = [2.0, 1.3, 1.1, 1.0, 1.2, 1.4, 2.2, 3.5, 4.6, 4.2, 4.3, 4.5,
+                4.9, 5.1, 5.6, 6.1, 6.4, 6.5, 5.6, 4.5, 3.8, 3.3, 2.9, 2.4]
+
+VEHICLE_TYPES = {
+    "Sedan": 0.36, "Station Wagon/Sport Utility Vehicle": 0.27, "PASSENGER VEHICLE": 0.06,
+    "SPORT UTILITY / STATION WAGON": 0.04, "Taxi": 0.035, "Pick-up Truck": 0.025, "Box Truck": 0.018,
+    "Bike": 0.017, "Bus": 0.012, "BUS": 0.004, "bus": 0.001, "Tractor Truck Diesel": 0.008,
+    "Motorcycle": 0.007, "E-Bike": 0.008, "Van": 0.007, "4 dr sedan": 0.008, "2 dr sedan": 0.001,
+    "PK": 0.003, "E-Scooter": 0.004, "Ambulance": 0.003, "Dump": 0.003, "Convertible": 0.002,
+    "Garbage or Refuse": 0.002, "Flat Bed": 0.002, "Moped": 0.002, "LIVERY VEHICLE": 0.002,
+}
+VEHICLE_TYPE_TAIL_SIZE = 1_500       # junk free-text codes ("UNK", "FORKL", ...)
+VEHICLE_TYPE_TAIL_SHARE = 0.02
+VEHICLE_TYPE_NULL_SHARE = 0.01
+
+FACTORS = {
+    "Unspecified": 0.35, "Driver Inattention/Distraction": 0.25, "Failure to Yield Right-of-Way": 0.07,
+    "Following Too Closely": 0.06, "Backing Unsafely": 0.04, "Passing or Lane Usage Improper": 0.035,
+    "Passing Too Closely": 0.03, "Unsafe Lane Changing": 0.025, "Other Vehicular": 0.025,
+    "Turning Improperly": 0.02, "Traffic Control Disregarded": 0.015, "Driver Inexperience": 0.015,
+    "Unsafe Speed": 0.015, "Reaction to Uninvolved Vehicle": 0.01, "Alcohol Involvement": 0.008,
+    "View Obstructed/Limited": 0.008, "Pavement Slippery": 0.007, "Pedestrian/Bicyclist/Other Pedestrian Error/Confusion": 0.006,
+    "Aggressive Driving/Road Rage": 0.005, "Fatigued/Drowsy": 0.003, "Brakes Defective": 0.003,
+}
+
+LICENSE_STATUS = ({"Licensed": 0.60, "Unlicensed": 0.03, "Permit": 0.01}, 0.36)   # (values, null share)
+SEX_DRIVER = {"M": 0.70, "F": 0.24, "U": 0.06}
+SEX_OTHER = {"M": 0.50, "F": 0.44, "U": 0.06}
+MAKES = ["TOYOTA", "HONDA", "NISSAN", "FORD", "CHEVROLET", "JEEP", "BMW", "HYUNDAI", "MERCEDES BENZ",
+         "LEXUS", "SUBARU", "DODGE", "ACURA", "KIA", "VOLKSWAGEN", "INFINITI", "GMC", "AUDI", "MAZDA", "TESLA"]
+STATES = {"NY": 0.84, "NJ": 0.05, "PA": 0.02, "FL": 0.01, "CT": 0.01, "ZZ": 0.01, "MA": 0.005}
+
+STREET_STEMS = ["BROADWAY", "ATLANTIC", "FLATBUSH", "NORTHERN", "QUEENS", "JAMAICA", "LINDEN", "CONEY ISLAND",
+                "GRAND CONCOURSE", "FORDHAM", "HYLAN", "RICHMOND", "OCEAN", "KINGS", "UTICA", "NOSTRAND",
+                "BEDFORD", "MYRTLE", "FULTON", "LEXINGTON", "AMSTERDAM", "PARK", "MADISON", "HILLSIDE"]
+STREET_SUFFIXES = ["AVENUE", "STREET", "BOULEVARD", "PARKWAY", "ROAD", "EXPRESSWAY", "PLACE"]
+STREET_POOL_SIZE = 5_000
+
+
+# --------------------------
+# Helpers
+# --------------------------
+def _choice(rng, values, n, probs=None, null_share=0.0):
+    """Sample n values (object array) with optional probabilities and a share of None."""
+    values = np.asarray(list(values), dtype=object)
+    if probs is not None:
+        probs = np.asarray(probs, dtype=np.float64)
+        probs = probs / probs.sum()
+    out = values[rng.choice(len(values), size=n, p=probs)]
+    if null_share:
+        out[rng.random(n) < null_share] = None
+    return out
+
+
+def _zipf_probs(n, s=1.1):
+    p = 1.0 / np.arange(1, n + 1) ** s
+    return p / p.sum()
+
+
+def _vocabularies(seed):
+    """Fixed vocabularies shared by every chunk (street names, junk vehicle codes)."""
+    rng = np.random.default_rng([seed, 0])
+    streets = []
+    for i in range(STREET_POOL_SIZE):
+        if i % 3 == 0:
+            streets.append(f"{rng.integers(1, 240)} {rng.choice(STREET_SUFFIXES[:2])}")
+        else:
+            streets.append(f"{rng.choice(STREET_STEMS)} {rng.choice(STREET_SUFFIXES)}")
+    streets = list(dict.fromkeys(streets))
+    letters = np.array(list("ABCDEFGHIJKLMNOPQRSTUVWXYZ"))
+    tail = ["".join(rng.choice(letters, size=rng.integers(3, 8))) for _ in range(VEHICLE_TYPE_TAIL_SIZE)]
+    return {
+        "streets": np.array(streets, dtype=object),
+        "street_p": _zipf_probs(len(streets)),
+        "vehicle_tail": np.array(tail, dtype=object),
+        "vehicle_tail_p": _zipf_probs(len(tail), 1.3),
+    }
+
+
+def _segment_rank(group_sizes):
+    """0-based position of each row inside its group for contiguous groups."""
+    starts = np.repeat(np.cumsum(group_sizes) - group_sizes, group_sizes)
+    return np.arange(group_sizes.sum()) - starts
+
+
+def expected_persons_per_collision():
+    sizes, probs = VEHICLES_PER_COLLISION
+    mean_vehicles = float(np.dot(sizes, probs))
+    non_occupant = probs[0] * sum(SINGLE_VEHICLE_NON_OCCUPANT.values())
+    return mean_vehicles * (1 - PARKED_SHARE) * (1 + PASSENGERS_MEAN) + non_occupant
+
+
+# --------------------------
+# One chunk of collisions
+# --------------------------
+def generate_chunk(chunk_index, n_collisions, id_offsets, dates, vocab, seed=SEED):
+    """Return (crashes, vehicles, persons) DataFrames for one chunk of collisions."""
+    rng = np.random.default_rng([seed, 1, chunk_index])
+    coll_ids = id_offsets["collision"] + np.arange(n_collisions, dtype=np.int64)
+
+    # ---- collision level ----
+    day = dates[rng.integers(0, len(dates), n_collisions)]
+    hour = rng.choice(24, size=n_collisions, p=np.asarray(HOUR_WEIGHTS) / sum(HOUR_WEIGHTS))
+    minute = rng.integers(0, 60, n_collisions)
+    crash_time = pd.Series(hour).astype(str).str.cat(pd.Series(minute).map("{:02d}".format), sep=":").to_numpy()
+
+    names = list(BOROUGHS)
+    shares = np.array([BOROUGHS[b][0] for b in names])
+    b_idx = rng.choice(len(names), size=n_collisions, p=shares / shares.sum())
+    lat = np.array([BOROUGHS[b][1] for b in names])[b_idx] + rng.normal(0, 1, n_collisions) * \
+        np.array([BOROUGHS[b][3] for b in names])[b_idx]
+    lon = np.array([BOROUGHS[b][2] for b in names])[b_idx] + rng.normal(0, 1, n_collisions) * \
+        np.array([BOROUGHS[b][4] for b in names])[b_idx]
+    zip_code = np.empty(n_collisions, dtype=object)
+    for i, b in enumerate(names):
+        m = b_idx == i
+        zip_code[m] = rng.choice(BOROUGHS[b][5], size=m.sum()).astype(str)
+    borough = np.array(names, dtype=object)[b_idx]
+    blank = rng.random(n_collisions) < BLANK_BOROUGH_SHARE
+    borough[blank] = None
+    zip_code[blank] = None
+    u = rng.random(n_collisions)
+    lat[u < MISSING_COORDS_SHARE] = np.nan
+    lon[u < MISSING_COORDS_SHARE] = np.nan
+    zero = (u >= MISSING_COORDS_SHARE) & (u < MISSING_COORDS_SHARE + ZERO_COORDS_SHARE)
+    lat[zero] = 0.0
+    lon[zero] = 0.0
+    lat, lon = np.round(lat, 6), np.round(lon, 6)
+
+    # ---- vehicles ----
+    sizes, probs = VEHICLES_PER_COLLISION
+    n_veh = rng.choice(sizes, size=n_collisions, p=probs)
+    n_vehicles = int(n_veh.sum())
+    veh_coll = np.repeat(np.arange(n_collisions), n_veh)
+    veh_rank = _segment_rank(n_veh)
+    veh_ids = id_offsets["vehicle"] + np.arange(n_vehicles, dtype=np.int64)
+
+    tail = rng.random(n_vehicles) < VEHICLE_TYPE_TAIL_SHARE
+    vehicle_type = _choice(rng, VEHICLE_TYPES, n_vehicles, list(VEHICLE_TYPES.values()),
+                           null_share=VEHICLE_TYPE_NULL_SHARE)
+    vehicle_type[tail] = vocab["vehicle_tail"][rng.choice(len(vocab["vehicle_tail"]), size=tail.sum(),
+                                                          p=vocab["vehicle_tail_p"])]
+    factor_1 = _choice(rng, FACTORS, n_vehicles, list(FACTORS.values()), null_share=0.01)
+    factor_2 = _choice(rng, FACTORS, n_vehicles, list(FACTORS.values()), null_share=0.75)
+    lic_values, lic_null = LICENSE_STATUS
+    license_status = _choice(rng, lic_values, n_vehicles, list(lic_values.values()), null_share=lic_null)
+
+    parked = rng.random(n_vehicles) < PARKED_SHARE
+    occupants = np.where(parked, 0, 1 + rng.poisson(PASSENGERS_MEAN, n_vehicles))
+
+    # ---- persons: occupants ----
+    n_occ = int(occupants.sum())
+    occ_vehicle = np.repeat(np.arange(n_vehicles), occupants)
+    occ_is_driver = _segment_rank(occupants) == 0
+
+    # ---- persons: pedestrians / bicyclists in single-vehicle collisions ----
+    kinds = list(SINGLE_VEHICLE_NON_OCCUPANT)
+    kind_p = list(SINGLE_VEHICLE_NON_OCCUPANT.values())
+    draw = rng.choice(len(kinds) + 1, size=n_collisions, p=kind_p + [1 - sum(kind_p)])
+    has_non_occ = (n_veh == 1) & (draw < len(kinds))
+    non_occ_coll = np.flatnonzero(has_non_occ)
+    non_occ_kind = np.array(kinds, dtype=object)[draw[has_non_occ]]
+
+    n_persons = n_occ + len(non_occ_coll)
+    p_coll = np.concatenate([veh_coll[occ_vehicle], non_occ_coll])
+    person_type = np.concatenate([np.full(n_occ, "Occupant", dtype=object), non_occ_kind])
+    ped_role = np.concatenate([np.where(occ_is_driver, "Driver", "Passenger").astype(object),
+                               np.where(non_occ_kind == "Pedestrian", "Pedestrian", "Driver").astype(object)])
+    p_vehicle = np.concatenate([occ_vehicle, np.full(len(non_occ_coll), -1)])
+    # Restore collision order (occupants then non-occupants within each collision)
+    order = np.argsort(p_coll, kind="stable")
+    p_coll, person_type, ped_role, p_vehicle = p_coll[order], person_type[order], ped_role[order], p_vehicle[order]
+    is_driver = ped_role == "Driver"
+
+    age = np.clip(rng.normal(np.where(is_driver, 42, 35), 17), 0, 95).round()
+    age[rng.random(n_persons) < 0.04] = np.nan
+    dirty = rng.random(n_persons) < 0.002
+    age[dirty] = rng.choice([-1, 0, 150, 999], size=dirty.sum())
+    sex = np.where(is_driver,
+                   _choice(rng, SEX_DRIVER, n_persons, list(SEX_DRIVER.values())),
+                   _choice(rng, SEX_OTHER, n_persons, list(SEX_OTHER.values())))
+    sex[rng.random(n_persons) < 0.03] = None
+
+    # Injury probability: road-user type x time of day x vehicle type x age
+    base = np.select([person_type == "Pedestrian", person_type == "Bicyclist", ped_role == "Passenger"],
+                     [0.75, 0.70, 0.12], default=0.09)
+    p_hour = hour[p_coll]
+    base = base * np.where((p_hour < 4) | (p_hour >= 22), 1.35, 1.0)
+    vt = np.where(p_vehicle >= 0, vehicle_type[np.maximum(p_vehicle, 0)], None)
+    base = base * np.where(np.isin(vt, ["Motorcycle", "Bike", "E-Bike", "E-Scooter", "Moped"]), 3.0, 1.0)
+    base = base * np.where(np.nan_to_num(age, nan=40) >= 65, 1.3, 1.0)
+    base = np.minimum(base, 0.95)
+    killed_p = np.where(np.isin(person_type, ["Pedestrian", "Bicyclist"]), 0.015, 0.0015)
+    u = rng.random(n_persons)
+    injury = np.where(u < killed_p, "Killed", np.where(u < base, "Injured", "Unspecified")).astype(object)
+
+    persons = pd.DataFrame({
+        "unique_id": id_offsets["person"] + np.arange(n_persons, dtype=np.int64),
+        "collision_id": coll_ids[p_coll],
+        "crash_date": day[p_coll],
+        "crash_time": crash_time[p_coll],
+        "person_id": np.char.mod("%016x", rng.integers(0, 2**62, n_persons)).astype(object),
+        "person_type": person_type,
+        "person_injury": injury,
+        "vehicle_id": pd.array(np.where(p_vehicle >= 0, veh_ids[np.maximum(p_vehicle, 0)], 0), dtype="Int64"),
+        "person_age": age,
+        "ejection": _choice(rng, ["Not Ejected", "Ejected", "Partially Ejected"], n_persons,
+                            [0.97, 0.02, 0.01], null_share=0.35),
+        "emotional_status": _choice(rng, ["Does Not Apply", "Conscious", "Unknown", "Shock", "Unconscious"],
+                                    n_persons, [0.45, 0.40, 0.12, 0.02, 0.01], null_share=0.05),
+        "bodily_injury": _choice(rng, ["Does Not Apply", "Back", "Neck", "Head", "Knee-Lower Leg Foot",
+                                       "Entire Body", "Unknown"], n_persons,
+                                 [0.5, 0.13, 0.1, 0.08, 0.07, 0.05, 0.07], null_share=0.05),
+        "position_in_vehicle": np.where(is_driver & (person_type == "Occupant"), "Driver",
+                                        _choice(rng, ["Front passenger, if two or more persons, including the driver, are in the front seat",
+                                                      "Left rear passenger or rear passenger on a bicycle, motorcycle, snowmobile",
+                                                      "Right rear passenger or motorcycle sidecar passenger",
+                                                      "Unknown"], n_persons)),
+        "safety_equipment": _choice(rng, ["Lap Belt & Harness", "None", "Unknown", "Lap Belt", "Air Bag Deployed",
+                                          "Helmet (Motorcycle Only)", "Helmet Only (In-Line Skater/Bicyclist)"],
+                                    n_persons, [0.5, 0.12, 0.2, 0.08, 0.06, 0.02, 0.02], null_share=0.3),
+        "ped_location": np.where(person_type == "Occupant", None,
+                                 _choice(rng, ["Pedestrian/Bicyclist/Other Pedestrian at Intersection",
+                                               "Pedestrian/Bicyclist/Other Pedestrian Not at Intersection",
+                                               "Does Not Apply", "Unknown"], n_persons, [0.5, 0.3, 0.1, 0.1])),
+        "ped_action": np.where(person_type == "Occupant", None,
+                               _choice(rng, ["Crossing With Signal", "Crossing Against Signal", "Crossing, No Signal, or Crosswalk",
+                                             "Emerging from in Front of/Behind Parked Vehicle", "Riding/Walking Along Highway With Traffic",
+                                             "Other Actions in Roadway", "Unknown"], n_persons,
+                                       [0.3, 0.15, 0.15, 0.05, 0.1, 0.1, 0.15])),
+        "complaint": np.where(injury == "Unspecified", "Does Not Apply",
+                              _choice(rng, ["Pain or Nausea", "Complaint of Pain or Nausea", "Minor Bleeding", "Whiplash",
+                                            "Contusion - Bruise", "Fracture - Distorted - Dislocation", "Severe Bleeding",
+                                            "Unknown"], n_persons, [0.35, 0.2, 0.1, 0.08, 0.1, 0.07, 0.03, 0.07])),
+        "ped_role": ped_role,
+        "contributing_factor_1": np.where(is_driver & (p_vehicle >= 0), factor_1[np.maximum(p_vehicle, 0)], None),
+        "contributing_factor_2": np.where(is_driver & (p_vehicle >= 0), factor_2[np.maximum(p_vehicle, 0)], None),
+        "person_sex": sex,
+    })
+    persons.loc[persons["vehicle_id"] == 0, "vehicle_id"] = pd.NA
+    persons["crash_date"] = pd.to_datetime(persons["crash_date"]).dt.strftime("%Y-%m-%dT00:00:00.000")
+
+    # Vehicle-level driver attributes come from the driver person row when there is one
+    driver_rows = persons.loc[(persons["ped_role"] == "Driver") & persons["vehicle_id"].notna()]
+    driver_sex = pd.Series(driver_rows["person_sex"].to_numpy(), index=driver_rows["vehicle_id"].astype(np.int64))
+    driver_sex = driver_sex.reindex(veh_ids).to_numpy(dtype=object)
+
+    vehicles = pd.DataFrame({
+        "unique_id": veh_ids,
+        "collision_id": coll_ids[veh_coll],
+        "crash_date": pd.to_datetime(day[veh_coll]).strftime("%Y-%m-%dT00:00:00.000"),
+        "crash_time": crash_time[veh_coll],
+        "vehicle_id": np.char.mod("%016x", rng.integers(0, 2**62, n_vehicles)).astype(object),
+        "state_registration": _choice(rng, STATES, n_vehicles, list(STATES.values()), null_share=0.02),
+        "vehicle_type": vehicle_type,
+        "vehicle_make": _choice(rng, MAKES, n_vehicles, _zipf_probs(len(MAKES), 0.8), null_share=0.05),
+        "vehicle_model": _choice(rng, ["CAMRY", "ACCORD", "ALTIMA", "CIVIC", "ROGUE"], n_vehicles, null_share=0.9),
+        "vehicle_year": np.where(rng.random(n_vehicles) < 0.1, np.nan,
+                                 np.clip(2024 - rng.gamma(2.0, 4.0, n_vehicles), 1970, 2025).round()),
+        "travel_direction": _choice(rng, ["North", "South", "East", "West", "Unknown"], n_vehicles,
+                                    [0.25, 0.25, 0.2, 0.2, 0.1], null_share=0.02),
+        "vehicle_occupants": occupants.astype(np.float64),
+        "driver_sex": driver_sex,
+        "driver_license_status": license_status,
+        "driver_license_jurisdiction": _choice(rng, STATES, n_vehicles, list(STATES.values()), null_share=0.35),
+        "pre_crash": _choice(rng, ["Going Straight Ahead", "Parked", "Stopped in Traffic", "Making Left Turn",
+                                   "Backing", "Changing Lanes", "Making Right Turn", "Slowing or Stopping"],
+                             n_vehicles, [0.45, 0.08, 0.12, 0.09, 0.06, 0.06, 0.07, 0.07]),
+        "point_of_impact": _choice(rng, ["Front End", "Left Front Bumper", "Right Front Bumper", "Rear End",
+                                         "Left Side Doors", "Right Side Doors", "Center Back End"], n_vehicles),
+        "vehicle_damage": _choice(rng, ["Center Front End", "Left Front Bumper", "Right Front Bumper",
+                                        "Center Back End", "No Damage"], n_vehicles, null_share=0.1),
+        "vehicle_damage_1": _choice(rng, ["Left Front Quarter Panel", "Right Front Quarter Panel", "Roof"],
+                                    n_vehicles, null_share=0.6),
+        "vehicle_damage_2": _choice(rng, ["Left Side Doors", "Right Side Doors"], n_vehicles, null_share=0.8),
+        "vehicle_damage_3": _choice(rng, ["Trailer", "Undercarriage"], n_vehicles, null_share=0.9),
+        "public_property_damage": _choice(rng, ["N", "Y"], n_vehicles, [0.97, 0.03], null_share=0.1),
+        "public_property_damage_type": _choice(rng, ["SIGN", "POLE", "FENCE"], n_vehicles, null_share=0.98),
+        "contributing_factor_1": factor_1,
+        "contributing_factor_2": factor_2,
+    })
+    vehicles.loc[parked, "pre_crash"] = "Parked"
+
+    # ---- crashes: counts consistent with the person rows ----
+    injured = persons["person_injury"].to_numpy() == "Injured"
+    killed = persons["person_injury"].to_numpy() == "Killed"
+    ptype = persons["person_type"].to_numpy()
+
+    def _count(mask):
+        return np.bincount(p_coll[mask], minlength=n_collisions).astype(np.float64)
+
+    crashes = pd.DataFrame({
+        "CRASH DATE": pd.to_datetime(day).strftime("%m/%d/%Y"),
+        "CRASH TIME": crash_time,
+        "BOROUGH": borough,
+        "ZIP CODE": zip_code,
+        "LATITUDE": lat,
+        "LONGITUDE": lon,
+        "LOCATION": np.where(np.isnan(lat), None,
+                             "(" + pd.Series(lat).astype(str) + ", " + pd.Series(lon).astype(str) + ")"),
+        "ON STREET NAME": _choice(rng, vocab["streets"], n_collisions, vocab["street_p"], null_share=0.22),
+        "CROSS STREET NAME": _choice(rng, vocab["streets"], n_collisions, vocab["street_p"], null_share=0.38),
+        "OFF STREET NAME": np.where(rng.random(n_collisions) < 0.1,
+                                    _choice(rng, vocab["streets"], n_collisions, vocab["street_p"]), None),
+        "NUMBER OF PERSONS INJURED": _count(injured),
+        "NUMBER OF PERSONS KILLED": _count(killed),
+        "NUMBER OF PEDESTRIANS INJURED": _count(injured & (ptype == "Pedestrian")),
+        "NUMBER OF PEDESTRIANS KILLED": _count(killed & (ptype == "Pedestrian")),
+        "NUMBER OF CYCLIST INJURED": _count(injured & (ptype == "Bicyclist")),
+        "NUMBER OF CYCLIST KILLED": _count(killed & (ptype == "Bicyclist")),
+        "NUMBER OF MOTORIST INJURED": _count(injured & (ptype == "Occupant")),
+        "NUMBER OF MOTORIST KILLED": _count(killed & (ptype == "Occupant")),
+    })
+    for k in range(1, 6):
+        col = np.full(n_collisions, None, dtype=object)
+        m = veh_rank == k - 1
+        col[veh_coll[m]] = factor_1[m]
+        crashes[f"CONTRIBUTING FACTOR VEHICLE {k}"] = col
+    crashes["COLLISION_ID"] = coll_ids
+    for k in range(1, 6):
+        col = np.full(n_collisions, None, dtype=object)
+        m = veh_rank == k - 1
+        col[veh_coll[m]] = vehicle_type[m]
+        crashes[f"VEHICLE TYPE CODE {k}"] = col
+
+    return crashes, vehicles, persons
+
+
+# --------------------------
+# Weather
+# --------------------------
+def generate_weather(start=START_DATE, end=END_DATE, seed=SEED):
+    """Daily Central Park-style NOAA GHCN-Daily rows (DATE, PRCP, SNOW, TMAX, TMIN, WTxx flags)."""
+    rng = np.random.default_rng([seed, 2])
+    dates = pd.date_range(start, end, freq="D")
+    n = len(dates)
+    doy = dates.dayofyear.to_numpy()
+    season = np.cos(2 * np.pi * (doy - 200) / 365.25)          # +1 mid-July, -1 mid-January
+
+    tmax = np.round(62 + 22 * season + rng.normal(0, 7, n))
+    tmin = np.round(tmax - 12 - np.abs(rng.normal(0, 4, n)))
+    wet = rng.random(n) < 0.33
+    prcp = np.where(wet, np.round(rng.exponential(0.35, n), 2), 0.0)
+    snowy = wet & (tmax < 38)
+    snow = np.where(snowy, np.round(prcp * rng.uniform(6, 12, n), 1), 0.0)
+    snwd = np.round(np.maximum(0, pd.Series(snow).rolling(5, min_periods=1).sum().to_numpy() - 1), 1)
+
+    def flag(mask):
+        return np.where(mask, 1.0, np.nan)
+
+    weather = pd.DataFrame({
+        "STATION": "USW00094728",
+        "NAME": "NY CITY CENTRAL PARK, NY US",
+        "DATE": dates.strftime("%Y-%m-%d"),
+        "AWND": np.round(np.abs(rng.normal(5.5, 2.0, n)), 2),
+        "PRCP": prcp,
+        "SNOW": snow,
+        "SNWD": snwd,
+        "TMAX": tmax,
+        "TMIN": tmin,
+        "WT01": flag(rng.random(n) < 0.12),     # fog
+        "WT02": flag(rng.random(n) < 0.02),     # heavy fog
+        "WT03": flag(wet & (season > 0.3) & (rng.random(n) < 0.2)),   # thunder
+        "WT08": flag(rng.random(n) < 0.05),     # haze
+        "WT16": flag(wet & ~snowy & (rng.random(n) < 0.5)),           # rain
+        "WT18": flag(snowy & (rng.random(n) < 0.7)),                  # snow
+    })
+    # A few missing observations, as in the real station record
+    weather.loc[rng.random(n) < 0.003, ["TMAX", "TMIN"]] = np.nan
+    return weather
+
+
+# --------------------------
+# Driver
+# --------------------------
+def generate(out_dir=OUTPUT_PATH, persons=PERSONS, start=START_DATE, end=END_DATE, seed=SEED,
+             chunk_collisions=CHUNK_COLLISIONS):
+    """Write all four raw files to out_dir. Returns a dict of row counts."""
+    os.makedirs(out_dir, exist_ok=True)
+    dates = pd.date_range(start, end, freq="D").to_numpy()
+    vocab = _vocabularies(seed)
+    n_collisions = max(1, int(round(persons / expected_persons_per_collision())))
+
+    writers = {}
+    counts = {"collisions": 0, "vehicles": 0, "persons": 0}
+    offsets = {"collision": FIRST_COLLISION_ID, "vehicle": FIRST_VEHICLE_ID, "person": FIRST_PERSON_ID}
+    try:
+        for chunk_index, first in enumerate(range(0, n_collisions, chunk_collisions)):
+            size = min(chunk_collisions, n_collisions - first)
+            crashes, vehicles, persons_df = generate_chunk(chunk_index, size, offsets, dates, vocab, seed)
+            for name, df in [(CRASHES_FILE, crashes), (VEHICLE_FILE, vehicles), (PERSON_FILE, persons_df)]:
+                table = pa.Table.from_pandas(df, preserve_index=False)
+                if name not in writers:
+                    # All-null object columns in the first chunk must still be strings
+                    schema = pa.schema([pa.field(f.name, pa.string()) if pa.types.is_null(f.type) else f
+                                        for f in table.schema])
+                    writers[name] = pq.ParquetWriter(os.path.join(out_dir, name), schema, compression="snappy")
+                writers[name].write_table(table.cast(writers[name].schema))
+            offsets["collision"] += size
+            offsets["vehicle"] += len(vehicles)
+            offsets["person"] += len(persons_df)
+            counts["collisions"] += size
+            counts["vehicles"] += len(vehicles)
+            counts["persons"] += len(persons_df)
+    finally:
+        for writer in writers.values():
+            writer.close()
+
+    weather = generate_weather(start, end, seed)
+    weather.to_csv(os.path.join(out_dir, WEATHER_FILE), index=False)
+    counts["weather_days"] = len(weather)
+    return counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate synthetic raw NYC collision + weather files.")
+    parser.add_argument("--out", default=OUTPUT_PATH, help="output directory (the scripts' RAW_DATA_PATH)")
+    parser.add_argument("--persons", type=int, default=PERSONS, help="target person rows (10K .. 50M)")
+    parser.add_argument("--start", default=START_DATE)
+    parser.add_argument("--end", default=END_DATE)
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--chunk-collisions", type=int, default=CHUNK_COLLISIONS)
+    args = parser.parse_args()
+
+    if not 10_000 <= args.persons <= 50_000_000:
+        print(f"Warning: --persons {args.persons:,} is outside the tested 10K .. 50M range.")
+
+    print("=" * 80)
+    print("SCHEMA SENTINEL - SYNTHETIC DATA GENERATOR")
+    print("=" * 80)
+    t0 = time.perf_counter()
+    counts = generate(args.out, args.persons, args.start, args.end, args.seed, args.chunk_collisions)
+    elapsed = time.perf_counter() - t0
+
+    print(f"\nCollisions: {counts['collisions']:,}")
+    print(f"Vehicles:   {counts['vehicles']:,}")
+    print(f"Persons:    {counts['persons']:,}  "
+          f"({counts['persons'] / counts['collisions']:.2f} per collision)")
+    print(f"Weather:    {counts['weather_days']:,} days")
+    print(f"\nWritten to {os.path.abspath(args.out)} in {elapsed:.1f}s")
+    for name in [PERSON_FILE, VEHICLE_FILE, CRASHES_FILE, WEATHER_FILE]:
+        path = os.path.join(args.out, name)
+        print(f"  {name:55} {os.path.getsize(path) / 1e6:10.1f} MB")
@@ -2,6 +2,10 @@ import pandas as pd
 import numpy as np
 import os
 
+from concurrent_loader import load_parquet
+from intermediate_io import write_intermediate
+from step_trace import Tracer
+
 # Set paths
 RAW_DATA_PATH = ''
 OUTPUT_PATH = ''
@@ -9,6 +13,16 @@ OUTPUT_PATH = ''
 # Create output directory
 os.makedirs(OUTPUT_PATH, exist_ok=True)
 
+# Backend: pandas (reference) or the polars lazy engine (SCHEMA_SENTINEL_BACKEND=polars)
+BACKEND = os.environ.get("SCHEMA_SENTINEL_BACKEND", "pandas")
+if BACKEND == "polars":
+    from polars_pipeline import run_stage
+    run_stage("vehicle", RAW_DATA_PATH, OUTPUT_PATH)
+    raise SystemExit(0)
+
+# Step timing / memory (enable with SCHEMA_SENTINEL_TRACE=1)
+trace = Tracer("vehicle_conditioning")
+
 print("="*80)
 print("VEHICLE DATASET CONDITIONING - COMPLETE PIPELINE")
 print("="*80)
@@ -17,7 +31,8 @@ print("="*80)
 # STEP 1: LOAD RAW DATA
 # ============================================================================
 print("\nSTEP 1: Loading raw vehicle data...")
-vehicles_raw = pd.read_parquet(f'{RAW_DATA_PATH}/vehicles_full.parquet')
+trace.step("STEP 1: Loading raw vehicle data")
+vehicles_raw = load_parquet(f'{RAW_DATA_PATH}/vehicles_full.parquet')
 
 print(f"Raw vehicle data loaded: {len(vehicles_raw):,} records")
 print(f"Columns: {len(vehicles_raw.columns)}")
@@ -27,6 +42,7 @@ print(vehicles_raw[['collision_id', 'crash_date', 'vehicle_type']].head())
 # Save pre-conditioning snapshot
 vehicles_raw.to_parquet(f'{OUTPUT_PATH}/vehicles_PRE_conditioning.parquet', index=False)
 print(f"\nPre-conditioning dataset saved: vehicles_PRE_conditioning.parquet")
+trace.end(rows_out=vehicles_raw)
 
 # ============================================================================
 # STEP 2: DATE STANDARDIZATION
@@ -34,6 +50,7 @@ print(f"\nPre-conditioning dataset saved: vehicles_PRE_conditioning.parquet")
 print("\n" + "="*80)
 print("STEP 2: DATE STANDARDIZATION")
 print("="*80)
+trace.step("STEP 2: Date standardization", rows_in=vehicles_raw)
 
 # Create working copy
 vehicles_df = vehicles_raw.copy()
@@ -54,6 +71,7 @@ print(f"merge_date created: {vehicles_df['merge_date'].head(3).tolist()}")
 
 date_null_count = vehicles_df['crash_date'].isna().sum()
 print(f"\nValidation: {date_null_count:,} null dates ({date_null_count/len(vehicles_df)*100:.2f}%)")
+trace.end(rows_out=vehicles_df)
 
 # ============================================================================
 # STEP 3: CASE NORMALIZATION
@@ -61,6 +79,7 @@ print(f"\nValidation: {date_null_count:,} null dates ({date_null_count/len(vehic
 print("\n" + "="*80)
 print("STEP 3: CASE NORMALIZATION")
 print("="*80)
+trace.step("STEP 3: Case normalization", rows_in=vehicles_df)
 
 # Store original count
 original_unique = vehicles_df['vehicle_type'].nunique()
@@ -85,6 +104,7 @@ print(bus_normalized)
 
 reduction = original_unique - normalized_unique
 print(f"\nReduction: {original_unique:,} -> {normalized_unique:,} (-{reduction:,} duplicates)")
+trace.end(rows_out=vehicles_df)
 
 # ============================================================================
 # STEP 4: SEMANTIC CONSOLIDATION
@@ -92,6 +112,7 @@ print(f"\nReduction: {original_unique:,} -> {normalized_unique:,} (-{reduction:,
 print("\n" + "="*80)
 print("STEP 4: SEMANTIC CONSOLIDATION")
 print("="*80)
+trace.step("STEP 4: Semantic consolidation", rows_in=vehicles_df)
 
 print("\nBEFORE Semantic Consolidation:")
 print("\nSedans:")
@@ -150,6 +171,7 @@ for original, consolidated in consolidation_map.items():
         total_consolidated += count
 
 print(f"\nTotal records consolidated: {total_consolidated:,}")
+trace.end(rows_out=vehicles_df)
 
 # ============================================================================
 # STEP 5: VALIDATION
@@ -157,6 +179,7 @@ print(f"\nTotal records consolidated: {total_consolidated:,}")
 print("\n" + "="*80)
 print("STEP 5: VALIDATION")
 print("="*80)
+trace.step("STEP 5: Validation", rows_in=vehicles_df)
 
 # Check for data loss
 assert len(vehicles_raw) == len(vehicles_df), "Record count changed!"
@@ -177,6 +200,7 @@ print("\nTop 20 vehicle types after conditioning:")
 print(vehicles_df['vehicle_type'].value_counts().head(20))
 
 print("\nValidation: All checks passed!")
+trace.end(rows_out=vehicles_df)
 
 # ============================================================================
 # STEP 6: SAVE POST-CONDITIONING
@@ -184,11 +208,13 @@ print("\nValidation: All checks passed!")
 print("\n" + "="*80)
 print("STEP 6: SAVE POST-CONDITIONING DATASET")
 print("="*80)
+trace.step("STEP 6: Save post-conditioning dataset", rows_in=vehicles_df)
 
 # Save full dataset
-vehicles_df.to_parquet(f'{OUTPUT_PATH}/vehicles_POST_conditioning.parquet', index=False)
+write_intermediate(vehicles_df, f'{OUTPUT_PATH}/vehicles_POST_conditioning.parquet')
 
 print(f"\nPost-conditioning dataset saved: vehicles_POST_conditioning.parquet")
+trace.end(rows_out=vehicles_df)
 
 # ============================================================================
 # SUMMARY
@@ -212,4 +238,6 @@ print(f"\nTop 3 represent: {top3.sum() / len(vehicles_df) * 100:.1f}% of all rec
 
 print("\n" + "="*80)
 print("VEHICLE CONDITIONING COMPLETE!")
-print("="*80)
\ No newline at end of file
+print("="*80)
+
+trace.finish()
\ No newline at end of file
@@ -0,0 +1,90 @@
+"""
+Schema Sentinel - Person <-> Vehicle Linkage
+--------------------------------------------
+The integration builder's default person + vehicle merge is on
+(collision_id, merge_date): every person is paired with EVERY vehicle in their
+crash (about 2.1 rows per person on the NYC extracts), so counts downstream are
+inflated and every consumer has to dedupe.
+
+NYC person records carry vehicle_id, which is the vehicles table's unique_id.
+Linked mode joins on that key instead, giving exactly one row per person:
+
+1. vehicle_id matches a vehicle unique_id in the same collision
+   -> that vehicle                                        (vehicle_link = "vehicle_id")
+2. otherwise (pedestrians, cyclists, missing / stale vehicle_id), if the
+   collision has exactly one vehicle -> that vehicle      (vehicle_link = "single_vehicle")
+3. otherwise the person is kept with empty vehicle columns (vehicle_link = "unlinked")
+
+Only vehicles with a unique_id can be linked: rows with a null unique_id are
+left out of the merge (so a person with no link never matches them) and
+duplicate (collision_id, unique_id) rows are reduced to the first. A collision
+counts as single-vehicle only when it has one linkable vehicle and no vehicle
+rows without an id.
+
+The output has the same columns as the collision-mode merge (overlapping names
+get the _person / _vehicle suffixes) plus vehicle_link.
+
+Select it in the builder with SCHEMA_SENTINEL_JOIN=linked (JOIN_MODE).
+"""
+
+import pandas as pd
+
+JOIN_ENV = "SCHEMA_SENTINEL_JOIN"
+JOIN_MODES = ("collision", "linked")
+LINK_KEY = "_linked_vehicle_uid"
+
+
+def _as_id(series):
+    """Vehicle ids as nullable integers (person.vehicle_id is float / string in the extracts)."""
+    return pd.to_numeric(series, errors="coerce").astype("Int64")
+
+
+def linkable_vehicles(vehicles):
+    """Vehicle rows a person can be linked to: non-null unique_id, first row per (collision_id, unique_id)."""
+    uid = _as_id(vehicles["unique_id"])
+    keys = pd.DataFrame({"collision_id": vehicles["collision_id"].to_numpy(), "uid": uid.to_numpy()})
+    keep = uid.notna().to_numpy() & ~keys.duplicated().to_numpy()
+    return vehicles[keep]
+
+
+def vehicle_link_keys(person, vehicles):
+    """
+    Return (vehicle unique_id per person row, rule used per person row) following
+    the vehicle_id -> single vehicle -> unlinked order above.
+    """
+    without_id = vehicles.loc[_as_id(vehicles["unique_id"]).isna().to_numpy(), "collision_id"].unique()
+    vehicles = linkable_vehicles(vehicles)
+    pairs = pd.MultiIndex.from_arrays([vehicles["collision_id"], _as_id(vehicles["unique_id"])])
+    claimed = _as_id(person["vehicle_id"]) if "vehicle_id" in person.columns \
+        else pd.Series(pd.NA, index=person.index, dtype="Int64")
+    direct = pd.MultiIndex.from_arrays([person["collision_id"], claimed]).isin(pairs) & claimed.notna().to_numpy()
+
+    per_collision = vehicles.groupby("collision_id")["unique_id"].agg(["size", "first"])
+    per_collision = per_collision[~per_collision.index.isin(without_id)]
+    single = _as_id(per_collision.loc[per_collision["size"] == 1, "first"])
+    fallback = person["collision_id"].map(single).astype("Int64")
+
+    key = claimed.where(direct, fallback)
+    rule = pd.Series("unlinked", index=person.index)
+    rule[fallback.notna().to_numpy()] = "single_vehicle"
+    rule[direct] = "vehicle_id"
+    return key, rule
+
+
+def link_person_vehicle(person, vehicles, on=("collision_id", "merge_date"), suffixes=("_person", "_vehicle")):
+    """One row per person with the linked vehicle's columns (empty when unlinked)."""
+    key, rule = vehicle_link_keys(person, vehicles)
+    left = person.assign(**{LINK_KEY: key.to_numpy()})
+    # No null keys on the right, so unlinked persons (null key) match nothing
+    vehicles = linkable_vehicles(vehicles)
+    right = vehicles.assign(**{LINK_KEY: _as_id(vehicles["unique_id"]).to_numpy()})
+    linked = left.merge(right, on=list(on) + [LINK_KEY], how="left", suffixes=suffixes, validate="many_to_one")
+    linked = linked.drop(columns=LINK_KEY)
+    linked["vehicle_link"] = rule.to_numpy()
+    return linked
+
+
+def linkage_report(linked):
+    """Persons per linkage rule."""
+    counts = linked["vehicle_link"].value_counts()
+    return pd.DataFrame({"persons": counts, "share": counts / counts.sum()})
@@ -2,6 +2,10 @@ import pandas as pd
 import numpy as np
 import os
 
+from csv_ingest import ingested_path
+from intermediate_io import write_intermediate
+from step_trace import Tracer
+
 # Set paths
 RAW_DATA_PATH = ''
 OUTPUT_PATH = ''
@@ -9,6 +13,16 @@ OUTPUT_PATH = ''
 # Create output directory
 os.makedirs(OUTPUT_PATH, exist_ok=True)
 
+# Backend: pandas (reference) or the polars lazy engine (SCHEMA_SENTINEL_BACKEND=polars)
+BACKEND = os.environ.get("SCHEMA_SENTINEL_BACKEND", "pandas")
+if BACKEND == "polars":
+    from polars_pipeline import run_stage
+    run_stage("weather", RAW_DATA_PATH, OUTPUT_PATH)
+    raise SystemExit(0)
+
+# Step timing / memory (enable with SCHEMA_SENTINEL_TRACE=1)
+trace = Tracer("weather_conditioning")
+
 print("="*80)
 print("WEATHER DATASET CONDITIONING - COMPLETE PIPELINE")
 print("="*80)
@@ -17,7 +31,11 @@ print("="*80)
 # STEP 1: LOAD RAW DATA
 # ============================================================================
 print("\nSTEP 1: Loading raw weather data...")
-weather_raw = pd.read_csv(f'{RAW_DATA_PATH}/nyc weather data.csv')
+trace.step("STEP 1: Loading raw weather data")
+# Typed parquet from csv_ingest.py when it is there (the CSV is parsed once)
+weather_csv = f'{RAW_DATA_PATH}/nyc weather data.csv'
+weather_parquet = ingested_path(weather_csv)
+weather_raw = pd.read_parquet(weather_parquet) if weather_parquet else pd.read_csv(weather_csv)
 
 print(f"Raw weather data loaded: {len(weather_raw):,} records")
 print(f"Columns: {list(weather_raw.columns)}")
@@ -25,6 +43,7 @@ print(f"Columns: {list(weather_raw.columns)}")
 # Save pre-conditioning snapshot
 weather_raw.to_csv(f'{OUTPUT_PATH}/weather_PRE_conditioning.csv', index=False)
 print(f"Pre-conditioning dataset saved: weather_PRE_conditioning.csv")
+trace.end(rows_out=weather_raw)
 
 # ============================================================================
 # STEP 2: DATE STANDARDIZATION
@@ -32,6 +51,7 @@ print(f"Pre-conditioning dataset saved: weather_PRE_conditioning.csv")
 print("\n" + "="*80)
 print("STEP 2: DATE STANDARDIZATION")
 print("="*80)
+trace.step("STEP 2: Date standardization", rows_in=weather_raw)
 
 # Create working copy
 weather_df = weather_raw.copy()
@@ -49,6 +69,7 @@ weather_df.rename(columns={'DATE': 'crash_date'}, inplace=True)
 print("\nAFTER:")
 print(f"crash_date column type: {weather_df['crash_date'].dtype}")
 print(f"Sample dates: {weather_df['crash_date'].head(3).tolist()}")
+trace.end(rows_out=weather_df)
 
 # ============================================================================
 # STEP 3: WEATHER CATEGORIZATION
@@ -56,6 +77,7 @@ print(f"Sample dates: {weather_df['crash_date'].head(3).tolist()}")
 print("\n" + "="*80)
 print("STEP 3: WEATHER CATEGORIZATION")
 print("="*80)
+trace.step("STEP 3: Weather categorization", rows_in=weather_df)
 
 # Show raw weather indicators
 print("\nRaw weather indicator columns:")
@@ -99,6 +121,7 @@ print("\nWeather category distribution:")
 print(weather_df['weather_condition'].value_counts())
 print("\nPercentages:")
 print(weather_df['weather_condition'].value_counts(normalize=True) * 100)
+trace.end(rows_out=weather_df)
 
 # ============================================================================
 # STEP 4: CREATE MERGE KEY
@@ -106,6 +129,7 @@ print(weather_df['weather_condition'].value_counts(normalize=True) * 100)
 print("\n" + "="*80)
 print("STEP 4: CREATE MERGE KEY")
 print("="*80)
+trace.step("STEP 4: Create merge key", rows_in=weather_df)
 
 print("\nBEFORE:")
 print(f"crash_date includes time: {weather_df['crash_date'].head(3).tolist()}")
@@ -115,6 +139,7 @@ weather_df['merge_date'] = weather_df['crash_date'].dt.date
 
 print("\nAFTER:")
 print(f"merge_date (date only): {weather_df['merge_date'].head(3).tolist()}")
+trace.end(rows_out=weather_df)
 
 # ============================================================================
 # STEP 5: SAVE POST-CONDITIONING
@@ -122,6 +147,7 @@ print(f"merge_date (date only): {weather_df['merge_date'].head(3).tolist()}")
 print("\n" + "="*80)
 print("STEP 5: SAVE POST-CONDITIONING DATASET")
 print("="*80)
+trace.step("STEP 5: Save post-conditioning dataset", rows_in=weather_df)
 
 # Select final columns
 weather_final = weather_df[[
@@ -136,11 +162,12 @@ weather_final = weather_df[[
 
 # Save post-conditioning dataset
 weather_final.to_csv(f'{OUTPUT_PATH}/weather_POST_conditioning.csv', index=False)
-weather_final.to_parquet(f'{OUTPUT_PATH}/weather_POST_conditioning.parquet', index=False)
+write_intermediate(weather_final, f'{OUTPUT_PATH}/weather_POST_conditioning.parquet')
 
 print(f"\nPost-conditioning dataset saved:")
 print(f"  CSV: weather_POST_conditioning.csv")
 print(f"  Parquet: weather_POST_conditioning.parquet")
+trace.end(rows_out=weather_df)
 
 # ============================================================================
 # SUMMARY
@@ -158,4 +185,6 @@ print(f"Total days: {len(weather_final)}")
 
 print("\n" + "="*80)
 print("WEATHER CONDITIONING COMPLETE!")
-print("="*80)
\ No newline at end of file
+print("="*80)
+
+trace.finish()
\ No newline at end of file
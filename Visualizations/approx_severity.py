@@ -0,0 +1,255 @@
+# ===============================
+# APPROXIMATE SEVERITY RATES (stratified samples + confidence intervals)
+# ===============================
+# The severity-rate charts (by age group, time of day, weather) run an exact
+# groupby over every person row even for a quick look. With
+# SCHEMA_SENTINEL_APPROX set they answer from a persisted sample instead:
+#
+#   - one sample family per query key (age_group, time_of_day, ...), stratified
+#     on that key: each group keeps ceil(f * N_h) rows, at least
+#     MIN_STRATUM_ROWS (all rows when the group is smaller), for every
+#     f in FRACTIONS (0.1%, 1%, 10%)
+#   - rows are the ones with the smallest seeded hash of their row number in
+#     each group, so the samples are nested (0.1% is inside 1% is inside 10%)
+#     and identical on every run; the family is ONE parquet file with a
+#     `sample_level` column (smallest fraction that contains the row)
+#   - group sizes N_h are stored with the sample, so `collisions` is exact and
+#     only the severe rate / severe count are estimated (stratified simple
+#     random sampling, finite-population corrected normal interval)
+#
+# severity_rates() tries the smallest sample first and returns the first one
+# where every group's rate interval is within +/- max_error and its severe
+# count interval within +/- max_rel_error; otherwise it computes the exact
+# groupby over all rows. The sample file is rebuilt when the source changes
+# (row count, columns or severe total differ) - delete SAMPLE_DIR after
+# changing a key's bins.
+#
+#   SCHEMA_SENTINEL_APPROX=1      -> rates within +/- MAX_ERROR (2 points)
+#   SCHEMA_SENTINEL_APPROX=0.01   -> rates within +/- 1 point
+#   unset / 0 / off               -> exact (default)
+
+import json
+import os
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# -------------------------------
+# Configuration
+# -------------------------------
+APPROX_ENV = "SCHEMA_SENTINEL_APPROX"
+SAMPLE_DIR = "approx_samples"
+FRACTIONS = (0.001, 0.01, 0.1)
+MIN_STRATUM_ROWS = 100      # rows kept per group even in the smallest sample
+MIN_GROUP_ROWS = 30         # fewer sampled rows than this -> normal interval not trusted
+MAX_ERROR = 0.02            # default absolute half-width for rates (2 percentage points)
+MAX_REL_ERROR = 0.20        # relative half-width for severe counts
+CONFIDENCE = 0.95
+SEED = 42
+METADATA_KEY = b"approx_severity"
+
+
+def approx_max_error():
+    """Rate error bound from SCHEMA_SENTINEL_APPROX, or None for exact rates."""
+    value = os.environ.get(APPROX_ENV, "").strip().lower()
+    if value in ("", "0", "off", "false", "no", "exact"):
+        return None
+    if value in ("1", "on", "true", "yes"):
+        return MAX_ERROR
+    try:
+        bound = float(value)
+    except ValueError:
+        raise ValueError(f"{APPROX_ENV} must be on/off or a rate error bound such as 0.02, got {value!r}")
+    if not 0 < bound < 1:
+        raise ValueError(f"{APPROX_ENV} error bound must be between 0 and 1, got {bound}")
+    return bound
+
+
+def _key_values(df, key):
+    """Group key for every row: a column name or a function of the frame."""
+    return df[key] if isinstance(key, str) else key(df)
+
+
+def _row_hash(n, seed):
+    """Deterministic uniform [0, 1) value per row number (splitmix64)."""
+    x = np.arange(n, dtype=np.uint64)
+    with np.errstate(over="ignore"):
+        x = x + np.uint64(seed) * np.uint64(0x9E3779B97F4A7C15)
+        x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        x = x ^ (x >> np.uint64(31))
+    return (x >> np.uint64(11)).astype(np.float64) / float(1 << 53)
+
+
+def _fingerprint(df, fractions, seed):
+    return {
+        "rows": int(len(df)),
+        "severe": int(df["severe"].sum()),
+        "columns": list(map(str, df.columns)),
+        "fractions": list(fractions),
+        "min_stratum_rows": MIN_STRATUM_ROWS,
+        "seed": seed,
+    }
+
+
+def stratum_sizes(population, fraction):
+    """Rows sampled per group at `fraction` (population = full group sizes)."""
+    n = np.maximum(np.ceil(fraction * population), MIN_STRATUM_ROWS)
+    return np.minimum(n, population).astype(np.int64)
+
+
+def build_samples(df, key, name, fractions=FRACTIONS, seed=SEED):
+    """
+    Nested stratified samples of (key, severe) for every fraction, as one frame
+    with the group size (`stratum_rows`) and the smallest fraction holding the
+    row (`sample_level`).
+    """
+    values = _key_values(df, key)
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        # keep the key's own category order (e.g. age bins), not sorted labels
+        codes, labels = values.cat.codes.to_numpy(), values.cat.categories
+    else:
+        codes, labels = pd.factorize(values, sort=True)
+    valid = codes >= 0
+    codes = codes[valid]
+    severe = df["severe"].to_numpy()[valid]
+    u = _row_hash(len(df), seed)[valid]
+
+    population = np.bincount(codes, minlength=len(labels))
+    order = np.lexsort((u, codes))
+    starts = np.concatenate([[0], np.cumsum(population)[:-1]])
+    rank = np.empty(len(order), dtype=np.int64)
+    rank[order] = np.arange(len(order)) - np.repeat(starts, population)
+
+    level = np.full(len(codes), np.nan)
+    for fraction in sorted(fractions, reverse=True):
+        level[rank < stratum_sizes(population, fraction)[codes]] = fraction
+    keep = ~np.isnan(level)
+
+    return pd.DataFrame({
+        name: pd.Categorical.from_codes(codes[keep], categories=labels),
+        "severe": severe[keep].astype(np.int8),
+        "stratum_rows": population[codes[keep]],
+        "sample_level": level[keep],
+    })
+
+
+def _sample_path(name, sample_dir):
+    return os.path.join(sample_dir, f"{name}.parquet")
+
+
+def save_samples(sample, path, fingerprint):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    table = pa.Table.from_pandas(sample, preserve_index=False)
+    metadata = dict(table.schema.metadata or {})
+    metadata[METADATA_KEY] = json.dumps(fingerprint).encode()
+    pq.write_table(table.replace_schema_metadata(metadata), path)
+
+
+def load_samples(df, key, name, sample_dir=SAMPLE_DIR, fractions=FRACTIONS, seed=SEED, verbose=True):
+    """Persisted sample family for `name`, rebuilt when it is missing or stale."""
+    path = _sample_path(name, sample_dir)
+    fingerprint = _fingerprint(df, fractions, seed)
+    if os.path.exists(path):
+        stored = (pq.read_schema(path).metadata or {}).get(METADATA_KEY)
+        if stored is not None and json.loads(stored) == fingerprint:
+            return pd.read_parquet(path)
+    sample = build_samples(df, key, name, fractions, seed)
+    save_samples(sample, path, fingerprint)
+    if verbose:
+        print(f"Built {name} samples ({len(sample):,} rows for {', '.join(f'{f:.1%}' for f in fractions)}): {path}")
+    return sample
+
+
+def estimate(sample, name, fraction, confidence=CONFIDENCE):
+    """
+    Per-group estimates from the sample at `fraction`: exact collisions, severe
+    rate and severe count with normal confidence intervals.
+    """
+    rows = sample[sample["sample_level"] <= fraction]
+    g = rows.groupby(name, observed=True).agg(
+        collisions=("stratum_rows", "first"),
+        sample_rows=("severe", "size"),
+        sample_severe=("severe", "sum"),
+    )
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    N = g["collisions"].to_numpy(dtype=float)
+    n = g["sample_rows"].to_numpy(dtype=float)
+    p = g["sample_severe"].to_numpy(dtype=float) / n
+
+    # Stratified SRS without replacement: Var(p) = (1 - n/N) * s^2 / n, s^2 = n p (1 - p) / (n - 1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        var = np.where(n > 1, (1 - n / N) * p * (1 - p) / (n - 1), 0.0)
+    half = z * np.sqrt(var)
+
+    out = g.reset_index()
+    out["severe_rate"] = p
+    out["severe_rate_low"] = np.clip(p - half, 0, 1)
+    out["severe_rate_high"] = np.clip(p + half, 0, 1)
+    out["severe_collisions"] = N * p
+    out["severe_collisions_low"] = N * out["severe_rate_low"]
+    out["severe_collisions_high"] = N * out["severe_rate_high"]
+    out["rate_error"] = half
+    return out
+
+
+def meets_bound(est, max_error, max_rel_error=MAX_REL_ERROR):
+    """True when every group's interval is within the requested bounds."""
+    complete = est["sample_rows"] >= est["collisions"]
+    # p = 0 or 1 in a partial sample gives a zero-width interval that means nothing
+    degenerate = (est["sample_severe"] == 0) | (est["sample_severe"] == est["sample_rows"])
+    trusted = complete | ((est["sample_rows"] >= MIN_GROUP_ROWS) & ~degenerate)
+    rel = (est["rate_error"] / est["severe_rate"]).where(est["severe_rate"] > 0, 0.0)
+    return bool((trusted & (est["rate_error"] <= max_error) & (complete | (rel <= max_rel_error))).all())
+
+
+def exact_rates(df, key, name):
+    """The scripts' exact aggregation over every row."""
+    frame = pd.DataFrame({name: _key_values(df, key), "collision_id": df["collision_id"], "severe": df["severe"]})
+    summary = frame.groupby(name, observed=True).agg(
+        collisions=("collision_id", "count"),
+        severe_collisions=("severe", "sum"),
+    ).reset_index()
+    summary["severe_rate"] = summary["severe_collisions"] / summary["collisions"]
+    return summary
+
+
+def severity_rates(df, key, name, max_error=MAX_ERROR, max_rel_error=MAX_REL_ERROR, confidence=CONFIDENCE,
+                   sample_dir=SAMPLE_DIR, verbose=True):
+    """
+    Severe rate per group of `key` from the smallest sample that meets the
+    error bounds, escalating to the exact computation when none does.
+    The `source` attribute records which was used.
+    """
+    sample = load_samples(df, key, name, sample_dir, verbose=verbose)
+    for fraction in sorted(set(sample["sample_level"])):
+        est = estimate(sample, name, fraction, confidence)
+        if meets_bound(est, max_error, max_rel_error):
+            est.attrs["source"] = f"{fraction:.1%} sample"
+            if verbose:
+                print(f"{name}: {fraction:.1%} sample ({int(est['sample_rows'].sum()):,} rows), "
+                      f"{confidence:.0%} CI within +/-{est['rate_error'].max() * 100:.2f} points")
+            return est
+    if verbose:
+        print(f"{name}: no sample meets +/-{max_error * 100:.2f} points, computing exact rates")
+    summary = exact_rates(df, key, name)
+    for col in ("severe_rate", "severe_collisions"):
+        summary[f"{col}_low"] = summary[col]
+        summary[f"{col}_high"] = summary[col]
+    summary.attrs["source"] = "exact"
+    return summary
+
+
+def plot_intervals(summary, scale=100, **kwargs):
+    """Error bars for the interval columns on top of a bar chart drawn in summary order."""
+    import matplotlib.pyplot as plt
+
+    if summary.attrs.get("source", "exact") == "exact":
+        return
+    rate = summary["severe_rate"].to_numpy() * scale
+    yerr = np.vstack([rate - summary["severe_rate_low"].to_numpy() * scale,
+                      summary["severe_rate_high"].to_numpy() * scale - rate])
+    plt.errorbar(np.arange(len(summary)), rate, yerr=yerr, fmt="none", ecolor="black", capsize=4, **kwargs)
@@ -0,0 +1,314 @@
+# ===============================
+# GROUPING SETS FOR THE SEVERITY BREAKDOWNS (one scan, integer codes)
+# ===============================
+# The severity charts each copied the full frame, added a binned column and
+# ran their own groupby. Here every dimension is encoded ONCE as integer codes
+# straight from its source column (no frame copy, no new columns):
+#
+#   - binned numeric columns (age) -> np.searchsorted on the bin edges
+#   - times of day -> only the distinct crash_time strings are parsed
+#   - categorical columns -> pd.factorize (sorted, like groupby)
+#
+# The codes are combined into one mixed-radix cell id per row, and a single
+# np.bincount per measure builds the full cube over all dimensions (with a
+# slot for missing values). Every grouping set (single dimensions and their
+# pairs) is then a sum over the other axes of that small cube. When the cube
+# would exceed MAX_CELLS the sets are counted one bincount each instead.
+#
+# Results match df.groupby(dims).agg(collisions=("collision_id", "count"),
+# severe_collisions=("severe", "sum")): missing keys and empty combinations are
+# dropped. severity_breakdowns() keeps the last frame's results, so the
+# severity charts run on the same df share one scan.
+#
+#   python grouping_sets.py person_vehicle_weather.parquet --compare
+#   python grouping_sets.py person_vehicle_weather.parquet --out severity_breakdowns.parquet
+
+import argparse
+import itertools
+import time
+import weakref
+
+import numpy as np
+import pandas as pd
+
+# -------------------------------
+# Configuration
+# -------------------------------
+file_path = "person_vehicle_weather.parquet"
+
+# Age bins based on your report
+AGE_BINS = [0, 18, 25, 35, 45, 55, 65, 120]
+AGE_LABELS = ["<18", "18–24", "25–34", "35–44", "45–54", "55–64", "65+"]
+
+TIME_BINS = [0, 4, 7, 10, 16, 19, 22, 24]
+TIME_LABELS = [
+    "Late Night (00:00–03:59)",
+    "Early Morning (04:00–06:59)",
+    "AM Peak (07:00–09:59)",
+    "Midday (10:00–15:59)",
+    "PM Peak (16:00–18:59)",
+    "Evening (19:00–21:59)",
+    "Late Evening (22:00–23:59)"
+]
+
+MAX_CELLS = 5_000_000       # largest cube built in one bincount
+
+
+def _bin_codes(values, bins, labels):
+    """pd.cut(values, bins, labels, right=False) as integer codes (-1 = outside / missing)."""
+    values = np.asarray(values, dtype=float)
+    codes = np.searchsorted(bins, values, side="right") - 1
+    codes[np.isnan(values) | (codes >= len(labels))] = -1
+    return codes
+
+
+def binned(column, bins, labels):
+    def encode(df):
+        return _bin_codes(df[column].to_numpy(dtype=float, na_value=np.nan), bins, labels), list(labels)
+    encode.columns = [column]
+    return encode
+
+
+def time_of_day(column="crash_time", bins=TIME_BINS, labels=TIME_LABELS):
+    def encode(df):
+        # ~1,440 distinct "H:MM" strings: parse those, not every row
+        codes, uniques = pd.factorize(df[column])
+        hours = pd.to_datetime(pd.Series(uniques), format="%H:%M").dt.hour
+        lookup = _bin_codes(hours, bins, labels)
+        return np.where(codes >= 0, lookup[codes], -1), list(labels)
+    encode.columns = [column]
+    return encode
+
+
+def categorical(column):
+    def encode(df):
+        codes, uniques = pd.factorize(df[column], sort=True)
+        return codes, list(uniques)
+    encode.columns = [column]
+    return encode
+
+
+DIMENSIONS = {
+    "age_group": binned("person_age", AGE_BINS, AGE_LABELS),
+    "time_of_day": time_of_day("crash_time"),
+    "weather_condition": categorical("weather_condition"),
+    "person_sex": categorical("person_sex"),
+    "driver_license_status": categorical("driver_license_status"),
+    "borough": categorical("borough"),
+}
+
+# collisions = non-null collision_id rows, severe_collisions = sum of severe
+MEASURES = {"collisions": ("collision_id", "count"), "severe_collisions": ("severe", "sum")}
+
+
+def severity_sets(dimensions=DIMENSIONS):
+    """Every single dimension and every pair of dimensions."""
+    names = list(dimensions)
+    return [(d,) for d in names] + list(itertools.combinations(names, 2))
+
+
+def encode(df, names, dimensions=DIMENSIONS):
+    """{dimension: (codes, labels)} for the named dimensions."""
+    return {name: dimensions[name](df) for name in names}
+
+
+def dimension_series(df, name, dimensions=DIMENSIONS):
+    """One dimension as a categorical Series aligned with df (e.g. as a sampling key)."""
+    codes, labels = dimensions[name](df)
+    return pd.Series(pd.Categorical.from_codes(codes, categories=labels), index=df.index, name=name)
+
+
+def _weights(df, measures):
+    """Per-row weight for each measure (count -> non-null indicator, sum -> values)."""
+    out = {}
+    for measure, (column, how) in measures.items():
+        values = df[column]
+        if how == "count":
+            out[measure] = values.notna().to_numpy(dtype=np.float64)
+        elif how == "sum":
+            out[measure] = values.to_numpy(dtype=np.float64, na_value=0.0)
+        else:
+            raise ValueError(f"{measure}: unsupported aggregation {how!r} (use 'count' or 'sum')")
+    return out
+
+
+def _cells(codes, cards):
+    """Mixed-radix cell id per row; slot `card` of each axis holds missing values."""
+    cell = np.zeros(len(codes[0]), dtype=np.int64)
+    for c, card in zip(codes, cards):
+        cell = cell * (card + 1) + np.where(c >= 0, c, card)
+    return cell
+
+
+def _count(codes, cards, weights):
+    """Cube of row counts and measure totals over `codes` (shape = card + 1 per axis)."""
+    shape = tuple(card + 1 for card in cards)
+    cell = _cells(codes, cards)
+    size = int(np.prod(shape))
+    cube = {"rows": np.bincount(cell, minlength=size).reshape(shape)}
+    for measure, w in weights.items():
+        cube[measure] = np.bincount(cell, weights=w, minlength=size).reshape(shape)
+    return cube
+
+
+def _frame(cube, dims, labels, measures, integer):
+    """Long frame for one grouping set: observed, non-missing key combinations only."""
+    index = tuple(slice(0, len(labels[d])) for d in dims)
+    rows = cube["rows"][index]
+    keep = np.nonzero(rows.ravel() > 0)[0]
+    positions = np.unravel_index(keep, rows.shape)
+    out = pd.DataFrame({d: pd.Categorical.from_codes(p, categories=labels[d]) for d, p in zip(dims, positions)})
+    for measure in measures:
+        values = cube[measure][index].ravel()[keep]
+        out[measure] = np.rint(values).astype(np.int64) if integer[measure] else values
+    out["severe_rate"] = out["severe_collisions"] / out["collisions"]
+    return out
+
+
+def grouping_sets(df, sets=None, dimensions=DIMENSIONS, measures=MEASURES):
+    """
+    {dimension tuple: summary frame} for every grouping set, from one scan of
+    the dimension codes when the full cube fits in MAX_CELLS.
+    """
+    sets = [tuple(s) for s in (sets or severity_sets(dimensions))]
+    names = list(dict.fromkeys(d for s in sets for d in s))
+    encoded = encode(df, names, dimensions)
+    labels = {d: encoded[d][1] for d in names}
+    cards = [len(labels[d]) for d in names]
+    weights = _weights(df, measures)
+    integer = {m: df[c].dtype.kind in "biu" or how == "count" for m, (c, how) in measures.items()}
+
+    results = {}
+    if np.prod([card + 1 for card in cards], dtype=float) <= MAX_CELLS:
+        cube = _count([encoded[d][0] for d in names], cards, weights)
+        for s in sets:
+            axes = tuple(i for i, d in enumerate(names) if d not in s)
+            # marginal over the other dimensions, axes in the set's order
+            order = np.argsort([s.index(d) for d in names if d in s])
+            marginal = {k: np.transpose(v.sum(axis=axes), order) for k, v in cube.items()}
+            results[s] = _frame(marginal, s, labels, measures, integer)
+    else:
+        for s in sets:
+            cube = _count([encoded[d][0] for d in s], [len(labels[d]) for d in s], weights)
+            results[s] = _frame(cube, s, labels, measures, integer)
+    return results
+
+
+# -------------------------------
+# Shared results for the severity charts
+# -------------------------------
+_cache = {}
+
+
+def severity_breakdowns(df, dimensions=DIMENSIONS):
+    """All severity grouping sets for the dimensions df has columns for (cached for the last frame)."""
+    available = {d: f for d, f in dimensions.items() if all(c in df.columns for c in f.columns)}
+    signature = (len(df), tuple(df.columns), tuple(available))
+    hit = _cache.get(id(df))
+    if hit is not None and hit[0] == signature:
+        return hit[1]
+    results = grouping_sets(df, severity_sets(available), available)
+    _cache.clear()
+    _cache[id(df)] = (signature, results)
+    weakref.finalize(df, _cache.pop, id(df), None)
+    return results
+
+
+def severity_breakdown(df, *dims):
+    """Summary for one grouping set, e.g. severity_breakdown(df, "age_group")."""
+    results = severity_breakdowns(df)
+    key = tuple(dims)
+    if key not in results:
+        flipped = tuple(reversed(key))
+        if flipped not in results:
+            raise KeyError(f"No grouping set {key}; available dimensions: {sorted({d for s in results for d in s})}")
+        summary = results[flipped]
+        summary = summary[list(key) + [c for c in summary.columns if c not in key]]
+        return summary.sort_values(list(key)).reset_index(drop=True)
+    return results[key].copy()
+
+
+def clear_cache():
+    """Forget cached results (call after changing df in place)."""
+    _cache.clear()
+
+
+# -------------------------------
+# Comparison with the per-chart groupby
+# -------------------------------
+def _reference_key(df, name):
+    """A dimension built the way the severity scripts did before this module (pd.cut / to_datetime)."""
+    if name == "age_group":
+        return pd.cut(df["person_age"], bins=AGE_BINS, labels=AGE_LABELS, right=False)
+    if name == "time_of_day":
+        hour = pd.to_datetime(df["crash_time"], format="%H:%M").dt.hour
+        return pd.cut(hour, bins=TIME_BINS, labels=TIME_LABELS, right=False)
+    return df[DIMENSIONS[name].columns[0]]
+
+
+def _groupby_summary(df, dims):
+    frame = df.copy()
+    for d in dims:
+        frame[d] = _reference_key(frame, d)
+    summary = frame.groupby(list(dims), observed=True).agg(
+        collisions=("collision_id", "count"),
+        severe_collisions=("severe", "sum")
+    ).reset_index()
+    summary["severe_rate"] = summary["severe_collisions"] / summary["collisions"]
+    return summary
+
+
+def compare(df, sets=None):
+    """
+    Time one grouping-sets pass against one copy + groupby per set (keys built
+    with the scripts' original pd.cut / to_datetime code); check the results match.
+    """
+    sets = sets or severity_sets({d: f for d, f in DIMENSIONS.items() if all(c in df.columns for c in f.columns)})
+    t0 = time.perf_counter()
+    results = grouping_sets(df, sets)
+    t_sets = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    expected = {s: _groupby_summary(df, s) for s in sets}
+    t_groupby = time.perf_counter() - t0
+    for s in sets:
+        pd.testing.assert_frame_equal(results[s], expected[s], check_dtype=False, check_categorical=False)
+    print(f"{len(sets)} grouping sets: one pass {t_sets:.2f}s, per-set copy + groupby {t_groupby:.2f}s "
+          f"-> {t_groupby / max(t_sets, 1e-9):.1f}x, results identical")
+    return results
+
+
+def to_long(results):
+    """All grouping sets in one frame (dimensions not in a set are empty)."""
+    parts = []
+    for s, summary in results.items():
+        part = summary.copy()
+        for d in s:
+            part[d] = part[d].astype(str)
+        part.insert(0, "grouping_set", " x ".join(s))
+        parts.append(part)
+    return pd.concat(parts, ignore_index=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Severity breakdowns for all grouping sets in one pass.")
+    parser.add_argument("path", nargs="?", default=file_path)
+    parser.add_argument("--out", help="write every grouping set to one parquet / csv file")
+    parser.add_argument("--compare", action="store_true", help="time and check against per-set groupby")
+    args = parser.parse_args()
+
+    columns = sorted({"collision_id", "person_injury"} | {c for f in DIMENSIONS.values() for c in f.columns})
+    df = pd.read_parquet(args.path, columns=columns)
+    df["severe"] = np.where(df["person_injury"].isin(["Injured", "Killed"]), 1, 0)
+
+    if args.compare:
+        results = compare(df)
+    else:
+        t0 = time.perf_counter()
+        results = severity_breakdowns(df)
+        print(f"{len(results)} grouping sets over {len(df):,} rows in {time.perf_counter() - t0:.2f}s")
+    for s in [s for s in results if len(s) == 1]:
+        print("\n", results[s].to_string(index=False))
+    if args.out:
+        long = to_long(results)
+        long.to_csv(args.out, index=False) if args.out.endswith(".csv") else long.to_parquet(args.out, index=False)
+        print(f"\nSaved {len(long):,} rows: {args.out}")
@@ -2,20 +2,21 @@
 # SEVERITY BY AGE GROUP
 # ===============================
 
-df_age = df.copy()
+from approx_severity import approx_max_error, plot_intervals, severity_rates
+from grouping_sets import dimension_series, severity_breakdown
 
-# Age bins based on your report
-age_bins = [0, 18, 25, 35, 45, 55, 65, 120]
-age_labels = ["<18", "18–24", "25–34", "35–44", "45–54", "55–64", "65+"]
+# SCHEMA_SENTINEL_APPROX=1 (or an error bound such as 0.02) answers from a
+# stratified sample with confidence intervals instead of every row
+APPROX_MAX_ERROR = approx_max_error()
 
-df_age["age_group"] = pd.cut(df_age["person_age"], bins=age_bins, labels=age_labels, right=False)
+# Age bins (grouping_sets.AGE_BINS) are based on your report
+def age_group(frame):
+    return dimension_series(frame, "age_group")
 
-age_summary = df_age.groupby("age_group").agg(
-    collisions=("collision_id", "count"),
-    severe_collisions=("severe", "sum")
-).reset_index()
-
-age_summary["severe_rate"] = age_summary["severe_collisions"] / age_summary["collisions"]
+if APPROX_MAX_ERROR is not None:
+    age_summary = severity_rates(df, age_group, "age_group", max_error=APPROX_MAX_ERROR)
+else:
+    age_summary = severity_breakdown(df, "age_group")
 age_summary["severe_rate_pct"] = age_summary["severe_rate"] * 100
 
 print(age_summary)
@@ -23,6 +24,8 @@ print(age_summary)
 # Plot
 plt.figure(figsize=(8,5))
 sns.barplot(data=age_summary, x="age_group", y="severe_rate_pct", color="darkgreen")
+if APPROX_MAX_ERROR is not None:
+    plot_intervals(age_summary)
 plt.title("Severity Risk (%) by Age Group")
 plt.ylabel("Severity Rate (%)")
 plt.xlabel("Age Group")
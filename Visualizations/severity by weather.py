@@ -2,16 +2,17 @@
 # SEVERITY BY WEATHER CONDITION
 # ===============================
 
-df_weather = df.copy()
+from approx_severity import approx_max_error, plot_intervals, severity_rates
+from grouping_sets import severity_breakdown
 
-weather_summary = df_weather.groupby("weather_condition").agg(
-    collisions=("collision_id", "count"),
-    severe_collisions=("severe", "sum")
-).reset_index()
+# SCHEMA_SENTINEL_APPROX=1 (or an error bound such as 0.02) answers from a
+# stratified sample with confidence intervals instead of every row
+APPROX_MAX_ERROR = approx_max_error()
 
-weather_summary["severe_rate"] = (
-    weather_summary["severe_collisions"] / weather_summary["collisions"]
-)
+if APPROX_MAX_ERROR is not None:
+    weather_summary = severity_rates(df, "weather_condition", "weather_condition", max_error=APPROX_MAX_ERROR)
+else:
+    weather_summary = severity_breakdown(df, "weather_condition")
 weather_summary["severe_rate_pct"] = weather_summary["severe_rate"] * 100
 
 print(weather_summary)
@@ -19,6 +20,8 @@ print(weather_summary)
 # Plot
 plt.figure(figsize=(8,5))
 sns.barplot(data=weather_summary, x="weather_condition", y="severe_rate_pct", color="firebrick")
+if APPROX_MAX_ERROR is not None:
+    plot_intervals(weather_summary)
 plt.title("Severity Risk (%) by Weather Condition")
 plt.ylabel("Severity Rate (%)")
 plt.xlabel("Weather")
@@ -0,0 +1,27 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "DataProcessing"))
+
+from csv_ingest import detect_profile, output_path  # noqa: E402
+
+
+@pytest.mark.parametrize("name, profile, output", [
+    ("Motor_Vehicle_Collisions_-_Person.csv", "person", "person_full.parquet"),
+    ("Motor_Vehicle_Collisions_-_Vehicles.csv", "vehicles", "vehicles_full.parquet"),
+    ("Motor_Vehicle_Collisions_-_Crashes.csv", "crashes", "Motor_Vehicle_Collisions_-_Crashes.parquet"),
+    ("Motor_Vehicle_Collisions_-_Crashes_20251111.csv", "crashes",
+     "Motor_Vehicle_Collisions_-_Crashes_20251111.parquet"),
+    ("nyc weather data.csv", "weather", "nyc weather data.parquet"),
+])
+def test_export_file_names(name, profile, output):
+    path = os.path.join("raw", name)
+    assert detect_profile(path) == profile
+    assert output_path(path, profile) == os.path.join("raw", output)
+
+
+def test_unknown_file_name():
+    with pytest.raises(ValueError):
+        detect_profile("collisions.csv")